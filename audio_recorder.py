@@ -1,29 +1,88 @@
 """
 Audio recording functionality
 """
+import logging
 import sounddevice as sd
 import numpy as np
-from scipy.io.wavfile import write as write_wav  # Only import what we need
 import threading
-from datetime import datetime
-from pathlib import Path
+import time
+
+from resampler import StreamingResampler, downmix
+from vad import Endpointer, block_level
+
+logger = logging.getLogger(__name__)
+
+# PortAudio callback status flags worth counting
+STATUS_FLAGS = ("input_overflow", "input_underflow", "output_overflow", "output_underflow", "priming_output")
+
+# How often the recording thread reports newly counted status flags
+STATUS_REPORT_SECONDS = 5.0
 
 
 class AudioRecorder:
-    def __init__(self, sample_rate=16000, channels=1):
+    # Config keys apply_config handles
+    CONFIG_KEYS = ("capture_native_rate",)
+    
+    def __init__(self, sample_rate=16000, channels=1, native_rate=False):
+        # Rate and channel count of the audio handed to Whisper
         self.sample_rate = sample_rate
         self.channels = channels
         
+        # Capture at the device's own rate/channels and resample in-process
+        self.native_rate = native_rate
+        self.resampler = None
+        
+        # Optional end-of-speech detection; on_endpoint is called once per
+        # recording from its own thread when the speaker stops talking
+        self.endpointer = None
+        self.on_endpoint = None
+        self.endpoint_detected = False
+        
+        # RMS level of the most recent block, for level meters
+        self.level = 0.0
+        
+        # Stream status flags seen this recording; counted in the callback,
+        # logged from the recording thread
+        self.status_counts = {}
+        
+        # Stage durations (seconds) of the current/last recording
+        self.timings = {}
+        self._started_at = None
+        self._opened_at = None
+        
         self.frames = []
         self.is_recording = False
         self.recording_thread = None
     
+    def set_endpointing(self, callback, silence_ms=800, min_speech_ms=300, max_seconds=60):
+        """Enable automatic stop after trailing silence (callback=None disables)"""
+        if callback is None:
+            self.endpointer = None
+            self.on_endpoint = None
+            return
+        
+        self.endpointer = Endpointer(
+            sample_rate=self.sample_rate,
+            silence_ms=silence_ms,
+            min_speech_ms=min_speech_ms,
+            max_seconds=max_seconds
+        )
+        self.on_endpoint = callback
+    
     def start_recording(self):
         """Start recording audio"""
         if self.is_recording:
             return False
         
         self.frames = []
+        self.level = 0.0
+        self.status_counts = {}
+        self.timings = {}
+        self._started_at = time.perf_counter()
+        self._opened_at = None
+        self.endpoint_detected = False
+        if self.endpointer:
+            self.endpointer.reset()
         self.is_recording = True
         
         try:
@@ -32,79 +91,122 @@ class AudioRecorder:
             self.recording_thread.start()
             return True
         except Exception as e:
-            print(f"Error starting recording: {e}")
+            logger.error(f"Error starting recording: {e}")
             self.is_recording = False
             return False
     
+    def _stream_format(self):
+        """Return (samplerate, channels) to open the input stream with"""
+        if not self.native_rate:
+            return self.sample_rate, self.channels
+        
+        info = sd.query_devices(kind='input')
+        return int(info['default_samplerate']), max(1, int(info['max_input_channels']))
+    
     def _record(self):
         """Internal recording loop"""
         try:
+            stream_rate, stream_channels = self._stream_format()
+            if stream_rate != self.sample_rate:
+                logger.info(f"Capturing at {stream_rate} Hz x{stream_channels}, resampling to {self.sample_rate} Hz")
+                self.resampler = StreamingResampler(stream_rate, self.sample_rate)
+            else:
+                self.resampler = None
+            
             # Record audio using sounddevice
-            # We'll record in chunks and append to frames
-            def callback(indata, frames, time, status):
+            # Blocks are downmixed/resampled as they arrive, so frames always
+            # hold mono audio at self.sample_rate
+            def callback(indata, frames, time_info, status):
                 if status:
-                    print(f"Recording status: {status}")
+                    # No I/O on the audio thread: just count
+                    for flag in STATUS_FLAGS:
+                        if getattr(status, flag, False):
+                            self.status_counts[flag] = self.status_counts.get(flag, 0) + 1
                 if self.is_recording:
-                    self.frames.append(indata.copy())
+                    if not self.frames and self._opened_at is not None:
+                        self.timings['first_block'] = time.perf_counter() - self._opened_at
+                    block = downmix(indata)
+                    if self.resampler:
+                        block = self.resampler.process(block)
+                    else:
+                        block = block.copy()
+                    self.frames.append(block)
+                    self.level = block_level(block)
+                    
+                    endpointer = self.endpointer
+                    if endpointer and endpointer.process(block):
+                        self.endpoint_detected = True
             
             with sd.InputStream(
-                samplerate=self.sample_rate,
-                channels=self.channels,
+                samplerate=stream_rate,
+                channels=stream_channels,
                 callback=callback,
                 dtype=np.float32
             ):
+                self._opened_at = time.perf_counter()
+                self.timings['stream_open'] = self._opened_at - self._started_at
+                endpoint_reported = False
+                reported = {}
+                last_report = time.perf_counter()
                 while self.is_recording:
-                    sd.sleep(100)  # Sleep for 100ms
+                    sd.sleep(50)
+                    
+                    if time.perf_counter() - last_report >= STATUS_REPORT_SECONDS:
+                        reported = self._report_status(reported)
+                        last_report = time.perf_counter()
+                    
+                    # Never stop from the PortAudio callback or this thread:
+                    # stopping joins this thread and closes the stream
+                    if self.endpoint_detected and not endpoint_reported and self.on_endpoint:
+                        endpoint_reported = True
+                        threading.Thread(target=self.on_endpoint, daemon=True).start()
+            self._report_status(reported)
         except Exception as e:
-            print(f"Error during recording: {e}")
+            logger.error(f"Error during recording: {e}")
             self.is_recording = False
     
+    def _report_status(self, reported):
+        """Log status flags counted since the last report; returns the counts reported so far"""
+        counts = dict(self.status_counts)
+        new = {flag: count - reported.get(flag, 0) for flag, count in counts.items() if count > reported.get(flag, 0)}
+        if new:
+            logger.warning(
+                "Audio stream status: " + ", ".join(f"{flag} x{count}" for flag, count in new.items()),
+                extra={"stream_status": new}
+            )
+        return counts
+    
     def stop_recording(self):
-        """Stop recording and return the audio file path"""
+        """Stop recording and return the audio as a mono float32 array"""
         if not self.is_recording:
             return None
         
         self.is_recording = False
         
+        stop_start = time.perf_counter()
         if self.recording_thread:
             self.recording_thread.join()
         
+        finalize_start = time.perf_counter()
+        self.timings['stop'] = finalize_start - stop_start
+        
+        if self.resampler and self.frames:
+            self.frames.append(self.resampler.flush())
+        
         if not self.frames:
             return None
         
-        # Concatenate all recorded frames
+        # Concatenate all recorded frames; Whisper takes the array directly,
+        # so nothing is written to disk on the way to transcription
         recording = np.concatenate(self.frames, axis=0)
-        
-        # Save to recordings directory in AppData
-        # Ensure we're using the full path to AppData
-        app_data = Path.home() / "AppData" / "Local" / "WinWisp"
-        temp_dir = app_data / "recordings"
-        
-        # Ensure directory exists
-        try:
-            temp_dir.mkdir(parents=True, exist_ok=True)
-            print(f"Recording directory: {temp_dir}")
-        except Exception as e:
-            print(f"Error creating recordings directory: {e}")
-            # Fall back to current directory
-            temp_dir = Path("recordings")
-            temp_dir.mkdir(exist_ok=True)
-        
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        output_file = temp_dir / f"recording_{timestamp}.wav"
-        
-        try:
-            # Convert to int16 for WAV file
-            recording_int16 = (recording * 32767).astype(np.int16)
-            
-            # Save as WAV file
-            write_wav(str(output_file), self.sample_rate, recording_int16)
-            
-            print(f"Recording saved to: {output_file}")
-            return str(output_file)
-        except Exception as e:
-            print(f"Error saving recording: {e}")
-            return None
+        recording = recording.reshape(-1).astype(np.float32, copy=False)
+        self.timings['finalize'] = time.perf_counter() - finalize_start
+        return recording
+    
+    def apply_config(self, changes):
+        """Apply changed settings (config key -> value); they take effect from the next recording"""
+        if "capture_native_rate" in changes:
+            self.native_rate = bool(changes["capture_native_rate"])
     
     def get_recording_duration(self):
         """Get current recording duration in seconds"""
@@ -0,0 +1,126 @@
+"""
+Benchmark: model load time and peak RSS, whisper.load_model vs mapped weights
+
+Each measurement runs in a fresh process so peak RSS is per load. The
+converted weight cache is created first if it is missing. Files are read
+once beforehand, so both methods are timed with a warm page cache.
+
+Usage:
+    python benchmarks/bench_model_load.py [--repeat 3] tiny base small
+    python benchmarks/bench_model_load.py path/to/checkpoint.pt
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB"""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports KB, macOS bytes
+        return peak / 1024 if sys.platform != "darwin" else peak / (1024 * 1024)
+    except ImportError:
+        import psutil
+        return psutil.Process().memory_info().peak_wset / (1024 * 1024)
+
+
+def resident_mb():
+    """(anonymous, file-backed) resident memory in MB; file pages are shareable"""
+    try:
+        with open("/proc/self/status") as f:
+            fields = dict(line.split(":", 1) for line in f)
+        return int(fields["RssAnon"].split()[0]) / 1024, int(fields["RssFile"].split()[0]) / 1024
+    except (OSError, KeyError):
+        import psutil
+        info = psutil.Process().memory_info()
+        return info.private / (1024 * 1024), max(0, info.rss - info.private) / (1024 * 1024)
+
+
+def child(method, checkpoint):
+    import torch
+    import whisper
+    import weight_cache
+
+    start = time.perf_counter()
+    if method == "mmap":
+        model = weight_cache.load(checkpoint, "cpu")
+    else:
+        model = whisper.load_model(checkpoint, device="cpu")
+    elapsed = time.perf_counter() - start
+    peak = peak_rss_mb()
+
+    # Touch every weight once, as the first transcription would
+    with torch.no_grad():
+        checksum = sum(float(p.sum()) for p in model.parameters())
+    anonymous, shared = resident_mb()
+
+    print(json.dumps({
+        "seconds": elapsed,
+        "peak_mb": peak,
+        "anonymous_mb": anonymous,
+        "shared_mb": shared,
+        "checksum": checksum,
+    }))
+
+
+def warm(path):
+    with open(path, "rb") as f:
+        while f.read(16 * 1024 * 1024):
+            pass
+
+
+def measure(method, checkpoint):
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", method, checkpoint],
+        check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("models", nargs="*", default=["tiny", "base", "small"], help="Model names or checkpoint paths")
+    parser.add_argument("--repeat", type=int, default=3, help="Loads per method (best time is reported)")
+    parser.add_argument("--child", nargs=2, metavar=("METHOD", "CHECKPOINT"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(*args.child)
+        return
+
+    import weight_cache
+    from model_manager import ModelManager
+
+    manager = ModelManager()
+    print("Peak RSS is measured right after loading; private/shared RSS after every weight was read once")
+    print(f"{'model':>12} {'method':>7} {'load s':>8} {'peak RSS MB':>12} {'private MB':>11} {'shared MB':>10}")
+    for name in args.models:
+        checkpoint = str(manager.download(name))
+        if not weight_cache.is_current(checkpoint):
+            print(f"Converting {name}...")
+            weight_cache.convert(checkpoint)
+        warm(checkpoint)
+        warm(weight_cache.cache_path(checkpoint))
+
+        checksums = set()
+        for method in ("eager", "mmap"):
+            runs = [measure(method, checkpoint) for _ in range(args.repeat)]
+            best = min(runs, key=lambda r: r["seconds"])
+            checksums.add(round(best["checksum"], 3))
+            print(
+                f"{os.path.basename(name):>12} {method:>7} {best['seconds']:>8.2f} "
+                f"{best['peak_mb']:>12.0f} {best['anonymous_mb']:>11.0f} {best['shared_mb']:>10.0f}"
+            )
+        if len(checksums) != 1:
+            print(f"  warning: weights differ between methods for {name}")
+
+
+if __name__ == "__main__":
+    main()
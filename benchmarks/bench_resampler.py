@@ -0,0 +1,60 @@
+"""
+Benchmark: CPU cost of streaming resampling per second of captured audio
+
+Usage:
+    python benchmarks/bench_resampler.py [--seconds 30] [--block-ms 10]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from resampler import StreamingResampler, downmix
+
+
+CASES = [
+    (48000, 1),
+    (48000, 2),
+    (44100, 1),
+    (44100, 2),
+    (96000, 2),
+    (22050, 1),
+]
+
+
+def run_case(rate, channels, seconds, block_ms):
+    rng = np.random.default_rng(0)
+    audio = (rng.standard_normal((rate * seconds, channels)) * 0.1).astype(np.float32)
+    block = max(1, rate * block_ms // 1000)
+
+    resampler = StreamingResampler(rate)
+    produced = 0
+
+    start = time.process_time()
+    for offset in range(0, len(audio), block):
+        produced += len(resampler.process(downmix(audio[offset:offset + block])))
+    produced += len(resampler.flush())
+    elapsed = time.process_time() - start
+
+    return elapsed / seconds, produced
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seconds", type=int, default=30, help="Length of synthetic audio")
+    parser.add_argument("--block-ms", type=int, default=10, help="Callback block size")
+    args = parser.parse_args()
+
+    print(f"{'input':>12} {'ch':>3} {'CPU ms / audio s':>17} {'realtime x':>11} {'samples out':>12}")
+    for rate, channels in CASES:
+        cost, produced = run_case(rate, channels, args.seconds, args.block_ms)
+        speed = float("inf") if cost == 0 else 1.0 / cost
+        print(f"{rate:>10}Hz {channels:>3} {cost * 1000:>17.2f} {speed:>11.0f} {produced:>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -19,6 +19,7 @@ a = Analysis(
         'sounddevice',
         'scipy',
         'scipy.io.wavfile',
+        'soundfile',
         'keyboard',
         'pystray',
         'pynput',
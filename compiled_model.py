@@ -0,0 +1,243 @@
+"""
+Optional compiled inference: TorchScript-traced or torch.compile'd encoder
+and decoder step
+
+Only the decoder's one-token steps on fast_decoding's static kv-cache are
+compiled (fast_decoding.decode_step, fixed shapes per batch size). The
+prompt step, and every step with whisper's own kv-cache (hooks that grow a
+dict, which makes torch.compile recompile on every layer and length), stay
+eager.
+"""
+import logging
+import os
+import time
+import warnings
+from functools import partial
+from pathlib import Path
+
+import torch
+
+import fast_decoding
+
+
+logger = logging.getLogger(__name__)
+
+COMPILE_MODES = ("off", "trace", "compile")
+
+
+def artifact_dir(cache_dir, key, device):
+    """Per model, device and torch version, since artifacts are only valid for that combination"""
+    version = torch.__version__.replace("+", "-")
+    return Path(cache_dir) / f"{key}-{device}-torch{version}"
+
+
+def apply(model, mode, cache_dir, key, source=None):
+    """
+    Switch model to a compiled mode in place and warm it up.
+
+    Args:
+        model: Loaded Whisper model
+        mode: "trace" (TorchScript encoder and decoder step, saved to
+            disk) or "compile" (torch.compile, inductor kernels cached on disk)
+        cache_dir: Root directory for compiled artifacts
+        key: Model name used in artifact paths
+        source: Checkpoint file; artifacts older than it are rebuilt
+
+    Returns True if the compiled path is active. On any failure the model
+    is left in eager mode.
+    """
+    device = next(model.parameters()).device
+    dtype = torch.float16 if device.type == "cuda" else torch.float32
+    directory = artifact_dir(cache_dir, key, device.type)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    start = time.perf_counter()
+    try:
+        if mode == "trace":
+            failures = _trace_encoder(model, directory, dtype, source)
+            if _static_kv(model):
+                failures = failures + _trace_decoder(model, directory, dtype, source)
+        elif mode == "compile":
+            failures = _compile(model, directory, dtype)
+        else:
+            return False
+        # The warm-up must have gone through the compiled path
+        if failures:
+            raise failures[0]
+    except Exception as e:
+        restore_eager(model)
+        logger.warning(f"Compiled mode '{mode}' unavailable, using eager mode: {e}")
+        return False
+
+    logger.info(f"Compiled mode '{mode}' ready in {time.perf_counter() - start:.1f}s")
+    return True
+
+
+def restore_eager(model):
+    """Drop the compiled encoder and decoder step installed by apply()"""
+    model.encoder.__dict__.pop("forward", None)
+    model.decoder.__dict__.pop("compiled_step", None)
+
+
+def _install(module, fast, name):
+    """
+    Route module calls through fast, falling back to eager for good if it
+    raises. Returns the list the failure is recorded in.
+    """
+    eager = type(module).forward.__get__(module)
+    failed = []
+
+    def forward(*args, **kwargs):
+        if not failed:
+            try:
+                return fast(*args, **kwargs)
+            except Exception as e:
+                failed.append(e)
+                logger.warning(f"Compiled {name} failed, using eager mode: {e}")
+        return eager(*args, **kwargs)
+
+    module.forward = forward
+    return failed
+
+
+def _install_step(decoder, build):
+    """
+    Route fast_decoding's one-token steps through compiled steps that
+    build(*inputs) makes for each new input shape, falling back to eager
+    for good if one raises. Returns the list the failure is recorded in.
+    """
+    steps = {}
+    failed = []
+
+    def step(*inputs):
+        if not failed:
+            shape = tuple(tuple(tensor.shape) for tensor in inputs) + (inputs[-1].dtype,)
+            try:
+                if shape not in steps:
+                    steps[shape] = build(*inputs)
+                return steps[shape](*inputs)
+            except Exception as e:
+                failed.append(e)
+                logger.warning(f"Compiled decoder failed, using eager mode: {e}")
+        return fast_decoding.decode_step(decoder, *inputs)
+
+    decoder.compiled_step = step
+    return failed
+
+
+def _static_kv(model):
+    """Whether the decoder runs on fast_decoding's static kv-cache"""
+    return getattr(model.decoder.__dict__.get("forward"), "static_kv", False)
+
+
+def _step_inputs(model, dtype, n_batch=1):
+    """Inputs of a greedy decode's first one-token step"""
+    device = next(model.parameters()).device
+    dims = model.dims
+    return (
+        torch.zeros((n_batch, 1), dtype=torch.long, device=device),
+        torch.zeros(1, dtype=torch.long, device=device),
+        torch.zeros((2, dims.n_text_layer, n_batch, dims.n_text_ctx, dims.n_text_state), dtype=dtype, device=device),
+        torch.zeros((2, dims.n_text_layer, 1, dims.n_audio_ctx, dims.n_text_state), dtype=dtype, device=device),
+    )
+
+
+class _DecoderStep(torch.nn.Module):
+    """fast_decoding.decode_step as a module, so a trace of it can be saved"""
+
+    def __init__(self, decoder):
+        super().__init__()
+        self.decoder = decoder
+
+    def forward(self, tokens, offset, self_kv, cross_kv):
+        return fast_decoding.decode_step(self.decoder, tokens, offset, self_kv, cross_kv)
+
+
+def _mel_shape(model):
+    # Whisper always pads the log-mel input to 30 s (twice the encoder context)
+    return (1, model.dims.n_mels, model.dims.n_audio_ctx * 2)
+
+
+def _trace_encoder(model, directory, dtype, source):
+    """Load the traced encoder from disk, or trace and save it"""
+    device = next(model.parameters()).device
+    shape = _mel_shape(model)
+    path = directory / f"encoder-{str(dtype).split('.')[-1]}.ts"
+
+    fresh = path.exists() and (source is None or path.stat().st_mtime >= os.path.getmtime(source))
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")  # TorchScript deprecation notices
+        if fresh:
+            traced = torch.jit.load(str(path), map_location=device)
+        else:
+            example = torch.zeros(shape, dtype=dtype, device=device)
+            with torch.no_grad():
+                traced = torch.jit.trace(model.encoder, example)
+            temp = path.with_name(path.name + ".tmp")
+            torch.jit.save(traced, str(temp))
+            os.replace(temp, path)
+
+    eager = type(model.encoder).forward.__get__(model.encoder)
+
+    def fast(x):
+        # The trace is only valid for the shape and dtype it was made with
+        if tuple(x.shape) != shape or x.dtype != dtype:
+            return eager(x)
+        return traced(x)
+
+    failed = _install(model.encoder, fast, "encoder")
+    with torch.no_grad():
+        model.encoder(torch.zeros(shape, dtype=dtype, device=device))
+    return failed
+
+
+def _trace_decoder(model, directory, dtype, source):
+    """
+    Trace the decoder step per input shape (in practice one per batch
+    size), loading traces from disk when there is one
+    """
+    device = next(model.parameters()).device
+    module = _DecoderStep(model.decoder)
+
+    def build(tokens, offset, self_kv, cross_kv):
+        n_batch, n_audio = tokens.shape[0], cross_kv.shape[2]
+        path = directory / f"decoder-{str(self_kv.dtype).split('.')[-1]}-{n_batch}x{n_audio}.ts"
+        fresh = path.exists() and (source is None or path.stat().st_mtime >= os.path.getmtime(source))
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            if fresh:
+                return torch.jit.load(str(path), map_location=device)
+            # Tracing runs the step, which writes the same slot again when called for real
+            with torch.no_grad():
+                traced = torch.jit.trace(module, (tokens, offset, self_kv, cross_kv), check_trace=False)
+            temp = path.with_name(path.name + ".tmp")
+            torch.jit.save(traced, str(temp))
+            os.replace(temp, path)
+            return traced
+
+    failed = _install_step(model.decoder, build)
+    with torch.no_grad():
+        model.decoder.compiled_step(*_step_inputs(model, dtype))
+    return failed
+
+
+def _compile(model, directory, dtype):
+    """torch.compile the encoder (and decoder step) and run them once so compilation happens now"""
+    # Inductor reuses generated kernels from here on later launches
+    os.environ["TORCHINDUCTOR_CACHE_DIR"] = str(directory / "inductor")
+
+    eager = type(model.encoder).forward.__get__(model.encoder)
+    # The input shape never changes, so a static graph is enough
+    failed = _install(model.encoder, torch.compile(eager, dynamic=False), "encoder")
+
+    device = next(model.parameters()).device
+    with torch.no_grad():
+        model.encoder(torch.zeros(_mel_shape(model), dtype=dtype, device=device))
+
+    if _static_kv(model):
+        # Shapes only change with the batch size, so static graphs again
+        step = torch.compile(partial(fast_decoding.decode_step, model.decoder), dynamic=False)
+        failed = failed + _install_step(model.decoder, lambda *inputs: step)
+        with torch.no_grad():
+            model.decoder.compiled_step(*_step_inputs(model, dtype))
+    return failed
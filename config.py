@@ -1,32 +1,99 @@
 """
 Configuration management for WinWisp
 """
+import atexit
 import json
 import os
+import threading
 from pathlib import Path
 
-# Use Windows AppData directory for config
+# Use Windows AppData directory for config (created on first save)
 CONFIG_DIR = Path.home() / "AppData" / "Local" / "WinWisp"
-CONFIG_DIR.mkdir(parents=True, exist_ok=True)
 CONFIG_FILE = CONFIG_DIR / "config.json"
 
+# Changes are written this long after the last one, so a burst is one write
+SAVE_DELAY = 0.5
+
 DEFAULT_CONFIG = {
     "hotkey": "ctrl+shift+space",
-    "model": "small",  # tiny, base, small, medium, large
+    "hotkey_mode": "toggle",  # toggle, or push_to_talk (hold to record, release to transcribe)
+    "hotkey_debounce_ms": 200,
+    "model": "small",  # tiny, base, small, medium, large, turbo
+    "routing_enabled": False,  # Pick a model per utterance from routing_models to meet the latency target
+    "routing_latency_target_s": 3.0,  # Transcription time to aim for; longer clips get faster models
+    "routing_models": ["base", "small", "medium"],  # Models routing may use (downloaded in the background)
+    "model_base_url": "",  # Checkpoint server (empty = OpenAI's); same <sha256>/<file> layout
+    "model_idle_unload_minutes": 15,  # Free the model after this long unused (0 = keep loaded)
+    "model_unload_memory_percent": 90,  # Free an idle model when system RAM use reaches this (needs psutil; 0 = off)
+    "backend": "torch",  # torch, or onnx (ONNX Runtime on CPU; graphs exported from the checkpoint once)
+    "onnx_int8": False,  # onnx backend: use int8-quantized weights (smaller, faster, slightly less accurate)
+    "compile_mode": "off",  # off, trace (TorchScript) or compile (torch.compile) encoder and decoder step; cached on disk, eager on failure
+    "static_kv_cache": True,  # Decode with a preallocated kv-cache instead of whisper's growing one
+    "decode_max_repeats": 4,  # End a decode once a phrase repeats this many times in a row (0 = off)
+    "temperature_fallbacks": 2,  # Sampled retries when a window decodes badly (whisper's default is 5)
+    "hallucination_filter": True,  # Drop segments that look like loops or text invented over silence
+    "log_level": "INFO",  # DEBUG also logs transcription text
+    "log_json": True,  # One JSON object per line in the log files
+    "log_max_mb": 10,  # A day's log rolls over to a new part at this size
+    "log_max_parts": 5,  # Rolled-over parts kept per day, oldest deleted first (0 = keep all)
+    "log_retention_days": 14,  # Older log files are deleted (0 = keep all)
+    "history": True,  # Keep every transcription in a searchable history (history.db)
+    "mmap_weights": True,  # Keep an fp32 copy of the model that loads by memory-mapping (2x disk, faster start)
     "language": "en",  # Auto-detect if empty, or specify language code
     "auto_paste": True,
+    "output_mode": "paste",  # paste (all at once), or incremental (type text as it is decoded)
+    "incremental_insert": "type",  # How incremental mode inserts text: type or paste
+    "incremental_final_pass": False,  # Re-transcribe the whole clip at the end and correct the typed text
+    "capture_native_rate": False,  # Record at the device's rate and resample to 16 kHz in-process
+    "auto_stop": False,  # Stop recording automatically when you stop talking
+    "auto_stop_silence_ms": 800,  # Trailing silence that ends an utterance
+    "auto_stop_min_speech_ms": 300,  # Speech required before silence can end it
+    "auto_stop_max_seconds": 120,  # Hard cap on a single recording
+    "transcription_cache": True,  # Reuse the text when the same audio is transcribed again with the same settings
+    "transcription_cache_mb": 10,  # Size cap; least recently used entries are dropped
+    "retranscribe_keep": 3,  # Recent utterances kept in memory (audio and mel features) for re-transcription
+    "retranscribe_hotkey": "ctrl+alt+shift+r",  # Re-transcribe the last utterance and replace its text ("" = off)
+    "retranscribe_model": "",  # Model for re-transcription; "" = next larger downloaded model
+    "retranscribe_beam_size": 5,  # Beam search width when re-transcribing (torch backend; 0 = greedy)
+    "telemetry": True,  # Per-stage latency metrics in logs/metrics_<date>.jsonl
     "save_recordings": False,
-    "recordings_dir": str(CONFIG_DIR / "recordings")
+    "recordings_dir": str(CONFIG_DIR / "recordings"),
+    "recording_format": "flac",  # wav, flac (lossless) or opus (lossy)
+    "recordings_max_total_mb": 0,  # 0 = unlimited
+    "recordings_max_age_days": 0  # 0 = keep forever
 }
 
 
 class Config:
-    def __init__(self):
-        self.config_path = CONFIG_FILE
-        self.data = self.load()
-        # Ensure recordings directory exists
-        if self.data.get('save_recordings'):
-            Path(self.data['recordings_dir']).mkdir(parents=True, exist_ok=True)
+    """
+    Settings from config.json, loaded on first access.
+    
+    set() and update() write the file a moment later (one write per burst
+    of changes) through a temp file and rename, so a crash never leaves a
+    half-written config. Components subscribe to the keys they use and are
+    called with the values that actually changed.
+    """
+    
+    def __init__(self, config_path=CONFIG_FILE):
+        self.config_path = Path(config_path)
+        self._data = None
+        self.lock = threading.RLock()
+        # Orders file writes, so an older snapshot never replaces a newer one
+        self.save_lock = threading.Lock()
+        self.save_timer = None
+        self.subscribers = []
+        atexit.register(self.flush)
+    
+    @property
+    def data(self):
+        if self._data is None:
+            with self.lock:
+                if self._data is None:
+                    self._data = self.load()
+                    # Ensure recordings directory exists
+                    if self._data.get('save_recordings'):
+                        Path(self._data['recordings_dir']).mkdir(parents=True, exist_ok=True)
+        return self._data
     
     def load(self):
         """Load configuration from file or create default"""
@@ -42,14 +109,41 @@ class Config:
         return DEFAULT_CONFIG.copy()
     
     def save(self):
-        """Save configuration to file"""
-        try:
-            with open(self.config_path, 'w') as f:
-                json.dump(self.data, f, indent=4)
-            return True
-        except Exception as e:
-            print(f"Error saving config: {e}")
-            return False
+        """Save configuration to file now (atomically)"""
+        with self.save_lock:
+            # Snapshot under the lock; the write and fsync happen outside it
+            with self.lock:
+                if self.save_timer:
+                    self.save_timer.cancel()
+                    self.save_timer = None
+                text = json.dumps(self.data, indent=4)
+            temp = self.config_path.with_name(self.config_path.name + ".tmp")
+            try:
+                self.config_path.parent.mkdir(parents=True, exist_ok=True)
+                with open(temp, 'w') as f:
+                    f.write(text)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(temp, self.config_path)
+                return True
+            except Exception as e:
+                print(f"Error saving config: {e}")
+                return False
+    
+    def _schedule_save(self):
+        with self.lock:
+            if self.save_timer:
+                self.save_timer.cancel()
+            self.save_timer = threading.Timer(SAVE_DELAY, self.save)
+            self.save_timer.daemon = True
+            self.save_timer.start()
+    
+    def flush(self):
+        """Write pending changes now"""
+        with self.lock:
+            pending = self.save_timer is not None
+        if pending:
+            self.save()
     
     def get(self, key, default=None):
         """Get configuration value"""
@@ -57,14 +151,37 @@ class Config:
     
     def set(self, key, value):
         """Set configuration value"""
-        self.data[key] = value
-        self.save()
+        return self.update({key: value})
     
     def update(self, updates):
-        """Update multiple configuration values"""
-        self.data.update(updates)
-        self.save()
+        """Update multiple configuration values; returns the ones that changed"""
+        with self.lock:
+            changes = {key: value for key, value in updates.items() if self.data.get(key) != value}
+            self.data.update(changes)
+            if changes:
+                self._schedule_save()
+            subscribers = list(self.subscribers)
+        
+        # Outside the lock: callbacks may read or change the config
+        for keys, callback in subscribers:
+            relevant = {key: value for key, value in changes.items() if key in keys}
+            if relevant:
+                try:
+                    callback(relevant)
+                except Exception as e:
+                    print(f"Error applying config change {relevant}: {e}")
+        return changes
+    
+    def subscribe(self, keys, callback):
+        """Call callback({key: new value}) when any of keys changes"""
+        with self.lock:
+            self.subscribers.append((frozenset(keys), callback))
+        return callback
+    
+    def unsubscribe(self, callback):
+        with self.lock:
+            self.subscribers = [entry for entry in self.subscribers if entry[1] != callback]
 
 
-# Global config instance
+# Global config instance (reads config.json on first use)
 config = Config()
@@ -0,0 +1,75 @@
+"""
+Bounds on decoding and filters for hallucinated output
+
+Whisper can loop on a phrase until it runs out of tokens, or invent text
+over near-silence. These helpers bound how much a clip may decode, detect
+loops as they happen, and decide which decoded segments to throw away.
+They use no torch, so both backends share them.
+"""
+import zlib
+
+
+# Generous upper bound on speech rate, timestamp tokens included
+TOKENS_PER_SECOND = 12
+MIN_SAMPLE_LEN = 32
+
+# An n-gram repeated this many times in a row ends the decode (twice as
+# many for a single token, which legitimately repeats more often)
+MAX_REPEATS = 4
+MAX_NGRAM = 16
+
+# Segment quality thresholds, the same ones whisper uses for fallback
+NO_SPEECH_THRESHOLD = 0.6
+LOGPROB_THRESHOLD = -1.0
+COMPRESSION_RATIO_THRESHOLD = 2.4
+
+
+def sample_len_for(seconds, n_text_ctx=448):
+    """Most tokens worth decoding for a clip of the given length"""
+    return max(MIN_SAMPLE_LEN, min(n_text_ctx // 2, int(seconds * TOKENS_PER_SECOND) + MIN_SAMPLE_LEN))
+
+
+def fallback_temperatures(fallbacks):
+    """Temperatures for whisper's fallback: greedy, then up to fallbacks sampled retries up to 1.0"""
+    if fallbacks <= 0:
+        return (0.0,)
+    return tuple(round(i / fallbacks, 2) for i in range(fallbacks + 1))
+
+
+def is_looping(tokens, max_repeats=MAX_REPEATS, max_ngram=MAX_NGRAM):
+    """True if tokens end with the same n-gram max_repeats times in a row"""
+    for n in range(1, max_ngram + 1):
+        span = n * (max_repeats * 2 if n == 1 else max_repeats)
+        if len(tokens) < span:
+            break
+        tail = tokens[-span:]
+        if all(tail[i] == tail[i - n] for i in range(n, span)):
+            return True
+    return False
+
+
+def compression_ratio(text):
+    """Length of text over its zlib-compressed length; loops compress well"""
+    data = text.encode("utf-8")
+    return len(data) / len(zlib.compress(data)) if data else 0.0
+
+
+def is_hallucination(segment):
+    """
+    True for a segment that is probably not speech: a loop that survived
+    every fallback, or confident silence decoded with low confidence
+    """
+    if segment.get("compression_ratio", 0.0) > COMPRESSION_RATIO_THRESHOLD:
+        return True
+    return (
+        segment.get("no_speech_prob", 0.0) > NO_SPEECH_THRESHOLD
+        and segment.get("avg_logprob", 0.0) < LOGPROB_THRESHOLD
+    )
+
+
+def gate_segments(segments):
+    """(kept, dropped) segments of a transcribe() result"""
+    kept, dropped = [], []
+    for segment in segments:
+        (dropped if is_hallucination(segment) else kept).append(segment)
+    return kept, dropped
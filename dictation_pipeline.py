@@ -0,0 +1,176 @@
+"""
+Per-utterance dictation state machine with pipelined transcription
+"""
+import itertools
+import queue
+import threading
+import time
+
+
+# Utterance states, in the order an utterance moves through them
+IDLE = "idle"
+RECORDING = "recording"
+QUEUED = "queued"
+TRANSCRIBING = "transcribing"
+PASTING = "pasting"
+DONE = "done"
+FAILED = "failed"
+
+
+class Utterance:
+    """One dictation: its audio, result and current state"""
+
+    _ids = itertools.count(1)
+
+    def __init__(self):
+        self.id = next(self._ids)
+        self.state = IDLE
+        self.audio = None
+        self.sample_rate = 16000
+        self.audio_file = None
+        self.text = None
+        self.error = None
+        self.streamed = False  # Text was already typed while transcribing
+        self.metrics = None  # Optional telemetry.UtteranceMetrics
+        self.history_key = None  # Key of its history entry, once stored
+        self.created_at = time.time()
+
+    @property
+    def duration(self):
+        """Length of the recorded audio in seconds"""
+        if self.audio is None:
+            return 0.0
+        return len(self.audio) / self.sample_rate
+
+    @property
+    def finished(self):
+        return self.state in (DONE, FAILED)
+
+    def __repr__(self):
+        return f"<Utterance {self.id} {self.state}>"
+
+
+class DictationPipeline:
+    """
+    Moves utterances through recording -> queued -> transcribing -> pasting.
+
+    Transcription and output each run on their own worker and take
+    utterances strictly in submission order, so a new utterance can be
+    recorded (and transcribed) while an earlier one is still in flight,
+    and results are always delivered in the order they were spoken.
+
+    Args:
+        transcribe: Called as transcribe(utterance) -> (text, error)
+        output: Called as output(utterance) to paste a successful result
+        on_state_change: Optional listener called as on_state_change(utterance)
+    """
+
+    def __init__(self, transcribe, output, on_state_change=None):
+        self.transcribe = transcribe
+        self.output = output
+        self.on_state_change = on_state_change
+
+        self.transcribe_queue = queue.Queue()
+        self.output_queue = queue.Queue()
+        self.in_flight = 0
+        self.is_transcribing = False
+        self.lock = threading.Lock()
+
+        self.workers = [
+            threading.Thread(target=self._transcribe_worker, daemon=True),
+            threading.Thread(target=self._output_worker, daemon=True),
+        ]
+        for worker in self.workers:
+            worker.start()
+
+    def _set_state(self, utterance, state):
+        utterance.state = state
+        if utterance.finished:
+            with self.lock:
+                self.in_flight -= 1
+        if self.on_state_change:
+            try:
+                self.on_state_change(utterance)
+            except Exception as e:
+                print(f"Error in utterance state listener: {e}")
+
+    def begin(self):
+        """Create a new utterance in the recording state"""
+        utterance = Utterance()
+        with self.lock:
+            self.in_flight += 1
+        self._set_state(utterance, RECORDING)
+        return utterance
+
+    def submit(self, utterance, audio, sample_rate=16000):
+        """Hand a finished recording to the transcription queue"""
+        utterance.audio = audio
+        utterance.sample_rate = sample_rate
+        self._set_state(utterance, QUEUED)
+        self.transcribe_queue.put(utterance)
+
+    def cancel(self, utterance, error=None):
+        """Finish an utterance that will not be transcribed"""
+        utterance.error = error
+        self._set_state(utterance, FAILED if error else DONE)
+
+    def pending(self):
+        """Number of utterances that have not finished yet"""
+        with self.lock:
+            return self.in_flight
+
+    def wait_for_output(self):
+        """
+        Block until every utterance handed to the output stage has been delivered.
+
+        Called from the transcription worker, this means all earlier
+        utterances are on screen, so streamed output stays in order.
+        """
+        self.output_queue.join()
+
+    def _transcribe_worker(self):
+        while True:
+            utterance = self.transcribe_queue.get()
+            if utterance is None:
+                self.output_queue.put(None)
+                return
+
+            self._set_state(utterance, TRANSCRIBING)
+            self.is_transcribing = True
+            try:
+                utterance.text, utterance.error = self.transcribe(utterance)
+            except Exception as e:
+                utterance.text, utterance.error = None, str(e)
+            finally:
+                self.is_transcribing = False
+            self.output_queue.put(utterance)
+
+    def _output_worker(self):
+        while True:
+            utterance = self.output_queue.get()
+            try:
+                if utterance is None:
+                    return
+                self._deliver(utterance)
+            finally:
+                self.output_queue.task_done()
+
+    def _deliver(self, utterance):
+        if utterance.error or not utterance.text:
+            self._set_state(utterance, FAILED if utterance.error else DONE)
+            return
+
+        self._set_state(utterance, PASTING)
+        try:
+            self.output(utterance)
+        except Exception as e:
+            utterance.error = f"Error delivering text: {e}"
+            self._set_state(utterance, FAILED)
+            return
+        self._set_state(utterance, DONE)
+
+    def shutdown(self):
+        """Finish queued utterances and stop the workers"""
+        self.transcribe_queue.put(None)
+        for worker in self.workers:
+            worker.join(timeout=5)
@@ -0,0 +1,16 @@
+"""
+Headless WinWisp engine: dictation without Tk, the tray or Windows-only modules
+
+Run it with `python -m engine --help`.
+"""
+from .core import DictationEngine, load_audio
+from .outputs import FileOutput, SocketOutput, StreamOutput, open_output
+
+__all__ = [
+    "DictationEngine",
+    "load_audio",
+    "FileOutput",
+    "SocketOutput",
+    "StreamOutput",
+    "open_output",
+]
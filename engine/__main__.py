@@ -0,0 +1,102 @@
+"""
+Command line for the headless engine
+
+Examples:
+    python -m engine transcribe meeting.flac notes.wav
+    python -m engine transcribe --format json --output file:out.jsonl *.wav
+    python -m engine listen --output tcp:127.0.0.1:7070
+"""
+import argparse
+import logging
+import signal
+import sys
+import threading
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m engine",
+        description="WinWisp speech-to-text without the GUI",
+        epilog=__doc__.split("Examples:")[1].rstrip(),
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--model", default="small", help="Whisper model name or checkpoint path (default: small)")
+    parser.add_argument("--language", default="en", help="Language code; empty string to auto-detect (default: en)")
+    parser.add_argument("--output", default="-", help="-, file:PATH or tcp:HOST:PORT (default: stdout)")
+    parser.add_argument("--format", choices=("text", "json"), default="text", help="One line of text or JSON per utterance")
+    parser.add_argument("--model-base-url", default=None, help="Checkpoint mirror with the same layout as OpenAI's")
+    parser.add_argument("--backend", choices=("torch", "onnx"), default="torch", help="Inference backend (default: torch)")
+    parser.add_argument("--int8", action="store_true", help="Use int8-quantized graphs with --backend onnx")
+    parser.add_argument("--cache-dir", default=None, help="Transcription cache (default: winwisp/transcriptions in the user cache)")
+    parser.add_argument("--no-cache", action="store_true", help="Always run the model, even for audio seen before")
+    parser.add_argument("--no-mmap", action="store_true", help="Don't use the memory-mapped weight cache")
+
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    transcribe = commands.add_parser("transcribe", help="Transcribe audio files")
+    transcribe.add_argument("files", nargs="+", help="Audio files (WAV/FLAC/OGG; others need ffmpeg)")
+
+    listen = commands.add_parser("listen", help="Transcribe from the microphone until interrupted")
+    listen.add_argument("--silence-ms", type=int, default=800, help="Pause that ends an utterance")
+    listen.add_argument("--min-speech-ms", type=int, default=300, help="Speech needed before a pause counts")
+    listen.add_argument("--max-seconds", type=float, default=60, help="Longest utterance")
+    listen.add_argument("--native-rate", action="store_true", help="Capture at the device rate and resample")
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    # Results own stdout; diagnostics from the components go to stderr
+    results = sys.stdout
+    sys.stdout = sys.stderr
+    logging.basicConfig(level=logging.INFO, format="%(message)s", stream=sys.stderr)
+
+    from engine.core import DictationEngine
+    from model_manager import default_cache_dir
+    from engine.outputs import SocketOutput, open_output
+
+    try:
+        output = open_output(args.output, args.format, stream=results)
+    except (ValueError, OSError) as e:
+        print(f"Error opening output: {e}")
+        return 2
+    if isinstance(output, SocketOutput):
+        print(f"Serving results on {output.address[0]}:{output.address[1]}")
+
+    engine = DictationEngine(
+        output,
+        model=args.model,
+        language=args.language or None,
+        model_base_url=args.model_base_url,
+        mmap_weights=not args.no_mmap,
+        backend=args.backend,
+        onnx_int8=args.int8,
+        cache_dir=None if args.no_cache else (args.cache_dir or default_cache_dir().parent / "winwisp" / "transcriptions")
+    )
+
+    try:
+        if args.command == "transcribe":
+            engine.transcribe_files(args.files)
+        else:
+            stop = threading.Event()
+            signal.signal(signal.SIGINT, lambda *_: stop.set())
+            if hasattr(signal, "SIGTERM"):
+                signal.signal(signal.SIGTERM, lambda *_: stop.set())
+            print("Listening; press Ctrl+C to stop")
+            engine.listen(
+                stop,
+                silence_ms=args.silence_ms,
+                min_speech_ms=args.min_speech_ms,
+                max_seconds=args.max_seconds,
+                native_rate=args.native_rate
+            )
+    finally:
+        engine.close()
+
+    return 1 if engine.failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
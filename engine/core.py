@@ -0,0 +1,165 @@
+"""
+Dictation engine: audio in, text out, no UI
+"""
+import threading
+
+import numpy as np
+
+from dictation_pipeline import DictationPipeline
+from resampler import StreamingResampler, downmix
+
+
+SAMPLE_RATE = 16000
+
+
+def load_audio(path, sample_rate=SAMPLE_RATE):
+    """Read an audio file as mono float32 at sample_rate"""
+    try:
+        import soundfile as sf
+        data, rate = sf.read(path, dtype="float32", always_2d=True)
+    except Exception:
+        if not str(path).lower().endswith(".wav"):
+            # Compressed formats libsndfile can't read: let whisper use ffmpeg
+            import whisper
+            return whisper.load_audio(str(path), sample_rate)
+        from scipy.io import wavfile
+        rate, data = wavfile.read(path)
+        if data.dtype == np.uint8:
+            data = (data.astype(np.float32) - 128) / 128
+        elif data.dtype.kind == "i":
+            data = data.astype(np.float32) / np.iinfo(data.dtype).max
+
+    audio = downmix(data)
+    if rate != sample_rate:
+        resampler = StreamingResampler(rate, sample_rate)
+        audio = np.concatenate([resampler.process(audio), resampler.flush()])
+    return audio
+
+
+class DictationEngine:
+    """
+    The recording -> transcription -> output pipeline of WinWisp without
+    the GUI, tray, hotkeys or clipboard.
+
+    The model is loaded on the first utterance (or load()), and the
+    microphone stack only when listen() is called.
+
+    Args:
+        output: Object with write(utterance) and close(), see engine.outputs
+        model: Whisper model name or checkpoint path
+        language: Language code, or None to auto-detect
+        model_base_url: Optional checkpoint mirror for ModelManager
+        mmap_weights: Load weights through the memory-mapped cache
+        backend: "torch" or "onnx" (see onnx_backend)
+        onnx_int8: Use int8-quantized graphs with the onnx backend
+        cache_dir: Directory of a TranscriptionCache, so re-runs over the
+            same audio skip the model (None to disable)
+    """
+
+    def __init__(self, output, model="small", language="en", model_base_url=None, mmap_weights=True,
+                 backend="torch", onnx_int8=False, cache_dir=None):
+        from model_manager import ModelManager
+        from transcription_cache import TranscriptionCache
+        from whisper_handler import WhisperHandler
+
+        self.output = output
+        self.cache = TranscriptionCache(cache_dir) if cache_dir else None
+        self.whisper_handler = WhisperHandler(
+            model_name=model,
+            language=language,
+            model_manager=ModelManager(base_url=model_base_url),
+            mmap_weights=mmap_weights,
+            backend=backend,
+            onnx_int8=onnx_int8,
+            cache=self.cache
+        )
+        self.pipeline = DictationPipeline(
+            transcribe=self._transcribe,
+            output=self.output.write,
+            on_state_change=self._on_state_change
+        )
+        self.failures = 0
+        self.idle = threading.Condition()
+
+    def load(self):
+        """Load the model now instead of on the first utterance"""
+        return self.whisper_handler.load_model()
+
+    def _transcribe(self, utterance):
+        result = {}
+
+        def capture(text, error):
+            result["text"], result["error"] = text, error
+
+        self.whisper_handler.transcribe(utterance.audio, capture)
+        return result.get("text"), result.get("error")
+
+    def _on_state_change(self, utterance):
+        if not utterance.finished:
+            return
+        if utterance.error:
+            self.failures += 1
+            print(f"Utterance {utterance.id} failed: {utterance.error}")
+        with self.idle:
+            self.idle.notify_all()
+
+    def submit(self, audio, source=None):
+        """Queue 16 kHz mono float32 audio for transcription"""
+        utterance = self.pipeline.begin()
+        utterance.audio_file = source
+        self.pipeline.submit(utterance, audio, SAMPLE_RATE)
+        return utterance
+
+    def transcribe_files(self, paths):
+        """Transcribe audio files in order, writing each result to the output"""
+        for path in paths:
+            try:
+                audio = load_audio(path)
+            except Exception as e:
+                self.failures += 1
+                print(f"Error reading {path}: {e}")
+                continue
+            self.submit(audio, source=str(path))
+        self.wait()
+
+    def listen(self, stop_event, silence_ms=800, min_speech_ms=300, max_seconds=60, native_rate=False):
+        """
+        Record from the default microphone until stop_event is set,
+        cutting utterances at pauses and transcribing each one.
+        """
+        from audio_recorder import AudioRecorder
+
+        recorder = AudioRecorder(native_rate=native_rate)
+        ended = threading.Event()
+        recorder.set_endpointing(
+            ended.set, silence_ms=silence_ms, min_speech_ms=min_speech_ms, max_seconds=max_seconds
+        )
+        self.whisper_handler.preload()
+
+        while not stop_event.is_set():
+            ended.clear()
+            if not recorder.start_recording():
+                print("Could not open the microphone")
+                self.failures += 1
+                return
+
+            while not (ended.wait(0.1) or stop_event.is_set()):
+                pass
+
+            audio = recorder.stop_recording()
+            # Clips that hit the length cap without any speech are dropped
+            heard = recorder.endpointer.speech_samples >= recorder.endpointer.min_speech_samples
+            if audio is not None and heard:
+                self.submit(audio, source="microphone")
+        self.wait()
+
+    def wait(self):
+        """Block until every submitted utterance has been output"""
+        with self.idle:
+            self.idle.wait_for(lambda: self.pipeline.pending() == 0)
+
+    def close(self):
+        self.pipeline.shutdown()
+        if self.cache:
+            self.cache.flush()
+        self.output.close()
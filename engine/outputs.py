@@ -0,0 +1,103 @@
+"""
+Destinations for transcribed text: a stream, a file or TCP clients
+"""
+import json
+import socket
+import sys
+import threading
+from datetime import datetime
+
+
+def format_result(utterance, fmt):
+    """One line of output for an utterance, as plain text or JSON"""
+    if fmt == "json":
+        return json.dumps({
+            "id": utterance.id,
+            "time": datetime.fromtimestamp(utterance.created_at).isoformat(timespec="seconds"),
+            "source": utterance.audio_file,
+            "seconds": round(utterance.duration, 2),
+            "text": utterance.text,
+        }, ensure_ascii=False)
+    return utterance.text
+
+
+class StreamOutput:
+    """Writes one line per utterance to a text stream (stdout by default)"""
+
+    def __init__(self, stream=None, fmt="text"):
+        self.stream = stream or sys.stdout
+        self.format = fmt
+
+    def write(self, utterance):
+        self.stream.write(format_result(utterance, self.format) + "\n")
+        self.stream.flush()
+
+    def close(self):
+        pass
+
+
+class FileOutput(StreamOutput):
+    """Appends one line per utterance to a UTF-8 file"""
+
+    def __init__(self, path, fmt="text"):
+        super().__init__(open(path, "a", encoding="utf-8"), fmt)
+
+    def close(self):
+        self.stream.close()
+
+
+class SocketOutput:
+    """
+    Listens on a TCP port and sends one line per utterance to every
+    connected client. Clients that disconnect are dropped.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, fmt="json"):
+        self.format = fmt
+        self.clients = []
+        self.lock = threading.Lock()
+
+        self.server = socket.create_server((host, port))
+        self.address = self.server.getsockname()[:2]
+        self.acceptor = threading.Thread(target=self._accept, daemon=True)
+        self.acceptor.start()
+
+    def _accept(self):
+        while True:
+            try:
+                client, _ = self.server.accept()
+            except OSError:
+                return  # Server closed
+            with self.lock:
+                self.clients.append(client)
+
+    def write(self, utterance):
+        line = (format_result(utterance, self.format) + "\n").encode("utf-8")
+        with self.lock:
+            for client in list(self.clients):
+                try:
+                    client.sendall(line)
+                except OSError:
+                    self.clients.remove(client)
+                    client.close()
+
+    def close(self):
+        self.server.close()
+        with self.lock:
+            for client in self.clients:
+                client.close()
+            self.clients = []
+
+
+def open_output(spec, fmt="text", stream=None):
+    """
+    Create an output from a spec: "-" (stdout), "file:PATH" or "tcp:HOST:PORT"
+    """
+    if spec in (None, "", "-", "stdout"):
+        return StreamOutput(stream, fmt)
+    if spec.startswith("file:"):
+        return FileOutput(spec[len("file:"):], fmt)
+    if spec.startswith("tcp:"):
+        host, _, port = spec[len("tcp:"):].rpartition(":")
+        return SocketOutput(host or "127.0.0.1", int(port), fmt)
+    raise ValueError(f"Unknown output: {spec} (use -, file:PATH or tcp:HOST:PORT)")
@@ -0,0 +1,269 @@
+"""
+Whisper decoding with a preallocated, fixed-size kv-cache
+
+whisper's own decoder caches keys/values through forward hooks that
+torch.cat every new token onto the cache, so each step reallocates and
+copies the whole cache of every layer. Here the self-attention cache is
+allocated once per decode, sized for the longest output the decode can
+produce, and written in place. Cross-attention keys/values are computed
+once from the audio features and shared by all beams/samples of a clip.
+
+Decodes can also end early when a sequence starts looping (RepetitionGuard),
+and each 30 s window decodes at most the tokens its own audio can hold.
+
+The one-token steps that make up most of a decode can be routed through a
+fixed-shape decode_step, which compiled_model traces or compiles.
+"""
+from dataclasses import replace
+from functools import partial
+
+import torch
+import torch.nn.functional as F
+from whisper.audio import HOP_LENGTH, SAMPLE_RATE
+from whisper.decoding import BeamSearchDecoder, DecodingOptions, DecodingTask, Inference, LogitFilter
+
+from decode_guards import MAX_REPEATS, is_looping, sample_len_for
+
+
+class StaticKVCache:
+    """
+    Self-attention keys/values of every decoder layer in one buffer of
+    shape (2, n_layer, n_batch, capacity, n_state), filled up to length,
+    plus cross-attention keys/values of shape (2, n_layer, n_audio,
+    n_audio_ctx, n_state) once they are computed.
+    """
+
+    def __init__(self, decoder, n_batch, capacity, dtype, device):
+        n_state = decoder.token_embedding.embedding_dim
+        # Zeroed, since decode_step attends over unfilled slots (masked out)
+        self.self_kv = torch.zeros(
+            (2, len(decoder.blocks), n_batch, capacity, n_state), dtype=dtype, device=device
+        )
+        self.cross_kv = None
+        self.length = 0
+
+    @property
+    def capacity(self):
+        return self.self_kv.shape[3]
+
+    def rearrange(self, source_indices):
+        """Reorder the batch after beam search picked which sequences continue"""
+        if source_indices == list(range(len(source_indices))):
+            return
+        index = torch.tensor(source_indices, device=self.self_kv.device)
+        filled = self.self_kv[:, :, :, :self.length]
+        filled.copy_(filled.index_select(2, index))
+
+
+def _attention(attn, q, k, v, mask=None):
+    """Multi-head attention of q over k/v with attn's head count and output projection"""
+    n_batch, n_ctx, _ = q.shape
+    q = q.view(n_batch, n_ctx, attn.n_head, -1).transpose(1, 2)
+    k = k.view(*k.shape[:2], attn.n_head, -1).transpose(1, 2)
+    v = v.view(*v.shape[:2], attn.n_head, -1).transpose(1, 2)
+    out = F.scaled_dot_product_attention(q, k, v, attn_mask=mask)
+    return attn.out(out.transpose(1, 2).flatten(start_dim=2))
+
+
+def _static_forward(decoder, x, xa, cache):
+    """TextDecoder.forward for the tokens not yet in cache"""
+    offset = cache.length
+    end = offset + x.shape[-1]
+    if end > cache.capacity:
+        raise RuntimeError(f"kv-cache full: {end} tokens, capacity {cache.capacity}")
+    if cache.cross_kv is not None and x.shape[-1] == 1 and "compiled_step" in decoder.__dict__:
+        # A fresh copy: the slice's strides change every step, which torch.compile would recompile for
+        tokens = x.clone(memory_format=torch.contiguous_format)
+        logits = decoder.compiled_step(tokens, torch.tensor([offset], device=x.device), cache.self_kv, cache.cross_kv)
+        cache.length = end
+        return logits
+
+    x = decoder.token_embedding(x) + decoder.positional_embedding[offset:end]
+    x = x.to(xa.dtype)
+    # A single new token may attend to everything cached so far
+    mask = decoder.mask[offset:end, :end].to(x.dtype) if x.shape[1] > 1 else None
+
+    if cache.cross_kv is None:
+        cache.cross_kv = torch.stack([
+            torch.stack((block.cross_attn.key(xa), block.cross_attn.value(xa))) for block in decoder.blocks
+        ], dim=1)
+    # Rows are n_group consecutive candidates per clip; with no mask in
+    # cross-attention, a clip's candidates can share one set of keys/values
+    # by stacking their queries along the sequence axis
+    n_batch, n_ctx = x.shape[:2]
+    n_audio = xa.shape[0]
+
+    for i, block in enumerate(decoder.blocks):
+        h = block.attn_ln(x)
+        keys, values = cache.self_kv[0, i], cache.self_kv[1, i]
+        keys[:, offset:end] = block.attn.key(h)
+        values[:, offset:end] = block.attn.value(h)
+        x = x + _attention(block.attn, block.attn.query(h), keys[:, :end], values[:, :end], mask)
+
+        h = block.cross_attn_ln(x)
+        q = block.cross_attn.query(h).reshape(n_audio, -1, h.shape[-1])
+        k, v = cache.cross_kv[:, i]
+        x = x + _attention(block.cross_attn, q, k, v).reshape(n_batch, n_ctx, -1)
+
+        x = x + block.mlp(block.mlp_ln(x))
+
+    cache.length = end
+    x = decoder.ln(x)
+    return (x @ torch.transpose(decoder.token_embedding.weight.to(x.dtype), 0, 1)).float()
+
+
+def decode_step(decoder, tokens, offset, self_kv, cross_kv):
+    """
+    _static_forward for one new token per sequence, with shapes fixed by
+    the cache rather than its fill level: it attends over the whole
+    self-attention buffer with the slots after offset masked out, so one
+    trace or compiled graph serves every step of a decode.
+
+    tokens is (n_batch, 1), offset a 1-element long tensor holding the
+    cache length; the new keys/values are written into self_kv.
+    """
+    n_batch = tokens.shape[0]
+    n_audio = cross_kv.shape[2]
+    positions = torch.arange(self_kv.shape[3], device=tokens.device).unsqueeze(0)
+
+    x = decoder.token_embedding(tokens) + decoder.positional_embedding.index_select(0, offset)
+    x = x.to(cross_kv.dtype)
+    mask = torch.zeros(positions.shape, dtype=x.dtype, device=x.device).masked_fill(
+        positions > offset, float("-inf")
+    )
+
+    for i, block in enumerate(decoder.blocks):
+        h = block.attn_ln(x)
+        keys, values = self_kv[0, i], self_kv[1, i]
+        keys.index_copy_(1, offset, block.attn.key(h))
+        values.index_copy_(1, offset, block.attn.value(h))
+        x = x + _attention(block.attn, block.attn.query(h), keys, values, mask)
+
+        h = block.cross_attn_ln(x)
+        q = block.cross_attn.query(h).reshape(n_audio, -1, h.shape[-1])
+        x = x + _attention(block.cross_attn, q, cross_kv[0, i], cross_kv[1, i]).reshape(n_batch, 1, -1)
+
+        x = x + block.mlp(block.mlp_ln(x))
+
+    x = decoder.ln(x)
+    return (x @ torch.transpose(decoder.token_embedding.weight.to(x.dtype), 0, 1)).float()
+
+
+class StaticKVInference(Inference):
+    """whisper Inference that decodes through a StaticKVCache"""
+
+    def __init__(self, model, capacity):
+        _install_forward(model.decoder)
+        self.model = model
+        self.capacity = capacity
+        self.cache = None
+
+    def logits(self, tokens, audio_features):
+        if self.cache is None:
+            self.cache = StaticKVCache(
+                self.model.decoder, tokens.shape[0], self.capacity,
+                audio_features.dtype, audio_features.device
+            )
+        # Only the tokens added since the last step are new
+        return self.model.decoder(tokens[:, self.cache.length:], audio_features, kv_cache=self.cache)
+
+    def rearrange_kv_cache(self, source_indices):
+        self.cache.rearrange(source_indices)
+
+    def cleanup_caching(self):
+        self.cache = None
+
+
+class StaticKVDecodingTask(DecodingTask):
+    """DecodingTask whose kv-cache holds exactly the tokens this decode can produce"""
+
+    def __init__(self, model, options):
+        super().__init__(model, options)
+        capacity = min(self.n_ctx, self.sample_begin + self.sample_len)
+        if "compiled_step" in model.decoder.__dict__:
+            # Compiled steps are built per cache shape; one capacity keeps that to one per batch size
+            capacity = self.n_ctx
+        self.inference = StaticKVInference(model, capacity)
+        if isinstance(self.decoder, BeamSearchDecoder):
+            self.decoder.inference = self.inference
+
+
+class RepetitionGuard(LogitFilter):
+    """Forces end-of-text on sequences whose sampled tokens have started looping"""
+
+    def __init__(self, eot, sample_begin, max_repeats=MAX_REPEATS):
+        self.eot = eot
+        self.sample_begin = sample_begin
+        self.max_repeats = max_repeats
+
+    def apply(self, logits, tokens):
+        for i, sampled in enumerate(tokens[:, self.sample_begin:].tolist()):
+            if is_looping(sampled, self.max_repeats):
+                logits[i, :] = -float("inf")
+                logits[i, self.eot] = 0
+
+
+def content_seconds(mel):
+    """
+    Seconds of audio in a batch of log-mel windows (the longest), not
+    counting the zero frames whisper.transcribe pads each window to 30 s with
+    """
+    filled = (mel != 0).any(dim=-2)
+    if not filled.any():
+        return 0.0
+    # Frames up to and including the last non-zero one
+    frames = filled.shape[-1] - filled.flip(-1).int().argmax(dim=-1)
+    frames = torch.where(filled.any(dim=-1), frames, 0)
+    return int(frames.max()) * HOP_LENGTH / SAMPLE_RATE
+
+
+@torch.no_grad()
+def decode(model, mel, options=DecodingOptions(), static_kv=True, max_repeats=0, **kwargs):
+    """
+    Drop-in for whisper.decode using StaticKVDecodingTask (or whisper's own
+    task without static_kv), guarded against loops if max_repeats is set.
+    The window's sample_len is capped by the audio actually in it.
+    """
+    single = mel.ndim == 2
+    if single:
+        mel = mel.unsqueeze(0)
+    window_len = sample_len_for(content_seconds(mel), model.dims.n_text_ctx)
+    kwargs["sample_len"] = min(kwargs.get("sample_len") or options.sample_len or window_len, window_len)
+    options = replace(options, **kwargs)
+
+    task = (StaticKVDecodingTask if static_kv else DecodingTask)(model, options)
+    if max_repeats:
+        task.logit_filters.append(RepetitionGuard(task.tokenizer.eot, task.sample_begin, max_repeats))
+    result = task.run(mel)
+    return result[0] if single else result
+
+
+def _install_forward(decoder):
+    """Let the decoder module take a StaticKVCache, keeping its forward hooks (timing)"""
+    if getattr(decoder.__dict__.get("forward"), "static_kv", False):
+        return
+    eager = type(decoder).forward.__get__(decoder)
+
+    def forward(x, xa, kv_cache=None):
+        if isinstance(kv_cache, StaticKVCache):
+            return _static_forward(decoder, x, xa, kv_cache)
+        return eager(x, xa, kv_cache=kv_cache)
+
+    forward.static_kv = True
+    decoder.forward = forward
+
+
+def install(model, static_kv=True, max_repeats=0):
+    """
+    Make model.decode (and so model.transcribe) bound each window's length,
+    and use the static kv-cache and/or the repetition guard
+    """
+    if static_kv:
+        _install_forward(model.decoder)
+    model.decode = partial(decode, model, static_kv=static_kv, max_repeats=max_repeats)
+
+
+def uninstall(model):
+    model.decoder.__dict__.pop("forward", None)
+    model.decoder.__dict__.pop("compiled_step", None)
+    model.__dict__.pop("decode", None)
@@ -4,6 +4,7 @@ GUI for WinWisp using tkinter
 import tkinter as tk
 from tkinter import ttk, messagebox, scrolledtext
 import threading
+from datetime import datetime
 
 
 class WhisperGUI:
@@ -86,13 +87,23 @@ class WhisperGUI:
         )
         self.transcription_text.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
         
-        # Copy button
+        # Copy and re-transcribe buttons
+        trans_buttons = ttk.Frame(trans_frame)
+        trans_buttons.grid(row=1, column=0, pady=(5, 0))
+        
         copy_btn = ttk.Button(
-            trans_frame,
+            trans_buttons,
             text="Copy to Clipboard",
             command=self.copy_last_transcription
         )
-        copy_btn.grid(row=1, column=0, pady=(5, 0))
+        copy_btn.grid(row=0, column=0, padx=5)
+        
+        retranscribe_btn = ttk.Button(
+            trans_buttons,
+            text="Re-transcribe",
+            command=self.app.retranscribe_last
+        )
+        retranscribe_btn.grid(row=0, column=1, padx=5)
         
         # Info Frame
         info_frame = ttk.LabelFrame(main_frame, text="Information", padding="10")
@@ -110,6 +121,8 @@ class WhisperGUI:
         buttons_frame.grid(row=4, column=0, sticky=(tk.W, tk.E))
         buttons_frame.columnconfigure(0, weight=1)
         buttons_frame.columnconfigure(1, weight=1)
+        buttons_frame.columnconfigure(2, weight=1)
+        buttons_frame.columnconfigure(3, weight=1)
         
         settings_btn = ttk.Button(
             buttons_frame,
@@ -118,12 +131,26 @@ class WhisperGUI:
         )
         settings_btn.grid(row=0, column=0, padx=(0, 5), sticky=(tk.W, tk.E))
         
+        stats_btn = ttk.Button(
+            buttons_frame,
+            text="Latency Stats",
+            command=self.show_latency_stats
+        )
+        stats_btn.grid(row=0, column=1, padx=5, sticky=(tk.W, tk.E))
+        
+        history_btn = ttk.Button(
+            buttons_frame,
+            text="History",
+            command=self.show_history
+        )
+        history_btn.grid(row=0, column=2, padx=5, sticky=(tk.W, tk.E))
+        
         minimize_btn = ttk.Button(
             buttons_frame,
             text="Minimize to Tray",
             command=self.hide_window
         )
-        minimize_btn.grid(row=0, column=1, padx=(5, 0), sticky=(tk.W, tk.E))
+        minimize_btn.grid(row=0, column=3, padx=(5, 0), sticky=(tk.W, tk.E))
     
     def show_window(self):
         """Show the main window"""
@@ -171,12 +198,235 @@ class WhisperGUI:
         """Show settings dialog"""
         SettingsDialog(self.window, self.app)
     
+    def show_latency_stats(self):
+        """Show rolling latency percentiles"""
+        LatencyStatsDialog(self.window, self.app)
+    
+    def show_history(self):
+        """Show the searchable transcription history"""
+        if not self.app.history:
+            messagebox.showinfo("History", "History is turned off in config.json ('history')")
+            return
+        HistoryDialog(self.window, self.app)
+    
     def run(self):
         """Run the GUI main loop"""
         if self.window:
             self.window.mainloop()
 
 
+class LatencyStatsDialog:
+    """Live view of per-stage p50/p95 latency and real-time factor"""
+    
+    REFRESH_MS = 1000
+    
+    def __init__(self, parent, app):
+        self.app = app
+        self.dialog = tk.Toplevel(parent)
+        self.dialog.title("Latency Stats")
+        self.dialog.geometry("460x340")
+        self.dialog.transient(parent)
+        
+        main_frame = ttk.Frame(self.dialog, padding="10")
+        main_frame.pack(fill=tk.BOTH, expand=True)
+        
+        self.stats_var = tk.StringVar()
+        ttk.Label(
+            main_frame,
+            textvariable=self.stats_var,
+            font=("Consolas", 9),
+            justify=tk.LEFT
+        ).pack(anchor=tk.W)
+        
+        ttk.Label(
+            main_frame,
+            text="Rolling window of recent dictations. Details: logs/metrics_<date>.jsonl",
+            font=("Arial", 8)
+        ).pack(anchor=tk.W, pady=(10, 0))
+        
+        self.refresh()
+    
+    def refresh(self):
+        """Update the table while the dialog is open"""
+        if not self.dialog.winfo_exists():
+            return
+        self.stats_var.set(self.app.telemetry.format_summary())
+        self.dialog.after(self.REFRESH_MS, self.refresh)
+
+
+class HistoryDialog:
+    """
+    Searchable transcription history. Only the rows in view exist as
+    widgets; the scrollbar maps onto the full result count and rows are
+    fetched from the store a page at a time.
+    """
+    
+    PAGE_SIZE = 200
+    MAX_PAGES = 20
+    SEARCH_DELAY_MS = 250
+    REFRESH_MS = 2000
+    ROW_HEIGHT = 20
+    
+    def __init__(self, parent, app):
+        self.app = app
+        self.store = app.history
+        self.query = ""
+        self.total = 0
+        self.offset = 0
+        self.rows = 20
+        # page number -> rows, cleared when the results change
+        self.pages = {}
+        self.visible = {}
+        self.search_job = None
+        
+        self.dialog = tk.Toplevel(parent)
+        self.dialog.title("History")
+        self.dialog.geometry("720x480")
+        self.dialog.transient(parent)
+        
+        main_frame = ttk.Frame(self.dialog, padding="10")
+        main_frame.pack(fill=tk.BOTH, expand=True)
+        
+        search_frame = ttk.Frame(main_frame)
+        search_frame.pack(fill=tk.X, pady=(0, 5))
+        ttk.Label(search_frame, text="Search:").pack(side=tk.LEFT)
+        self.search_var = tk.StringVar()
+        self.search_var.trace('w', self.on_search_changed)
+        search_entry = ttk.Entry(search_frame, textvariable=self.search_var)
+        search_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(5, 0))
+        search_entry.focus_set()
+        
+        list_frame = ttk.Frame(main_frame)
+        list_frame.pack(fill=tk.BOTH, expand=True)
+        self.tree = ttk.Treeview(
+            list_frame,
+            columns=("time", "text", "model", "latency"),
+            show="headings",
+            selectmode="browse"
+        )
+        for column, heading, width, stretch in (
+            ("time", "Time", 120, False),
+            ("text", "Text", 400, True),
+            ("model", "Model", 70, False),
+            ("latency", "Latency", 70, False)
+        ):
+            self.tree.heading(column, text=heading)
+            self.tree.column(column, width=width, stretch=stretch)
+        self.scrollbar = ttk.Scrollbar(list_frame, orient=tk.VERTICAL, command=self.on_scroll)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        
+        self.tree.bind("<Configure>", self.on_resize)
+        self.tree.bind("<MouseWheel>", lambda e: self.scroll_by(-3 if e.delta > 0 else 3))
+        self.tree.bind("<Button-4>", lambda e: self.scroll_by(-3))
+        self.tree.bind("<Button-5>", lambda e: self.scroll_by(3))
+        self.tree.bind("<Prior>", lambda e: self.scroll_by(-self.rows))
+        self.tree.bind("<Next>", lambda e: self.scroll_by(self.rows))
+        self.tree.bind("<Double-1>", lambda e: self.copy_selected())
+        
+        bottom_frame = ttk.Frame(main_frame)
+        bottom_frame.pack(fill=tk.X, pady=(5, 0))
+        self.count_var = tk.StringVar()
+        ttk.Label(bottom_frame, textvariable=self.count_var, font=("Arial", 8)).pack(side=tk.LEFT)
+        ttk.Button(bottom_frame, text="Copy", command=self.copy_selected).pack(side=tk.RIGHT)
+        
+        self.search()
+        self.dialog.after(self.REFRESH_MS, self.refresh)
+    
+    def on_search_changed(self, *args):
+        """Search once typing pauses"""
+        if self.search_job:
+            self.dialog.after_cancel(self.search_job)
+        self.search_job = self.dialog.after(self.SEARCH_DELAY_MS, self.search)
+    
+    def search(self):
+        self.search_job = None
+        self.query = self.search_var.get().strip()
+        self.total = self.store.count(self.query)
+        self.pages.clear()
+        self.offset = 0
+        self.render()
+    
+    def refresh(self):
+        """Pick up new entries while the dialog is open"""
+        if not self.dialog.winfo_exists():
+            return
+        total = self.store.count(self.query)
+        if total != self.total:
+            # Newest first: keep the same entries in view as rows are added on top
+            if self.offset:
+                self.offset += max(0, total - self.total)
+            self.total = total
+            self.pages.clear()
+            self.render()
+        self.dialog.after(self.REFRESH_MS, self.refresh)
+    
+    def _row(self, index):
+        page = index // self.PAGE_SIZE
+        if page not in self.pages:
+            if len(self.pages) >= self.MAX_PAGES:
+                self.pages.clear()
+            self.pages[page] = self.store.page(self.query, page * self.PAGE_SIZE, self.PAGE_SIZE)
+        rows = self.pages[page]
+        position = index - page * self.PAGE_SIZE
+        return rows[position] if position < len(rows) else None
+    
+    def render(self):
+        """Show the rows from offset"""
+        self.tree.delete(*self.tree.get_children())
+        self.visible = {}
+        for index in range(self.offset, min(self.total, self.offset + self.rows)):
+            row = self._row(index)
+            if row is None:
+                break
+            entry_id, created_at, text, model, latency_s, audio_s, recording = row
+            self.visible[str(entry_id)] = text
+            self.tree.insert("", tk.END, iid=str(entry_id), values=(
+                datetime.fromtimestamp(created_at).strftime("%Y-%m-%d %H:%M"),
+                " ".join(text.split()),
+                model or "",
+                f"{latency_s:.2f}s" if latency_s is not None else ""
+            ))
+        
+        if self.total:
+            self.scrollbar.set(self.offset / self.total, min(1.0, (self.offset + self.rows) / self.total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+        matches = "entries" if not self.query else "matches"
+        self.count_var.set(f"{self.total:,} {matches}")
+    
+    def scroll_to(self, offset):
+        offset = max(0, min(int(offset), self.total - self.rows))
+        if offset != self.offset:
+            self.offset = offset
+            self.render()
+    
+    def scroll_by(self, rows):
+        self.scroll_to(self.offset + rows)
+    
+    def on_scroll(self, action, amount, unit=None):
+        """Scrollbar command: moveto FRACTION, or scroll N units/pages"""
+        if action == "moveto":
+            self.scroll_to(float(amount) * self.total)
+        elif unit == "pages":
+            self.scroll_by(int(amount) * self.rows)
+        else:
+            self.scroll_by(int(amount))
+    
+    def on_resize(self, event):
+        # Rows that fit below the heading
+        rows = max(1, (event.height - self.ROW_HEIGHT - 4) // self.ROW_HEIGHT)
+        if rows != self.rows:
+            self.rows = rows
+            self.render()
+    
+    def copy_selected(self):
+        selection = self.tree.selection()
+        if selection and selection[0] in self.visible:
+            from text_paster import copy_to_clipboard
+            copy_to_clipboard(self.visible[selection[0]])
+
+
 class SettingsDialog:
     def __init__(self, parent, app):
         self.app = app
@@ -214,7 +464,7 @@ class SettingsDialog:
         )
         
         self.model_var = tk.StringVar(value=self.app.config.get('model'))
-        models = ["tiny", "base", "small", "medium", "large"]
+        models = ["tiny", "base", "small", "medium", "large", "turbo"]
         model_combo = ttk.Combobox(
             main_frame,
             textvariable=self.model_var,
@@ -229,7 +479,8 @@ class SettingsDialog:
             "base": "Fast, ~150MB",
             "small": "Balanced, ~500MB (Recommended)",
             "medium": "Accurate, ~1.5GB",
-            "large": "Most accurate, ~3GB"
+            "large": "Most accurate, ~3GB",
+            "turbo": "Close to large, much faster, ~1.6GB"
         }
         
         self.model_info_var = tk.StringVar(value=model_info.get(self.model_var.get(), ""))
@@ -289,40 +540,43 @@ class SettingsDialog:
             messagebox.showerror("Error", "Hotkey cannot be empty")
             return
         
-        # Update configuration
         old_hotkey = self.app.config.get('hotkey')
-        old_model = self.app.config.get('model')
+        was_loaded = self.app.whisper_handler.is_loaded
+        
+        # Components subscribed to these keys apply the changes as they are
+        # stored; the hotkey goes first so a failure leaves everything else as it was
+        hotkey_changed = 'hotkey' in self.app.config.set('hotkey', new_hotkey)
+        if hotkey_changed and not self.app.hotkey_manager.is_active:
+            messagebox.showerror("Error", "Failed to register new hotkey")
+            # Puts the old hotkey back in place
+            self.app.config.set('hotkey', old_hotkey)
+            return
         
-        self.app.config.update({
-            'hotkey': new_hotkey,
+        changes = self.app.config.update({
             'model': new_model,
             'language': new_language
         })
-        
-        # Apply changes
         changes_made = False
         
-        # Update hotkey if changed
-        if new_hotkey != old_hotkey:
-            if self.app.hotkey_manager.change_hotkey(new_hotkey):
-                messagebox.showinfo("Success", f"Hotkey changed to: {new_hotkey}")
-                changes_made = True
-            else:
-                messagebox.showerror("Error", "Failed to register new hotkey")
-                self.app.config.set('hotkey', old_hotkey)
-                return
-        
-        # Update model if changed
-        if new_model != old_model:
-            messagebox.showinfo(
-                "Model Change",
-                f"Model will be changed to '{new_model}'.\nThis may take a few moments on next use."
-            )
-            self.app.whisper_handler.change_model(new_model)
+        if hotkey_changed:
+            messagebox.showinfo("Success", f"Hotkey changed to: {new_hotkey}")
             changes_made = True
         
-        # Update language
-        self.app.whisper_handler.change_language(new_language)
+        # Model changed (or never loaded, e.g. on first run)
+        if 'model' in changes or not was_loaded:
+            if not self.app.model_manager.is_downloaded(new_model):
+                messagebox.showinfo(
+                    "Model Change",
+                    f"The '{new_model}' model will be downloaded in the background.\nProgress is shown in the status bar and tray tooltip."
+                )
+            elif 'model' in changes:
+                messagebox.showinfo(
+                    "Model Change",
+                    f"Model will be changed to '{new_model}'.\nIt is loading in the background."
+                )
+            if 'model' not in changes:
+                self.app.switch_model(new_model)
+            changes_made = True
         
         if not changes_made:
             messagebox.showinfo("Info", "Settings saved")
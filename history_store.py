@@ -0,0 +1,199 @@
+"""
+Persistent, searchable history of transcriptions
+"""
+import logging
+import queue
+import re
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS history (
+    id INTEGER PRIMARY KEY,
+    created_at REAL NOT NULL,
+    text TEXT NOT NULL,
+    model TEXT,
+    latency_s REAL,
+    audio_s REAL,
+    recording TEXT,
+    utterance_key TEXT
+);
+CREATE INDEX IF NOT EXISTS history_created_at ON history(created_at);
+"""
+
+# Created once utterance_key is ensured; databases from before it get the column added
+KEY_SCHEMA = "CREATE INDEX IF NOT EXISTS history_utterance_key ON history(utterance_key)"
+
+# Full-text index kept in sync with the history table by triggers
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS history_fts USING fts5(text, content='history', content_rowid='id');
+CREATE TRIGGER IF NOT EXISTS history_insert AFTER INSERT ON history BEGIN
+    INSERT INTO history_fts(rowid, text) VALUES (new.id, new.text);
+END;
+CREATE TRIGGER IF NOT EXISTS history_delete AFTER DELETE ON history BEGIN
+    INSERT INTO history_fts(history_fts, rowid, text) VALUES ('delete', old.id, old.text);
+END;
+CREATE TRIGGER IF NOT EXISTS history_update AFTER UPDATE OF text ON history BEGIN
+    INSERT INTO history_fts(history_fts, rowid, text) VALUES ('delete', old.id, old.text);
+    INSERT INTO history_fts(rowid, text) VALUES (new.id, new.text);
+END;
+"""
+
+COLUMNS = ", ".join(
+    f"history.{column}" for column in ("id", "created_at", "text", "model", "latency_s", "audio_s", "recording")
+)
+
+
+def _words(query):
+    return re.findall(r"\w+", query)
+
+
+class HistoryStore:
+    """
+    Every delivered transcription with its time, model, latency, audio
+    length and recording path, in an SQLite database.
+
+    add() and update_text() only queue the change; a background thread
+    commits whatever has queued up in one transaction, so output is never
+    delayed by the disk. Reads use their own connection (WAL mode lets
+    them run alongside writes). Search matches every word of the query as
+    a prefix, through an FTS5 index when SQLite has it and LIKE otherwise.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.queue = queue.Queue()
+        self.writer = None
+        self.writer_lock = threading.Lock()
+        self.read_lock = threading.Lock()
+        self.reader = None
+        self.fts = False
+
+    def _connect(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(str(self.path), check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    def _open_reader(self):
+        """The read connection, creating the schema on first use"""
+        if self.reader is None:
+            connection = self._connect()
+            connection.executescript(SCHEMA)
+            columns = {row[1] for row in connection.execute("PRAGMA table_info(history)")}
+            if "utterance_key" not in columns:
+                connection.execute("ALTER TABLE history ADD COLUMN utterance_key TEXT")
+            connection.execute(KEY_SCHEMA)
+            try:
+                connection.executescript(FTS_SCHEMA)
+                self.fts = True
+            except sqlite3.OperationalError:
+                self.fts = False  # SQLite built without FTS5
+            connection.commit()
+            self.reader = connection
+        return self.reader
+
+    def add(self, text, created_at=None, model=None, latency_s=None, audio_s=None, recording=None, key=None):
+        """Queue a transcription for storage and return its key (a new UUID unless key is given)"""
+        key = key or uuid.uuid4().hex
+        row = (created_at or time.time(), text, model, latency_s, audio_s, recording, key)
+        self._put(("INSERT INTO history (created_at, text, model, latency_s, audio_s, recording, utterance_key) "
+                   "VALUES (?, ?, ?, ?, ?, ?, ?)", row))
+        return key
+
+    def update_text(self, key, text):
+        """Queue a text change for the entry add() returned key for (e.g. after re-transcription)"""
+        self._put(("UPDATE history SET text = ? WHERE utterance_key = ?", (text, key)))
+
+    def _put(self, statement):
+        # Under the lock, so concurrent first writes can't start two writers
+        with self.writer_lock:
+            if self.writer is None or not self.writer.is_alive():
+                self.writer = threading.Thread(target=self._run, daemon=True)
+                self.writer.start()
+            self.queue.put(statement)
+
+    def _run(self):
+        with self.read_lock:
+            self._open_reader()
+        connection = self._connect()
+        while True:
+            statement = self.queue.get()
+            if statement is None:
+                break
+            statements = [statement]
+            # Commit whatever else is already queued in the same transaction
+            stop = False
+            while True:
+                try:
+                    statement = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if statement is None:
+                    stop = True
+                    break
+                statements.append(statement)
+            try:
+                with connection:
+                    for sql, params in statements:
+                        connection.execute(sql, params)
+            except sqlite3.Error as e:
+                logger.error(f"Error writing history: {e}")
+            if stop:
+                break
+        connection.close()
+
+    def _select(self, query):
+        """(FROM ... WHERE clause, params, ordering column) for the entries matching query"""
+        words = _words(query)
+        if not words:
+            return "history", (), "history.id"
+        if self.fts:
+            # Driven by the index, which yields matches in rowid order
+            match = " ".join('"{}"*'.format(word.replace('"', '""')) for word in words)
+            return (
+                "history_fts JOIN history ON history.id = history_fts.rowid WHERE history_fts MATCH ?",
+                (match,), "history_fts.rowid"
+            )
+        conditions = " AND ".join("text LIKE ? ESCAPE '\\'" for _ in words)
+        escaped = [re.sub(r"([\\%_])", r"\\\1", word) for word in words]
+        return f"history WHERE {conditions}", tuple(f"%{word}%" for word in escaped), "history.id"
+
+    def count(self, query=""):
+        """Number of entries matching query (all entries if empty)"""
+        with self.read_lock:
+            connection = self._open_reader()
+            source, params, _ = self._select(query)
+            if self.fts and params:
+                source = "history_fts WHERE history_fts MATCH ?"
+            return connection.execute(f"SELECT count(*) FROM {source}", params).fetchone()[0]
+
+    def page(self, query="", offset=0, limit=100):
+        """Entries matching query, newest first, as (id, created_at, text, model, latency_s, audio_s, recording)"""
+        with self.read_lock:
+            connection = self._open_reader()
+            source, params, order = self._select(query)
+            return connection.execute(
+                f"SELECT {COLUMNS} FROM {source} ORDER BY {order} DESC LIMIT ? OFFSET ?",
+                params + (limit, offset)
+            ).fetchall()
+
+    def close(self):
+        """Commit queued entries and close the database"""
+        with self.writer_lock:
+            writer = self.writer
+            if writer and writer.is_alive():
+                self.queue.put(None)
+        if writer:
+            writer.join(timeout=5)
+        with self.read_lock:
+            if self.reader is not None:
+                self.reader.close()
+                self.reader = None
@@ -2,57 +2,209 @@
 Global hotkey management
 """
 import keyboard
+import queue
 import threading
+import time
 
 
 class HotkeyManager:
-    def __init__(self):
+    """
+    Registers the global hotkey and delivers its events on one worker thread.
+
+    Handlers run one at a time in the order the key events arrived, so
+    start/stop can never overlap. In toggle mode, presses closer together
+    than the debounce interval are dropped; in push-to-talk mode key-down
+    auto-repeat is ignored and each press is paired with its release.
+    """
+
+    # Config keys apply_config handles
+    CONFIG_KEYS = ("hotkey", "hotkey_debounce_ms")
+
+    def __init__(self, debounce_ms=200):
         self.current_hotkey = None
         self.callback = None
+        self.release_callback = None
         self.is_active = False
-    
-    def register(self, hotkey, callback):
-        """Register a global hotkey"""
+        self.handles = []
+        # Raw key-release hooks ending a push-to-talk press
+        self.release_hooks = []
+        # Extra hotkeys that run an action: hotkey -> (handle, last press time)
+        self.actions = {}
+
+        self.debounce = debounce_ms / 1000.0
+        self.last_press = 0.0
+        self.key_down = False
+        self.state_lock = threading.Lock()
+
+        self.events = queue.Queue()
+        self.worker = None
+        # perf_counter() time of the event whose handler is running, if any
+        self.current_event_time = None
+
+    def register(self, hotkey, callback, release_callback=None):
+        """
+        Register a global hotkey
+
+        Args:
+            hotkey: Key combination, e.g. "ctrl+shift+space"
+            callback: Called when the hotkey is pressed
+            release_callback: If given, called when the hotkey is released
+                (push-to-talk); auto-repeated presses are ignored
+        """
         # Unregister previous hotkey if exists
         self.unregister()
-        
+
         try:
             self.current_hotkey = hotkey
             self.callback = callback
-            
+            self.release_callback = release_callback
+            self.key_down = False
+
             # Register the hotkey
-            keyboard.add_hotkey(hotkey, self._on_hotkey_pressed)
+            self.handles.append(keyboard.add_hotkey(hotkey, self._on_hotkey_pressed))
+            if release_callback:
+                # Releasing any key of the combination ends the press; a
+                # trigger_on_release hotkey misses a modifier let go first
+                for key in keyboard.parse_hotkey(hotkey)[-1]:
+                    self.release_hooks.append(
+                        keyboard.on_release_key(key, lambda event: self._on_hotkey_released())
+                    )
             self.is_active = True
-            
-            print(f"Hotkey registered: {hotkey}")
+            self._ensure_worker()
+
+            mode = "push-to-talk" if release_callback else "toggle"
+            print(f"Hotkey registered: {hotkey} ({mode})")
             return True
         except Exception as e:
             print(f"Error registering hotkey: {e}")
+            self._remove_handles()
             return False
-    
+
     def _on_hotkey_pressed(self):
-        """Internal hotkey handler"""
+        """Internal hotkey handler (runs on the keyboard hook thread)"""
+        with self.state_lock:
+            if self.release_callback:
+                if self.key_down:
+                    return  # Auto-repeat while held
+                self.key_down = True
+            else:
+                now = time.monotonic()
+                if now - self.last_press < self.debounce:
+                    return
+                self.last_press = now
+
         if self.callback:
-            # Run callback in a separate thread to avoid blocking
-            thread = threading.Thread(target=self.callback)
-            thread.start()
-    
-    def unregister(self):
-        """Unregister the current hotkey"""
-        if self.current_hotkey and self.is_active:
+            self.dispatch(self.callback)
+
+    def _on_hotkey_released(self):
+        """Internal release handler for push-to-talk (any key of the hotkey)"""
+        with self.state_lock:
+            if not self.key_down:
+                return
+            self.key_down = False
+
+        if self.release_callback:
+            self.dispatch(self.release_callback)
+
+    def register_action(self, hotkey, callback):
+        """
+        Register an extra global hotkey whose callback runs on the worker
+
+        Presses closer together than the debounce interval are dropped.
+        Action hotkeys are kept when the main hotkey changes.
+        """
+        self.unregister_action(hotkey)
+
+        def on_press():
+            now = time.monotonic()
+            with self.state_lock:
+                handle, last_press = self.actions.get(hotkey, (None, 0.0))
+                if now - last_press < self.debounce:
+                    return
+                self.actions[hotkey] = (handle, now)
+            self.dispatch(callback)
+
+        try:
+            self.actions[hotkey] = (keyboard.add_hotkey(hotkey, on_press), 0.0)
+            self._ensure_worker()
+            print(f"Hotkey registered: {hotkey} (action)")
+            return True
+        except Exception as e:
+            print(f"Error registering hotkey: {e}")
+            self.actions.pop(hotkey, None)
+            return False
+
+    def unregister_action(self, hotkey):
+        """Unregister an action hotkey"""
+        handle, _ = self.actions.pop(hotkey, (None, 0.0))
+        if handle is not None:
             try:
-                keyboard.remove_hotkey(self.current_hotkey)
-                self.is_active = False
-                print(f"Hotkey unregistered: {self.current_hotkey}")
+                keyboard.remove_hotkey(handle)
             except Exception as e:
                 print(f"Error unregistering hotkey: {e}")
-    
+
+    def dispatch(self, func, *args):
+        """Queue a call to run on the hotkey worker, after any pending events"""
+        self._ensure_worker()
+        self.events.put((func, args, time.perf_counter()))
+
+    def _ensure_worker(self):
+        if self.worker is None or not self.worker.is_alive():
+            self.worker = threading.Thread(target=self._run, daemon=True)
+            self.worker.start()
+
+    def _run(self):
+        """Worker loop: run queued handlers in order"""
+        while True:
+            item = self.events.get()
+            if item is None:
+                return
+            func, args, self.current_event_time = item
+            try:
+                func(*args)
+            except Exception as e:
+                print(f"Error in hotkey handler: {e}")
+            finally:
+                self.current_event_time = None
+
+    def _remove_handles(self):
+        for handle in self.handles:
+            try:
+                keyboard.remove_hotkey(handle)
+            except Exception as e:
+                print(f"Error unregistering hotkey: {e}")
+        self.handles = []
+        for hook in self.release_hooks:
+            try:
+                keyboard.unhook(hook)
+            except Exception as e:
+                print(f"Error unregistering hotkey: {e}")
+        self.release_hooks = []
+
+    def unregister(self):
+        """Unregister the current hotkey"""
+        if self.current_hotkey and self.is_active:
+            self._remove_handles()
+            self.is_active = False
+            print(f"Hotkey unregistered: {self.current_hotkey}")
+
     def change_hotkey(self, new_hotkey):
         """Change the hotkey"""
         if self.callback:
-            return self.register(new_hotkey, self.callback)
+            return self.register(new_hotkey, self.callback, self.release_callback)
         return False
-    
+
+    def apply_config(self, changes):
+        """Apply changed settings (config key -> value)"""
+        if "hotkey_debounce_ms" in changes:
+            self.debounce = changes["hotkey_debounce_ms"] / 1000.0
+        if "hotkey" in changes:
+            self.change_hotkey(changes["hotkey"])
+
     def cleanup(self):
         """Clean up hotkey resources"""
         self.unregister()
+        for hotkey in list(self.actions):
+            self.unregister_action(hotkey)
+        if self.worker and self.worker.is_alive():
+            self.events.put(None)
@@ -0,0 +1,180 @@
+"""
+Asynchronous, rotating, structured logging
+
+Log calls only put the record on a queue; a listener thread formats and
+writes it. The log file is named by day, rolls over at midnight or when it
+reaches a size cap (keeping a bounded number of parts per day), and files
+older than the retention period are deleted.
+File records are JSON, one object per line.
+"""
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+
+# Attributes every LogRecord has; anything else was passed with extra=
+_STANDARD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+_listener = None
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, with any extra= fields included"""
+
+    def format(self, record):
+        data = {
+            "time": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _STANDARD_ATTRIBUTES and not key.startswith("_"):
+                data[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data["exception"] = record.exc_text
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class DailyFileHandler(logging.handlers.BaseRotatingHandler):
+    """
+    Writes to <prefix>_<YYYYMMDD>.log in directory. A day's file that grows
+    past max_bytes is renamed to <prefix>_<YYYYMMDD>.<n>.log and a new one
+    started; only the newest max_parts of those are kept (0 keeps all), so
+    a day never takes more than (max_parts + 1) * max_bytes. Files of days
+    older than retention_days are deleted at start and at every rollover
+    (0 keeps everything).
+    """
+
+    def __init__(self, directory, prefix="winwisp", max_bytes=10 * 1024 * 1024, retention_days=14, max_parts=5):
+        self.directory = Path(directory)
+        self.prefix = prefix
+        self.max_bytes = max_bytes
+        self.retention_days = retention_days
+        self.max_parts = max_parts
+        self.day = datetime.now().strftime("%Y%m%d")
+        super().__init__(str(self._path(self.day)), "a", encoding="utf-8", delay=True)
+        self._remove_expired()
+
+    def _path(self, day, part=0):
+        suffix = f".{part}" if part else ""
+        return self.directory / f"{self.prefix}_{day}{suffix}.log"
+
+    def _parts(self, day):
+        """Numbers of day's rolled-over parts, oldest first"""
+        parts = []
+        for path in self.directory.glob(f"{self.prefix}_{day}.*.log"):
+            number = path.name[len(self.prefix) + 1:].split(".")[1]
+            if number.isdigit():
+                parts.append(int(number))
+        return sorted(parts)
+
+    def shouldRollover(self, record):
+        if datetime.now().strftime("%Y%m%d") != self.day:
+            return True
+        if self.max_bytes and self.stream is not None:
+            return self.stream.tell() + len(self.format(record)) + 1 >= self.max_bytes
+        return False
+
+    def doRollover(self):
+        if self.stream:
+            self.stream.close()
+            self.stream = None
+
+        day = datetime.now().strftime("%Y%m%d")
+        if day == self.day:
+            # Size cap within the day: move the full file to a new last part
+            # and drop the oldest parts beyond max_parts
+            parts = self._parts(day)
+            part = parts[-1] + 1 if parts else 1
+            try:
+                os.replace(self.baseFilename, self._path(day, part))
+                parts.append(part)
+            except OSError:
+                pass
+            if self.max_parts:
+                for old in parts[:-self.max_parts]:
+                    try:
+                        self._path(day, old).unlink()
+                    except OSError:
+                        pass
+        else:
+            self.day = day
+            self.baseFilename = os.path.abspath(self._path(day))
+            self._remove_expired()
+
+    def _remove_expired(self):
+        if not self.retention_days:
+            return
+        cutoff = (datetime.now() - timedelta(days=self.retention_days)).strftime("%Y%m%d")
+        for path in self.directory.glob(f"{self.prefix}_*.log"):
+            day = path.name[len(self.prefix) + 1:].split(".")[0]
+            if day.isdigit() and day < cutoff:
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that keeps the traceback out of the message so it stays a separate field"""
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def setup(log_dir, level="INFO", max_mb=10, retention_days=14, json_format=True, console=True, max_parts=5):
+    """
+    Route the root logger through a queue to a background writer. Returns
+    the log directory's current file; safe to call once per process.
+    """
+    global _listener
+    log_dir = Path(log_dir)
+    log_dir.mkdir(parents=True, exist_ok=True)
+
+    file_handler = DailyFileHandler(
+        log_dir, max_bytes=int(max_mb * 1024 * 1024), retention_days=retention_days, max_parts=max_parts
+    )
+    text_format = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    file_handler.setFormatter(JsonFormatter() if json_format else text_format)
+    handlers = [file_handler]
+    if console and sys.stdout:
+        console_handler = logging.StreamHandler(sys.stdout)
+        console_handler.setFormatter(text_format)
+        handlers.append(console_handler)
+
+    records = queue.SimpleQueue()
+    _listener = logging.handlers.QueueListener(records, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown)
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(_QueueHandler(records))
+    root.setLevel(getattr(logging, str(level).upper(), logging.INFO))
+    return file_handler.baseFilename
+
+
+def shutdown():
+    """Write out queued records and stop the writer thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
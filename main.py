@@ -13,37 +13,56 @@ Licensed under the MIT License
 This is a third-party application and is not affiliated with OpenAI.
 """
 import sys
+
+# Installed first so the import hook sees every module loaded below
+import startup_profiler
+profiler = startup_profiler.from_argv(sys.argv)
+
 import os
 import threading
 import time
 from pathlib import Path
 import logging
-from datetime import datetime
 
-# Configure logging
-log_dir = Path.home() / "AppData" / "Local" / "WinWisp" / "logs"
-log_dir.mkdir(parents=True, exist_ok=True)
-log_file = log_dir / f"winwisp_{datetime.now().strftime('%Y%m%d')}.log"
+with profiler.phase("import config"):
+    from config import config
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(log_file),
-        logging.StreamHandler(sys.stdout) if sys.stdout else logging.NullHandler()
-    ]
-)
+# Configure logging; records are written by a background thread
+with profiler.phase("logging setup"):
+    import logging_setup
+    log_dir = Path.home() / "AppData" / "Local" / "WinWisp" / "logs"
+    log_file = logging_setup.setup(
+        log_dir,
+        level=config.get('log_level', 'INFO'),
+        max_mb=config.get('log_max_mb', 10),
+        retention_days=config.get('log_retention_days', 14),
+        max_parts=config.get('log_max_parts', 5),
+        json_format=config.get('log_json', True)
+    )
 
 logger = logging.getLogger(__name__)
 
-from config import config
-from audio_recorder import AudioRecorder
-from whisper_handler import WhisperHandler
-from hotkey_manager import HotkeyManager
-from text_paster import paste_text_at_cursor, copy_to_clipboard
-from gui import WhisperGUI
-from tray_icon import TrayIcon
-from recording_indicator import RecordingIndicator, ProcessingIndicator
+with profiler.phase("import components"):
+    from audio_recorder import AudioRecorder
+    from recording_store import RecordingStore
+    import dictation_pipeline
+    from dictation_pipeline import DictationPipeline
+    import telemetry
+    from telemetry import Telemetry, UtteranceMetrics
+    from model_manager import ModelManager
+    from model_router import MODEL_ORDER, ModelRouter, model_family
+    from recent_utterances import RecentUtterances
+    from whisper_handler import WhisperHandler, set_feature_cache
+    from transcription_cache import TranscriptionCache
+    from history_store import HistoryStore
+    from hotkey_manager import HotkeyManager
+    from text_paster import paste_text_at_cursor, copy_to_clipboard, get_paster, IncrementalTyper
+
+with profiler.phase("import UI"):
+    from gui import WhisperGUI
+    from ui_bus import UIBus
+    from tray_icon import TrayIcon
+    from recording_indicator import RecordingIndicator, ProcessingIndicator
 
 
 class WinWispApp:
@@ -64,63 +83,212 @@ class WinWispApp:
         
         # Components
         self.config = config
-        self.audio_recorder = AudioRecorder()
+        self.telemetry = Telemetry(log_dir, enabled=self.config.get('telemetry', True))
+        with profiler.phase("audio recorder"):
+            self.audio_recorder = AudioRecorder(
+                native_rate=self.config.get('capture_native_rate', False)
+            )
+            self.configure_auto_stop()
+        self.recording_store = RecordingStore(
+            self.config.get('recordings_dir', str(recordings_dir)),
+            fmt=self.config.get('recording_format', 'flac'),
+            max_total_mb=self.config.get('recordings_max_total_mb', 0),
+            max_age_days=self.config.get('recordings_max_age_days', 0)
+        )
+        self.recording_store.on_written = lambda seconds: self.telemetry.observe('file_write', seconds)
+        
+        # Repeat transcriptions of the same audio and settings come from here
+        self.transcription_cache = None
+        if self.config.get('transcription_cache', True):
+            self.transcription_cache = TranscriptionCache(
+                config_dir / "transcription_cache",
+                max_mb=self.config.get('transcription_cache_mb', 10)
+            )
+        
+        # Every delivered transcription, searchable from the History window
+        self.history = None
+        if self.config.get('history', True):
+            self.history = HistoryStore(config_dir / "history.db")
+        
+        # The last few utterances stay in memory (with their mel features) for re-transcription
+        self.recent_utterances = RecentUtterances(self.config.get('retranscribe_keep', 3))
+        set_feature_cache(self.recent_utterances)
+        self.retranscribe_handler = None
+        self.retranscribe_lock = threading.Lock()
         
         # Initialize WhisperHandler
         model_name = self.config.get('model', 'small')
-        self.whisper_handler = WhisperHandler(
-            model_name=model_name,
-            language=self.config.get('language', 'en')
-        )
+        self.model_manager = ModelManager(base_url=self.config.get('model_base_url') or None)
+        self.model_manager.on_progress = self.on_model_progress
+        self.whisper_handler = self._make_whisper_handler(model_name)
+        
+        # Optional per-utterance model choice; the configured model is one of the routes
+        self.model_router = None
+        if self.config.get('routing_enabled', False):
+            self.model_router = ModelRouter(
+                self.config.get('routing_models', ['base', 'small', 'medium']),
+                latency_target_s=self.config.get('routing_latency_target_s', 3.0),
+                make_handler=self._make_whisper_handler,
+                is_available=self.model_manager.is_downloaded
+            )
+            self.model_router.add_handler(self.whisper_handler)
+            for name in self.model_router.models:
+                if self.model_manager.is_known(name) and not self.model_manager.is_downloaded(name):
+                    logger.info(f"Downloading {name} model for routing in the background")
+                    self.model_manager.prefetch(name)
         
         # Check if this is first run (no model downloaded)
-        self.is_first_run = not self._model_exists(model_name)
+        self.is_first_run = not self.model_manager.is_downloaded(model_name)
         
         # Only load model in background if not first run
+        self.model_thread = None
         if not self.is_first_run:
             logger.info("Loading Whisper model in background...")
-            model_thread = threading.Thread(target=self.whisper_handler.load_model)
-            model_thread.daemon = True
-            model_thread.start()
+            self.model_thread = threading.Thread(target=self._load_model_profiled)
+            self.model_thread.daemon = True
+            self.model_thread.start()
         else:
             logger.info("First run detected - model will be downloaded when user saves settings")
         
-        self.hotkey_manager = HotkeyManager()
-        
-        # State
-        self.is_recording = False
+        self.hotkey_manager = HotkeyManager(
+            debounce_ms=self.config.get('hotkey_debounce_ms', 200)
+        )
+        self.retranscribe_hotkey = None
+        
+        # Settings changes apply live, each component getting only its own keys
+        self.config.subscribe(AudioRecorder.CONFIG_KEYS, self.audio_recorder.apply_config)
+        self.config.subscribe(RecordingStore.CONFIG_KEYS, self.recording_store.apply_config)
+        self.config.subscribe(
+            ('auto_stop', 'auto_stop_silence_ms', 'auto_stop_min_speech_ms', 'auto_stop_max_seconds'),
+            lambda changes: self.configure_auto_stop()
+        )
+        self.config.subscribe(HotkeyManager.CONFIG_KEYS, self.hotkey_manager.apply_config)
+        self.config.subscribe(('retranscribe_hotkey',), self.apply_retranscribe_hotkey)
+        self.config.subscribe(('model',), lambda changes: self.switch_model(changes['model']))
+        
+        # State: the utterance being recorded (if any); earlier utterances
+        # continue through the pipeline while a new one records
+        self.current_utterance = None
+        self.pipeline = DictationPipeline(
+            transcribe=self.transcribe_utterance,
+            output=self.deliver_utterance,
+            on_state_change=self.on_utterance_state
+        )
         self.last_transcription = ""
+        self.last_audio = None
         self.last_audio_file = None
+        # The utterance whose text was output last, which re-transcription may replace in place
+        self.last_delivered = None
         
-        # GUI and Tray
+        # GUI and Tray; all Tk calls from other threads go through self.ui
+        self.ui = None
         self.gui = None
         self.tray_icon = None
         
-        # Recording indicator
-        self.recording_indicator = RecordingIndicator()
+        # Recording indicator; the pulse follows the live input level
+        self.recording_indicator = RecordingIndicator(
+            level_source=lambda: self.audio_recorder.level,
+            busy_source=lambda: self.pipeline.is_transcribing
+        )
         self.processing_indicator = ProcessingIndicator()
     
-    def _model_exists(self, model_name):
-        """Check if a Whisper model has been downloaded"""
-        cache_dir = Path.home() / ".cache" / "whisper"
-        model_files = {
-            'tiny': 'tiny.pt',
-            'base': 'base.pt',
-            'small': 'small.pt',
-            'medium': 'medium.pt',
-            'large': 'large.pt'
-        }
-        model_file = model_files.get(model_name, 'small.pt')
-        model_path = cache_dir / model_file
-        return model_path.exists()
+    def _make_whisper_handler(self, model_name):
+        handler = WhisperHandler(
+            model_name=model_name,
+            language=self.config.get('language', 'en'),
+            model_manager=self.model_manager,
+            mmap_weights=self.config.get('mmap_weights', True),
+            compile_mode=self.config.get('compile_mode', 'off'),
+            static_kv_cache=self.config.get('static_kv_cache', True),
+            max_repeats=self.config.get('decode_max_repeats', 4),
+            temperature_fallbacks=self.config.get('temperature_fallbacks', 2),
+            hallucination_filter=self.config.get('hallucination_filter', True),
+            backend=self.config.get('backend', 'torch'),
+            onnx_int8=self.config.get('onnx_int8', False),
+            cache=self.transcription_cache
+        )
+        handler.configure_idle_unload(
+            idle_minutes=self.config.get('model_idle_unload_minutes', 15),
+            memory_percent=self.config.get('model_unload_memory_percent', 90)
+        )
+        self.config.subscribe(WhisperHandler.CONFIG_KEYS, handler.apply_config)
+        return handler
+    
+    def _load_model_profiled(self):
+        with profiler.phase("model load (background)"):
+            self.whisper_handler.load_model()
+    
+    def post_ui(self, func, *args, key=None):
+        """
+        Run a UI update on the Tk thread. Updates sharing a key are
+        coalesced so only the latest one is applied.
+        """
+        if self.ui:
+            self.ui.post(func, *args, key=key)
+    
+    def configure_auto_stop(self):
+        """Enable or disable silence-based auto-stop from config"""
+        if self.config.get('auto_stop', False):
+            self.audio_recorder.set_endpointing(
+                self.on_auto_stop,
+                silence_ms=self.config.get('auto_stop_silence_ms', 800),
+                min_speech_ms=self.config.get('auto_stop_min_speech_ms', 300),
+                max_seconds=self.config.get('auto_stop_max_seconds', 120)
+            )
+        else:
+            self.audio_recorder.set_endpointing(None)
+    
+    def on_model_progress(self, name, downloaded, total):
+        """Report checkpoint download progress in the window and tray tooltip"""
+        megabytes = downloaded / (1024 * 1024)
+        if total:
+            status = f"Downloading {name} model: {downloaded * 100 // total}% ({megabytes:.0f} of {total / (1024 * 1024):.0f} MB)"
+        else:
+            status = f"Downloading {name} model: {megabytes:.0f} MB"
+        if self.gui:
+            self.post_ui(self.gui.update_status, status, key='status')
+        if self.tray_icon:
+            self.tray_icon.set_status(status)
+    
+    def switch_model(self, model_name):
+        """Download the model if needed, then load it, all in the background"""
+        if self.tray_icon and not self.model_manager.is_downloaded(model_name):
+            self.tray_icon.notify(f"Downloading the {model_name} model...")
+        
+        def on_done(name, path, error):
+            if self.tray_icon:
+                self.tray_icon.set_status(None)
+            if error:
+                logger.error(f"Model download failed: {error}")
+                if self.gui:
+                    self.post_ui(self.gui.update_status, f"Model download failed: {error}", key='status')
+                if self.tray_icon:
+                    self.tray_icon.notify(f"Could not download the {name} model")
+                return
+            if self.gui:
+                self.post_ui(self.gui.update_status, f"Loading {name} model...", key='status')
+            loaded = self.whisper_handler.change_model(name)
+            if self.gui:
+                self.post_ui(self.gui.update_status, "Ready" if loaded else "Failed to load model", key='status')
+        
+        self.model_manager.prefetch(model_name, on_done=on_done)
     
     def initialize(self):
         """Initialize the application"""
         try:
             # Create GUI
             logger.info("Creating GUI...")
-            self.gui = WhisperGUI(self)
-            self.gui.create_window()
+            with profiler.phase("GUI window"):
+                self.gui = WhisperGUI(self)
+                self.gui.create_window()
+            self.ui = UIBus(self.gui.window)
+            self.ui.start()
+            get_paster().on_restore = lambda seconds: self.telemetry.observe('clipboard_restore', seconds)
+            
+            # Build the indicators up front so showing them is instant
+            with profiler.phase("indicator windows"):
+                self.recording_indicator.create_window()
+                self.processing_indicator.create_window()
             
             # On first run, show the window so user can configure settings
             if self.is_first_run:
@@ -131,18 +299,31 @@ class WinWispApp:
             
             # Create system tray icon
             logger.info("Creating system tray icon...")
-            self.tray_icon = TrayIcon(self)
-            self.tray_icon.start()
+            with profiler.phase("tray icon"):
+                self.tray_icon = TrayIcon(self)
+                self.tray_icon.start()
             
             # Register hotkey
             hotkey = self.config.get('hotkey', 'ctrl+shift+space')
             logger.info(f"Registering hotkey: {hotkey}")
-            if not self.hotkey_manager.register(hotkey, self.on_hotkey_pressed):
+            push_to_talk = self.config.get('hotkey_mode', 'toggle') == 'push_to_talk'
+            with profiler.phase("hotkey registration"):
+                if push_to_talk:
+                    registered = self.hotkey_manager.register(
+                        hotkey, self.start_recording, release_callback=self.stop_recording
+                    )
+                else:
+                    registered = self.hotkey_manager.register(hotkey, self.on_hotkey_pressed)
+            if not registered:
                 logger.error("Failed to register hotkey!")
                 return False
+            self.apply_retranscribe_hotkey({'retranscribe_hotkey': self.config.get('retranscribe_hotkey', '')})
             
             logger.info(f"WinWisp is ready!")
-            logger.info(f"Press {hotkey} to start/stop recording")
+            if push_to_talk:
+                logger.info(f"Hold {hotkey} to record, release to transcribe")
+            else:
+                logger.info(f"Press {hotkey} to start/stop recording")
             
             # Show notification only if not first run
             if not self.is_first_run and self.tray_icon:
@@ -156,6 +337,14 @@ class WinWispApp:
             logger.error(f"Failed to initialize: {e}", exc_info=True)
             return False
     
+    def apply_retranscribe_hotkey(self, changes):
+        """(Re-)register the re-transcribe hotkey"""
+        if self.retranscribe_hotkey:
+            self.hotkey_manager.unregister_action(self.retranscribe_hotkey)
+        self.retranscribe_hotkey = changes['retranscribe_hotkey'] or None
+        if self.retranscribe_hotkey:
+            self.hotkey_manager.register_action(self.retranscribe_hotkey, self.retranscribe_last)
+    
     def on_hotkey_pressed(self):
         """Handle hotkey press - toggle recording"""
         if self.is_recording:
@@ -163,21 +352,45 @@ class WinWispApp:
         else:
             self.start_recording()
     
+    def on_auto_stop(self):
+        """Handle end of speech detected by the recorder"""
+        logger.info("End of speech detected, stopping recording")
+        # Serialize with hotkey events so start/stop never race
+        self.hotkey_manager.dispatch(self._auto_stop, self.current_utterance)
+    
+    def _auto_stop(self, utterance):
+        """Stop the recording the endpoint was detected in, unless it has already ended"""
+        if utterance is None or utterance is not self.current_utterance:
+            logger.info("Auto-stop skipped, its recording already ended")
+            return
+        self.stop_recording()
+    
+    @property
+    def is_recording(self):
+        return self.current_utterance is not None
+    
     def start_recording(self):
         """Start audio recording"""
         if self.is_recording:
             return
         
         logger.info("Starting recording...")
-        self.is_recording = True
+        # Reload an unloaded model while the user speaks rather than after
+        self.whisper_handler.preload()
+        self.current_utterance = self.pipeline.begin()
+        metrics = self.current_utterance.metrics = UtteranceMetrics(self.current_utterance.id)
+        event_time = self.hotkey_manager.current_event_time
+        if event_time is not None:
+            metrics.add('hotkey', time.perf_counter() - event_time)
         
         # Show recording indicator with audio feedback
-        self.recording_indicator.show()
+        self.post_ui(self.processing_indicator.hide, key='processing_indicator')
+        self.post_ui(self.recording_indicator.show, key='recording_indicator')
         
         # Update UI
         if self.gui:
-            self.gui.update_recording_status(True)
-            self.gui.update_status("Recording...")
+            self.post_ui(self.gui.update_recording_status, True, key='recording')
+            self.post_ui(self.gui.update_status, "Recording...", key='status')
         
         if self.tray_icon:
             self.tray_icon.update_icon(recording=True)
@@ -185,84 +398,183 @@ class WinWispApp:
         # Start recording
         if not self.audio_recorder.start_recording():
             logger.error("Failed to start recording!")
-            self.is_recording = False
-            self.recording_indicator.hide()
+            utterance, self.current_utterance = self.current_utterance, None
+            self.pipeline.cancel(utterance, "Failed to start recording")
+            self.post_ui(self.recording_indicator.hide, key='recording_indicator')
             if self.gui:
-                self.gui.update_recording_status(False)
-                self.gui.update_status("Failed to start recording")
+                self.post_ui(self.gui.update_recording_status, False, key='recording')
+                self.post_ui(self.gui.update_status, "Failed to start recording", key='status')
             return
     
     def stop_recording(self):
-        """Stop recording and transcribe"""
+        """Stop recording and queue the utterance for transcription"""
         if not self.is_recording:
             return
         
         logger.info("Stopping recording...")
-        self.is_recording = False
+        utterance, self.current_utterance = self.current_utterance, None
         
         # Hide recording indicator with audio feedback
-        self.recording_indicator.hide()
-        
-        # Show processing indicator
-        self.processing_indicator.show("Processing audio...")
+        self.post_ui(self.recording_indicator.hide, key='recording_indicator')
         
         # Update UI
         if self.gui:
-            self.gui.update_recording_status(False)
-            self.gui.update_status("Processing...")
+            self.post_ui(self.gui.update_recording_status, False, key='recording')
         
         if self.tray_icon:
             self.tray_icon.update_icon(recording=False)
         
-        # Stop recording and get file
-        audio_file = self.audio_recorder.stop_recording()
+        # Stop recording and get audio
+        audio = self.audio_recorder.stop_recording()
+        for stage, seconds in self.audio_recorder.timings.items():
+            utterance.metrics.add(stage, seconds)
         
-        if not audio_file:
+        if audio is None:
             logger.warning("No audio recorded")
-            self.processing_indicator.hide()
+            self.pipeline.cancel(utterance)
             if self.gui:
-                self.gui.update_status("No audio recorded")
+                self.post_ui(self.gui.update_status, "No audio recorded", key='status')
             return
         
-        self.last_audio_file = audio_file
+        self.last_audio = audio
+        
+        # Persist in the background so saving never delays transcription
+        self.last_audio_file = None
+        if self.config.get('save_recordings', False):
+            self.last_audio_file = self.recording_store.submit(
+                audio, self.audio_recorder.sample_rate
+            )
+        utterance.audio_file = self.last_audio_file
+        
+        logger.info(f"Queued utterance {utterance.id}: {len(audio) / self.audio_recorder.sample_rate:.1f}s of audio")
+        self.recent_utterances.add(utterance)
+        self.pipeline.submit(utterance, audio, self.audio_recorder.sample_rate)
+    
+    def transcribe_utterance(self, utterance):
+        """Transcribe an utterance (runs on the pipeline's transcription worker)"""
+        result = {}
+        
+        def on_result(text, error):
+            result['text'] = text
+            result['error'] = error
+        
+        handler = self.whisper_handler
+        decision = None
+        if self.model_router:
+            decision = self.model_router.choose(utterance.duration)
+            logger.info(f"Utterance {utterance.id}: {decision}")
+            handler = self.model_router.handler(decision.model)
+            utterance.metrics.info['route'] = decision.reason
+            utterance.metrics.info['route_estimate_s'] = round(decision.estimate_s, 3)
+        utterance.metrics.info['model'] = handler.model_name
+        
+        # Model load, mel, encoder and decoder time land in the utterance metrics
+        telemetry.activate(utterance.metrics)
+        try:
+            with utterance.metrics.measure('transcribe'):
+                incremental = self.config.get('output_mode', 'paste') == 'incremental'
+                if incremental and self.config.get('auto_paste', True):
+                    self._transcribe_streaming(utterance, handler, on_result)
+                else:
+                    handler.transcribe(utterance.audio, on_result)
+        finally:
+            telemetry.activate(None)
+        
+        if decision and not result.get('error'):
+            stages = utterance.metrics.stages
+            # Model compute only: streaming mode also spends time typing
+            self.model_router.observe(
+                decision.model, utterance.duration,
+                stages.get('mel', 0.0) + stages.get('encode', 0.0), stages.get('decode', 0.0),
+                load_seconds=stages.get('model_wait', 0.0)
+            )
+        return result.get('text'), result.get('error')
+    
+    def _transcribe_streaming(self, utterance, handler, on_result):
+        """Type text into the focused window as each chunk is decoded"""
+        paster = get_paster()
+        insert = paster.paste_text if self.config.get('incremental_insert', 'type') == 'paste' else None
+        typer = IncrementalTyper(paster.backend, insert)
+        
+        def on_text(text):
+            if not typer.typed:
+                # Earlier utterances must be on screen before this one starts
+                self.pipeline.wait_for_output()
+            typer.update(text)
+            utterance.streamed = True
+            if self.gui:
+                self.post_ui(self.gui.update_transcription, text, key='transcription')
         
-        # Transcribe in background
-        logger.info(f"Transcribing audio file: {audio_file}")
-        self.whisper_handler.transcribe_async(audio_file, self.on_transcription_complete)
+        handler.transcribe_incremental(
+            utterance.audio,
+            on_text,
+            on_result,
+            final_pass=self.config.get('incremental_final_pass', False)
+        )
     
-    def on_transcription_complete(self, text, error):
-        """Handle transcription completion"""
-        # Hide processing indicator
-        self.processing_indicator.hide()
+    def on_utterance_state(self, utterance):
+        """Reflect utterance progress in the UI"""
+        state = utterance.state
+        
+        if state in (dictation_pipeline.QUEUED, dictation_pipeline.TRANSCRIBING):
+            # Don't cover the recording indicator if the next utterance is already recording
+            if not self.is_recording:
+                self.post_ui(self.processing_indicator.show, "Processing audio...", key='processing_indicator')
+                if self.gui:
+                    self.post_ui(self.gui.update_status, "Processing...", key='status')
+            return
+        
+        if not utterance.finished:
+            return
         
-        if error:
-            logger.error(f"Transcription error: {error}")
+        if self.pipeline.pending() == 0:
+            self.post_ui(self.processing_indicator.hide, key='processing_indicator')
+        
+        if utterance.audio is None:
+            return  # Never recorded; already reported by start/stop
+        
+        utterance.metrics.audio_seconds = utterance.duration
+        utterance.metrics.info.setdefault('model', self.whisper_handler.model_name)
+        self.telemetry.record(utterance.metrics)
+        
+        if state == dictation_pipeline.FAILED:
+            logger.error(f"Transcription error: {utterance.error}")
             if self.gui:
-                self.gui.update_status(f"Error: {error}")
+                self.post_ui(self.gui.update_status, f"Error: {utterance.error}", key='status')
             if self.tray_icon:
                 self.tray_icon.notify("Transcription failed", "WinWisp")
-            return
-        
-        if not text:
+        elif not utterance.text:
             logger.warning("No text transcribed")
             if self.gui:
-                self.gui.update_status("No speech detected")
+                self.post_ui(self.gui.update_status, "No speech detected", key='status')
             if self.tray_icon:
                 self.tray_icon.notify("No speech detected", "WinWisp")
-            return
-        
-        logger.info(f"Transcription complete: {text}")
+        elif self.gui and not self.is_recording and self.pipeline.pending() == 0:
+            self.post_ui(self.gui.update_status, "Ready", key='status')
+    
+    def deliver_utterance(self, utterance):
+        """Paste or copy a transcription (runs on the pipeline's output worker, in order)"""
+        text = utterance.text
+        logger.info(f"Transcription complete ({len(text)} characters)")
+        logger.debug(f"Transcription: {text}")
         self.last_transcription = text
+        self.last_delivered = utterance
         
         # Update GUI
         if self.gui:
-            self.gui.update_transcription(text)
-            self.gui.update_status("Ready")
+            self.post_ui(self.gui.update_transcription, text, key='transcription')
+        
+        self._add_to_history(utterance)
+        
+        if utterance.streamed:
+            return  # Already typed while transcribing
         
         # Paste text if auto-paste is enabled
         if self.config.get('auto_paste', True):
             logger.info("Pasting text at cursor...")
-            if paste_text_at_cursor(text):
+            with utterance.metrics.measure('paste'):
+                pasted = paste_text_at_cursor(text)
+            if pasted:
                 if self.tray_icon:
                     self.tray_icon.notify("Text pasted!", "WinWisp")
             else:
@@ -276,13 +588,126 @@ class WinWispApp:
             copy_to_clipboard(text)
             if self.tray_icon:
                 self.tray_icon.notify("Text copied to clipboard", "WinWisp")
+    
+    def retranscribe_last(self):
+        """Transcribe the last utterance again, more accurately, and replace its text"""
+        utterance = self.recent_utterances.last(
+            lambda u: u.state == dictation_pipeline.DONE and u.text
+        )
+        if utterance is None:
+            if self.tray_icon:
+                self.tray_icon.notify("Nothing to re-transcribe", "WinWisp")
+            return
+        if not self.retranscribe_lock.acquire(blocking=False):
+            logger.info("Re-transcription already running")
+            return
+        # Off the hotkey/tray/Tk thread: a larger model can take a while
+        threading.Thread(target=self._retranscribe, args=(utterance,), daemon=True).start()
+    
+    def _retranscribe_model(self, model):
+        """The configured re-transcription model, else the next larger downloaded one"""
+        configured = self.config.get('retranscribe_model', '')
+        if configured:
+            return configured
+        family = model_family(model)
+        if family not in MODEL_ORDER:
+            return model
+        larger = []
+        for name in MODEL_ORDER[MODEL_ORDER.index(family) + 1:]:
+            if model.endswith(".en") and self.model_manager.is_known(f"{name}.en"):
+                name = f"{name}.en"
+            if self.model_manager.is_known(name):
+                larger.append(name)
+        for name in larger:
+            if self.model_manager.is_downloaded(name):
+                return name
+        if larger:
+            # Next time the larger model is ready; this time the preset does the work
+            logger.info(f"Downloading {larger[0]} model for re-transcription in the background")
+            self.model_manager.prefetch(larger[0])
+        return model
+    
+    def _retranscribe_handler_for(self, model):
+        if model == self.whisper_handler.model_name:
+            return self.whisper_handler
+        if self.model_router:
+            return self.model_router.handler(model)
+        if self.retranscribe_handler is None or self.retranscribe_handler.model_name != model:
+            if self.retranscribe_handler:
+                self.config.unsubscribe(self.retranscribe_handler.apply_config)
+                self.retranscribe_handler.unload("replaced for re-transcription")
+            self.retranscribe_handler = self._make_whisper_handler(model)
+        return self.retranscribe_handler
+    
+    def _retranscribe(self, utterance):
+        try:
+            model = self._retranscribe_model(utterance.metrics.info.get('model', self.whisper_handler.model_name))
+            handler = self._retranscribe_handler_for(model)
+            options = {}
+            beam_size = self.config.get('retranscribe_beam_size', 5)
+            if beam_size and handler.backend == "torch":
+                options = {"beam_size": beam_size, "best_of": beam_size}
+            
+            logger.info(f"Re-transcribing utterance {utterance.id} with {model} {options}")
+            self.post_ui(self.processing_indicator.show, "Re-transcribing...", key='processing_indicator')
+            start = time.perf_counter()
+            text = handler.transcribe(utterance.audio, **options)
+            self.post_ui(self.processing_indicator.hide, key='processing_indicator')
+            if text is None:
+                if self.tray_icon:
+                    self.tray_icon.notify("Re-transcription failed", "WinWisp")
+                return
+            logger.info(f"Re-transcribed in {time.perf_counter() - start:.2f}s")
+            logger.debug(f"Re-transcription: {text}")
+            self._replace_text(utterance, text)
+        except Exception as e:
+            logger.error(f"Re-transcription error: {e}", exc_info=True)
+        finally:
+            self.retranscribe_lock.release()
+    
+    def _replace_text(self, utterance, text):
+        """Swap an utterance's output for new text: in place if it was the last one pasted"""
+        old_text, utterance.text = utterance.text, text
+        if self.history and utterance.history_key:
+            self.history.update_text(utterance.history_key, text)
+        if utterance is self.last_delivered:
+            self.last_transcription = text
+            if self.gui:
+                self.post_ui(self.gui.update_transcription, text, key='transcription')
+        if text == old_text:
+            if self.tray_icon:
+                self.tray_icon.notify("Re-transcription found no changes", "WinWisp")
+            return
         
-        # Clean up audio file if not saving recordings
-        if not self.config.get('save_recordings', False):
-            try:
-                os.remove(self.last_audio_file)
-            except:
-                pass
+        if self.config.get('auto_paste', True) and utterance is self.last_delivered and not self.is_recording:
+            # Backspace over the differing tail and insert the new one
+            self.pipeline.wait_for_output()
+            paster = get_paster()
+            typer = IncrementalTyper(paster.backend, paster.paste_text)
+            typer.typed = old_text
+            typer.update(text)
+            if self.tray_icon:
+                self.tray_icon.notify("Transcription replaced", "WinWisp")
+        else:
+            # Later text follows it, so it can't be edited blindly
+            copy_to_clipboard(text)
+            if self.tray_icon:
+                self.tray_icon.notify("Re-transcription copied to clipboard", "WinWisp")
+    
+    def _add_to_history(self, utterance):
+        if not self.history:
+            return
+        stages = utterance.metrics.stages
+        # Stop of recording until the text is ready
+        latency = sum(stages.get(stage, 0.0) for stage in ('stop', 'finalize', 'transcribe'))
+        utterance.history_key = self.history.add(
+            utterance.text,
+            created_at=utterance.metrics.started_at,
+            model=utterance.metrics.info.get('model'),
+            latency_s=round(latency, 3),
+            audio_s=round(utterance.duration, 2),
+            recording=str(utterance.audio_file) if utterance.audio_file else None
+        )
     
     def cleanup(self):
         """Clean up resources"""
@@ -290,16 +715,40 @@ class WinWispApp:
         
         self.hotkey_manager.cleanup()
         self.audio_recorder.cleanup()
+        self.pipeline.shutdown()
+        self.telemetry.close()
+        self.config.flush()
+        if self.history:
+            self.history.close()
+        if self.transcription_cache:
+            self.transcription_cache.flush()
+        if self.ui:
+            self.ui.stop()
+        self.recording_store.close()
         
         if self.tray_icon:
             self.tray_icon.stop()
     
+    def _finish_startup_profile(self):
+        """Write the startup report once the background model load is done"""
+        if self.model_thread:
+            self.model_thread.join()
+        report = profiler.finish(log_dir)
+        if report:
+            logger.info(f"Startup profile written to {report}")
+    
     def run(self):
         """Run the application"""
-        if not self.initialize():
+        with profiler.phase("initialize"):
+            initialized = self.initialize()
+        if not initialized:
             logger.error("Failed to initialize application")
             return 1
         
+        if profiler.enabled:
+            profiler.mark("ready")
+            threading.Thread(target=self._finish_startup_profile, daemon=True).start()
+        
         try:
             # Run GUI main loop
             if self.gui:
@@ -317,7 +766,8 @@ class WinWispApp:
 def main():
     """Main entry point"""
     try:
-        app = WinWispApp()
+        with profiler.phase("WinWispApp.__init__"):
+            app = WinWispApp()
         return app.run()
     except Exception as e:
         logger.error(f"Fatal error: {e}", exc_info=True)
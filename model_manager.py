@@ -0,0 +1,217 @@
+"""
+Whisper checkpoint downloads: resumable, verified, in the background
+"""
+import hashlib
+import http.client
+import logging
+import os
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from pathlib import Path
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BASE_URL = "https://openaipublic.azureedge.net/main/whisper/models/"
+
+# Model name -> (sha256, checkpoint filename), as published by openai-whisper.
+# The download URL is <base_url><sha256>/<filename>.
+MODELS = {
+    "tiny.en": ("d3dd57d32accea0b295c96e26691aa14d8822fac7d9d27d5dc00b4ca2826dd03", "tiny.en.pt"),
+    "tiny": ("65147644a518d12f04e32d6f3b26facc3f8dd46e5390956a9424a650c0ce22b9", "tiny.pt"),
+    "base.en": ("25a8566e1d0c1e2231d1c762132cd20e0f96a85d16145c3a00adf5d1ac670ead", "base.en.pt"),
+    "base": ("ed3a0b6b1c0edf879ad9b11b1af5a0e6ab5db9205f891f668f8b0e6c6326e34e", "base.pt"),
+    "small.en": ("f953ad0fd29cacd07d5a9eda5624af0f6bcf2258be67c92b79389873d91e0872", "small.en.pt"),
+    "small": ("9ecf779972d90ba49c06d968637d720dd632c55bbf19d441fb42bf17a411e794", "small.pt"),
+    "medium.en": ("d7440d1dc186f76616474e0ff0b3b6b879abc9d1a4926b7adfa41db2d497ab4f", "medium.en.pt"),
+    "medium": ("345ae4da62f9b3d59415adc60127b97c714f32e89e936602e85993674d08dcb1", "medium.pt"),
+    "large-v1": ("e4b87e7e0bf463eb8e6956e646f1e277e901512310def2c24bf0e11bd3c28e9a", "large-v1.pt"),
+    "large-v2": ("81f7c96c852ee8fc832187b0132e569d6c3065a3252ed18e56effd0b6a73e524", "large-v2.pt"),
+    "large-v3": ("e5b1a55b89c1367dacf97e3e19bfd829a01529dbfdeefa8caeb59b3f1b81dadb", "large-v3.pt"),
+    "large": ("e5b1a55b89c1367dacf97e3e19bfd829a01529dbfdeefa8caeb59b3f1b81dadb", "large-v3.pt"),
+    "large-v3-turbo": ("aff26ae408abcba5fbf8813c21e62b0941638c5f6eebfb145be0c9839262a19a", "large-v3-turbo.pt"),
+    "turbo": ("aff26ae408abcba5fbf8813c21e62b0941638c5f6eebfb145be0c9839262a19a", "large-v3-turbo.pt"),
+}
+
+
+def default_cache_dir():
+    """The directory whisper.load_model downloads to"""
+    base = os.getenv("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache"))
+    return Path(base) / "whisper"
+
+
+class ModelManager:
+    """
+    Knows where each Whisper checkpoint lives and fetches missing ones.
+
+    Downloads go to a .part file and resume with an HTTP Range request
+    after an interruption. The SHA-256 is computed while streaming and
+    checked before the file is renamed into place, so the cache only ever
+    holds verified checkpoints. base_url can point at any server with the
+    same <sha256>/<filename> layout, such as a local mirror.
+    """
+
+    def __init__(self, cache_dir=None, base_url=None, chunk_size=1024 * 1024, timeout=30, retries=3):
+        self.cache_dir = Path(cache_dir) if cache_dir else default_cache_dir()
+        self.base_url = (base_url or DEFAULT_BASE_URL).rstrip("/") + "/"
+        self.chunk_size = chunk_size
+        self.timeout = timeout
+        self.retries = retries
+
+        # Optional on_progress(name, downloaded_bytes, total_bytes_or_None) hook
+        self.on_progress = None
+        self.progress_interval = 0.25
+
+        self.lock = threading.Lock()
+        self.name_locks = defaultdict(threading.Lock)
+        self.active = set()
+
+    def is_known(self, name):
+        return name in MODELS
+
+    def url(self, name):
+        sha256, filename = MODELS[name]
+        return f"{self.base_url}{sha256}/{filename}"
+
+    def checkpoint_path(self, name):
+        return self.cache_dir / MODELS[name][1]
+
+    def is_downloaded(self, name):
+        """True if the checkpoint is in the cache (or name is an existing file)"""
+        if name in MODELS:
+            return self.checkpoint_path(name).is_file()
+        return os.path.isfile(name)
+
+    def is_downloading(self, name):
+        with self.lock:
+            return name in self.active
+
+    def download(self, name):
+        """
+        Return the checkpoint path for a model, downloading it first if needed.
+        Concurrent calls for the same model share one download. Raises on failure.
+        """
+        if name not in MODELS:
+            if os.path.isfile(name):
+                return Path(name)
+            raise ValueError(f"Unknown model: {name}")
+
+        with self.lock:
+            name_lock = self.name_locks[MODELS[name][1]]
+
+        with name_lock:
+            target = self.checkpoint_path(name)
+            if target.is_file():
+                return target
+
+            with self.lock:
+                self.active.add(name)
+            try:
+                self._fetch(name, target)
+            finally:
+                with self.lock:
+                    self.active.discard(name)
+            return target
+
+    def prefetch(self, name, on_done=None):
+        """
+        Download a model on a background thread
+
+        Args:
+            name: Model name
+            on_done: Optional on_done(name, path, error) called when finished;
+                error is None on success
+        """
+        def run():
+            try:
+                path = self.download(name)
+            except Exception as e:
+                logger.error(f"Error downloading model {name}: {e}")
+                if on_done:
+                    on_done(name, None, str(e))
+                return
+            if on_done:
+                on_done(name, path, None)
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        return thread
+
+    def _fetch(self, name, target):
+        expected, _ = MODELS[name]
+        part = target.with_name(target.name + ".part")
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+        for attempt in range(self.retries):
+            try:
+                digest = self._download_to(name, part)
+                break
+            except urllib.error.HTTPError:
+                raise  # Not a transient failure
+            except (urllib.error.URLError, http.client.HTTPException, OSError) as e:
+                if attempt == self.retries - 1:
+                    raise
+                logger.warning(f"Download of {name} interrupted ({e}), resuming...")
+                time.sleep(2 ** attempt)
+
+        if digest != expected:
+            part.unlink()
+            raise ValueError(f"Checksum mismatch for {name}; the partial download was discarded")
+
+        os.replace(part, target)
+        logger.info(f"Model {name} downloaded to {target}")
+
+    def _download_to(self, name, part):
+        """Stream the checkpoint into part, resuming if it exists; returns the sha256"""
+        offset = part.stat().st_size if part.exists() else 0
+        hasher = hashlib.sha256()
+        if offset:
+            with open(part, "rb") as f:
+                for chunk in iter(lambda: f.read(self.chunk_size), b""):
+                    hasher.update(chunk)
+
+        request = urllib.request.Request(self.url(name), headers={"User-Agent": "WinWisp"})
+        if offset:
+            request.add_header("Range", f"bytes={offset}-")
+
+        try:
+            response = urllib.request.urlopen(request, timeout=self.timeout)
+        except urllib.error.HTTPError as e:
+            if e.code == 416 and offset:
+                return hasher.hexdigest()  # Already complete
+            raise
+
+        with response:
+            if offset and response.status != 206:
+                # Server ignored the Range header; start over
+                offset = 0
+                hasher = hashlib.sha256()
+
+            length = response.headers.get("Content-Length")
+            total = offset + int(length) if length else None
+            downloaded = offset
+            last_report = 0.0
+
+            with open(part, "ab" if offset else "wb") as f:
+                while True:
+                    chunk = response.read(self.chunk_size)
+                    if not chunk:
+                        break
+                    f.write(chunk)
+                    hasher.update(chunk)
+                    downloaded += len(chunk)
+
+                    now = time.monotonic()
+                    if self.on_progress and now - last_report >= self.progress_interval:
+                        last_report = now
+                        self.on_progress(name, downloaded, total)
+
+            if total is not None and downloaded < total:
+                raise ConnectionError(f"connection closed after {downloaded} of {total} bytes")
+
+        if self.on_progress:
+            self.on_progress(name, downloaded, total)
+        return hasher.hexdigest()
@@ -0,0 +1,177 @@
+"""
+Per-utterance model choice from clip length and a latency target
+"""
+import math
+import threading
+
+
+# Least to most accurate
+MODEL_ORDER = ("tiny", "base", "small", "medium", "turbo", "large")
+
+# Whisper pads audio to 30 s windows, so encoding costs the same per window
+# whatever the clip length; decoding grows with the speech in it
+WINDOW_SECONDS = 30
+
+# Rough CPU costs used until a model has been measured: encoder (and mel)
+# seconds per window, decoder seconds per audio second, and load times.
+# GPU runs are much faster; measurements pull these towards the real ones.
+PRIOR_ENCODE_SECONDS = {"tiny": 0.3, "base": 0.6, "small": 2.0, "medium": 6.0, "turbo": 6.0, "large": 12.0}
+PRIOR_DECODE_RTF = {"tiny": 0.05, "base": 0.08, "small": 0.2, "medium": 0.5, "turbo": 0.15, "large": 0.8}
+PRIOR_LOAD_SECONDS = {"tiny": 1, "base": 2, "small": 4, "medium": 10, "turbo": 10, "large": 20}
+
+
+def model_family(name):
+    """tiny/base/small/medium/turbo/large for a whisper model name"""
+    name = name.replace(".en", "")
+    if "turbo" in name:
+        return "turbo"
+    if name.startswith("large"):
+        return "large"
+    return name
+
+
+class RouteDecision:
+    """The model chosen for one utterance and why"""
+
+    def __init__(self, model, audio_seconds, estimate_s, target_s, reason, estimates, preloading=()):
+        self.model = model
+        self.audio_seconds = audio_seconds
+        self.estimate_s = estimate_s
+        self.target_s = target_s
+        self.reason = reason
+        self.estimates = estimates
+        self.preloading = list(preloading)
+
+    def __str__(self):
+        others = ", ".join(f"{name} {seconds:.1f}s" for name, seconds in self.estimates.items())
+        text = (
+            f"Routed {self.audio_seconds:.1f}s of audio to {self.model} "
+            f"(estimated {self.estimate_s:.1f}s, target {self.target_s:.1f}s, {self.reason}); "
+            f"estimates: {others}"
+        )
+        if self.preloading:
+            text += f"; preloading {', '.join(self.preloading)}"
+        return text
+
+
+class ModelRouter:
+    """
+    Picks the most accurate model expected to finish a clip within the
+    latency target, falling back to the fastest one when none can.
+
+    Expected time is the clip's window count times the model's encode time
+    per window, plus its length times the decode time per audio second,
+    plus the load time if the model isn't resident. Each is an exponential
+    moving average of measured runs that starts from the prior, so one
+    unusual clip can't replace it. A more accurate model that
+    only missed the target because of its load time is loaded in the
+    background, so later clips of that length can use it.
+
+    Args:
+        models: Model names to choose from
+        latency_target_s: Transcription time to stay under
+        make_handler: Called with a model name to create its WhisperHandler
+        is_available: Optional callable; models it rejects (e.g. not yet
+            downloaded) are skipped
+        smoothing: Weight of the newest measurement in the averages
+    """
+
+    def __init__(self, models, latency_target_s=3.0, make_handler=None, is_available=None, smoothing=0.3):
+        self.models = sorted(
+            dict.fromkeys(models),
+            key=lambda name: MODEL_ORDER.index(model_family(name)) if model_family(name) in MODEL_ORDER else 0
+        )
+        self.latency_target_s = latency_target_s
+        self.make_handler = make_handler
+        self.is_available = is_available
+        self.smoothing = smoothing
+        self.handlers = []
+        self.encode_seconds = {}
+        self.decode_rtf = {}
+        self.load_seconds = {}
+        self.lock = threading.Lock()
+
+    def add_handler(self, handler):
+        """Route to an existing handler for its model instead of creating one"""
+        with self.lock:
+            self.handlers.append(handler)
+
+    def handler(self, model):
+        """The handler for model, created on first use"""
+        with self.lock:
+            # Looked up by current name: a handler's model can be switched
+            for handler in self.handlers:
+                if handler.model_name == model:
+                    return handler
+            handler = self.make_handler(model)
+            self.handlers.append(handler)
+            return handler
+
+    def _resident(self, model):
+        return any(h.model_name == model and h.is_loaded for h in self.handlers)
+
+    def estimate(self, model, audio_seconds, include_load=True):
+        """Expected seconds to transcribe audio_seconds of audio with model"""
+        family = model_family(model)
+        windows = max(1, math.ceil(audio_seconds / WINDOW_SECONDS))
+        seconds = (
+            windows * self.encode_seconds.get(model, PRIOR_ENCODE_SECONDS.get(family, 10.0))
+            + audio_seconds * self.decode_rtf.get(model, PRIOR_DECODE_RTF.get(family, 1.0))
+        )
+        if include_load and not self._resident(model):
+            seconds += self.load_seconds.get(model, PRIOR_LOAD_SECONDS.get(family, 10))
+        return seconds
+
+    def choose(self, audio_seconds):
+        """Pick a model for a clip; returns a RouteDecision"""
+        with self.lock:
+            candidates = [m for m in self.models if not self.is_available or self.is_available(m)]
+            if not candidates:
+                candidates = self.models[:1]
+            estimates = {model: self.estimate(model, audio_seconds) for model in candidates}
+
+        for model in reversed(candidates):
+            if estimates[model] <= self.latency_target_s:
+                reason = "most accurate within target"
+                break
+        else:
+            model = min(candidates, key=estimates.get)
+            reason = "no model meets target, using fastest"
+
+        preloading = [
+            name for name in candidates[candidates.index(model) + 1:]
+            if not self._resident(name)
+            and self.estimate(name, audio_seconds, include_load=False) <= self.latency_target_s
+        ]
+        for name in preloading:
+            self.handler(name).preload()
+
+        return RouteDecision(
+            model, audio_seconds, estimates[model], self.latency_target_s, reason, estimates, preloading
+        )
+
+    def observe(self, model, audio_seconds, encode_seconds, decode_seconds, load_seconds=0.0):
+        """Feed back a finished transcription's encode (with mel), decode and load time"""
+        family = model_family(model)
+        with self.lock:
+            if audio_seconds > 0 and encode_seconds > 0:
+                windows = max(1, math.ceil(audio_seconds / WINDOW_SECONDS))
+                self.encode_seconds[model] = self._average(
+                    self.encode_seconds.get(model, PRIOR_ENCODE_SECONDS.get(family, 10.0)), encode_seconds / windows
+                )
+            if audio_seconds > 0 and decode_seconds > 0:
+                self.decode_rtf[model] = self._average(
+                    self.decode_rtf.get(model, PRIOR_DECODE_RTF.get(family, 1.0)), decode_seconds / audio_seconds
+                )
+            if load_seconds > 0:
+                self.load_seconds[model] = self._average(
+                    self.load_seconds.get(model, PRIOR_LOAD_SECONDS.get(family, 10)), load_seconds
+                )
+
+    def _average(self, previous, value):
+        return previous + self.smoothing * (value - previous)
+
+    def change_language(self, language):
+        with self.lock:
+            for handler in self.handlers:
+                handler.change_language(language)
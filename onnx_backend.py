@@ -0,0 +1,276 @@
+"""
+Whisper inference on ONNX Runtime (CPU), without torch
+
+Runs the graphs written by onnx_export.py. Log-mel features are computed
+with numpy, text is decoded greedily without timestamps in consecutive
+30 s windows, and tokens are turned into text with tiktoken. Each window
+decodes at most as many tokens as its audio length warrants and stops
+early when the output loops.
+"""
+import base64
+import json
+import logging
+import time
+from pathlib import Path
+
+import numpy as np
+
+import telemetry
+from decode_guards import MAX_REPEATS, compression_ratio, is_looping, sample_len_for
+
+
+logger = logging.getLogger(__name__)
+
+# Bump when the exported graphs or metadata change so old exports are redone
+EXPORT_VERSION = 1
+
+SAMPLE_RATE = 16000
+N_FFT = 400
+HOP_LENGTH = 160
+N_SAMPLES = 30 * SAMPLE_RATE
+N_FRAMES = N_SAMPLES // HOP_LENGTH
+
+
+def export_dir(checkpoint):
+    """Where the exported graphs of a checkpoint live"""
+    checkpoint = Path(checkpoint)
+    return checkpoint.parent / "winwisp" / "onnx" / f"{checkpoint.stem}.v{EXPORT_VERSION}"
+
+
+def is_current(checkpoint, int8=False):
+    """True if an export exists, is newer than the checkpoint and has int8 graphs if asked"""
+    directory = export_dir(checkpoint)
+    try:
+        fresh = (directory / "meta.json").stat().st_mtime >= Path(checkpoint).stat().st_mtime
+    except OSError:
+        return False
+    return fresh and (not int8 or (directory / "decoder.int8.onnx").exists())
+
+
+def load(checkpoint, int8=False):
+    """Load the exported graphs of checkpoint, exporting them first (needs torch) if missing"""
+    if not is_current(checkpoint, int8=int8):
+        logger.info("Exporting ONNX graphs, this happens once per model...")
+        import onnx_export
+        onnx_export.export(checkpoint, int8=int8)
+    return OnnxWhisper(export_dir(checkpoint), int8=int8)
+
+
+def log_mel_spectrogram(audio, filters, padding=0):
+    """numpy port of whisper.log_mel_spectrogram"""
+    audio = np.pad(np.asarray(audio, dtype=np.float32), (0, padding))
+    # torch.stft(center=True) reflect-pads half a window on both sides
+    padded = np.pad(audio, N_FFT // 2, mode="reflect")
+    frames = np.lib.stride_tricks.sliding_window_view(padded, N_FFT)[::HOP_LENGTH]
+    window = (0.5 - 0.5 * np.cos(2 * np.pi * np.arange(N_FFT) / N_FFT)).astype(np.float32)
+    magnitudes = np.abs(np.fft.rfft(frames * window, axis=-1)[:-1]) ** 2
+
+    mel_spec = filters @ magnitudes.T.astype(np.float32)
+    log_spec = np.log10(np.maximum(mel_spec, 1e-10))
+    log_spec = np.maximum(log_spec, log_spec.max() - 8.0)
+    return ((log_spec + 4.0) / 4.0).astype(np.float32)
+
+
+def _softmax(logits):
+    exp = np.exp(logits - logits.max())
+    return exp / exp.sum()
+
+
+def _fit_window(mel):
+    """Pad or trim mel frames to one 30 s window"""
+    if mel.shape[-1] >= N_FRAMES:
+        return mel[:, :N_FRAMES]
+    return np.pad(mel, ((0, 0), (0, N_FRAMES - mel.shape[-1])))
+
+
+class OnnxWhisper:
+    """
+    An exported Whisper model on ONNX Runtime.
+
+    transcribe() takes the same core options as whisper's (language, task,
+    initial_prompt, sample_len) and returns a dict with "text", so
+    WhisperHandler can use either backend the same way.
+
+    Args:
+        directory: Export directory written by onnx_export.export
+        int8: Use the int8 weight-quantized graphs
+        threads: ONNX Runtime intra-op threads (0 = library default)
+    """
+
+    def __init__(self, directory, int8=False, threads=0):
+        import onnxruntime
+        import tiktoken
+
+        directory = Path(directory)
+        with open(directory / "meta.json") as f:
+            meta = json.load(f)
+        if meta.get("version") != EXPORT_VERSION:
+            raise ValueError(f"{directory} is export version {meta.get('version')}, need {EXPORT_VERSION}")
+        self.dims = meta["dims"]
+        self.multilingual = meta["multilingual"]
+        self.tokens = meta["tokenizer"]
+        self.filters = np.load(directory / "mel_filters.npy")
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        suffix = ".int8.onnx" if int8 else ".onnx"
+        self.encoder = onnxruntime.InferenceSession(
+            str(directory / f"encoder{suffix}"), options, providers=["CPUExecutionProvider"]
+        )
+        self.decoder = onnxruntime.InferenceSession(
+            str(directory / f"decoder{suffix}"), options, providers=["CPUExecutionProvider"]
+        )
+
+        with open(directory / self.tokens["vocab"]) as f:
+            ranks = {base64.b64decode(token): int(rank) for token, rank in (line.split() for line in f if line.strip())}
+        self.encoding = tiktoken.Encoding(
+            name=self.tokens["vocab"],
+            explicit_n_vocab=self.tokens["n_vocab"],
+            pat_str=self.tokens["pat_str"],
+            mergeable_ranks=ranks,
+            special_tokens=self.tokens["special_tokens"]
+        )
+        self.suppress = np.array(self.tokens["suppress_tokens"])
+        self.suppress_blank = np.array(self.tokens["suppress_blank"])
+        # Optional RecentUtterances to reuse log-mel features from
+        self.feature_cache = None
+
+    def mel_window(self, audio):
+        """Log-mel features of the first 30 s of audio"""
+        return _fit_window(log_mel_spectrogram(audio[:N_SAMPLES], self.filters, padding=N_SAMPLES))
+
+    def _decoder_step(self, tokens, past, cross):
+        logits, keys, values = self.decoder.run(None, {
+            "tokens": np.array([tokens], dtype=np.int64),
+            "past_keys": past[0],
+            "past_values": past[1],
+            "cross_keys": cross[0],
+            "cross_values": cross[1],
+        })
+        return logits[0], (keys, values)
+
+    def _empty_past(self):
+        shape = (self.dims["n_text_layer"], 1, 0, self.dims["n_text_state"])
+        return np.zeros(shape, dtype=np.float32), np.zeros(shape, dtype=np.float32)
+
+    def detect_language(self, cross):
+        """Most likely language code given the encoded window"""
+        languages = self.tokens["languages"]
+        logits, _ = self._decoder_step([self.tokens["sot"]], self._empty_past(), cross)
+        codes = list(languages)
+        ids = np.array([languages[code] for code in codes])
+        return codes[int(logits[0, ids].argmax())]
+
+    def decode_window(self, mel, language=None, task="transcribe", prompt=(), sample_len=None,
+                      max_repeats=MAX_REPEATS):
+        """
+        Greedy-decode one 30 s mel window. Returns the text tokens;
+        self.language, self.no_speech_prob and self.avg_logprob describe
+        the decode.
+        """
+        start = time.perf_counter()
+        cross = self.encoder.run(None, {"mel": mel[None].astype(np.float32)})
+        telemetry.record_current("encode", time.perf_counter() - start)
+
+        start = time.perf_counter()
+        n_ctx = self.dims["n_text_ctx"]
+        sample_len = sample_len or n_ctx // 2
+
+        sequence = [self.tokens["sot"]]
+        if self.multilingual:
+            if language is None:
+                language = self.detect_language(cross)
+            sequence += [self.tokens["languages"][language], self.tokens[task]]
+        sequence.append(self.tokens["no_timestamps"])
+        sot_index = 0
+        if prompt:
+            prompt = list(prompt)[-(n_ctx // 2 - 1):]
+            sequence = [self.tokens["sot_prev"]] + prompt + sequence
+            sot_index = len(prompt) + 1
+        self.language = language
+
+        tokens = list(sequence)
+        sample_begin = len(tokens)
+        feed = tokens
+        past = self._empty_past()
+        eot = self.tokens["eot"]
+        self.no_speech_prob = 0.0
+        sum_logprob = 0.0
+        for _ in range(sample_len):
+            logits, past = self._decoder_step(feed, past, cross)
+            if len(tokens) == sample_begin:
+                self.no_speech_prob = float(_softmax(logits[sot_index])[self.tokens["no_speech"]])
+            logits = logits[-1].copy()
+            if len(tokens) == sample_begin:
+                logits[self.suppress_blank] = -np.inf
+            logits[self.suppress] = -np.inf
+
+            token = int(logits.argmax())
+            if len(tokens) >= n_ctx:
+                break
+            sum_logprob += float(np.log(_softmax(logits)[token]))
+            if token == eot:
+                break
+            tokens.append(token)
+            feed = [token]
+            if max_repeats and is_looping(tokens[sample_begin:], max_repeats):
+                break  # As if end-of-text were forced
+
+        telemetry.record_current("decode", time.perf_counter() - start)
+        self.avg_logprob = sum_logprob / (len(tokens) - sample_begin + 1)
+        return tokens[sample_begin:]
+
+    def decode_text(self, tokens):
+        eot = self.tokens["eot"]
+        return self.encoding.decode([t for t in tokens if t < eot])
+
+    def transcribe(self, audio, language=None, task="transcribe", initial_prompt=None, sample_len=None,
+                   condition_on_previous_text=True, max_repeats=MAX_REPEATS, **unused_options):
+        """
+        Transcribe 16 kHz mono float32 audio (or an audio file) of any
+        length. Like whisper's, the result has "segments" (one per window)
+        with no_speech_prob, avg_logprob and compression_ratio.
+        """
+        if isinstance(audio, str):
+            from engine.core import load_audio
+            audio = load_audio(audio)
+        key = ("onnx", self.filters.shape[0], N_SAMPLES)
+        mel = self.feature_cache.get_features(audio, key) if self.feature_cache else None
+        if mel is None:
+            start = time.perf_counter()
+            mel = log_mel_spectrogram(audio, self.filters, padding=N_SAMPLES)
+            telemetry.record_current("mel", time.perf_counter() - start)
+            if self.feature_cache:
+                self.feature_cache.put_features(audio, key, mel)
+        content_frames = mel.shape[-1] - N_FRAMES
+
+        prompt = self.encoding.encode_ordinary(" " + initial_prompt.strip()) if initial_prompt else []
+        all_tokens = []
+        segments = []
+        # Without timestamps there is no better cut point than the window edge
+        for seek in range(0, content_frames, N_FRAMES):
+            context = prompt + all_tokens if condition_on_previous_text else prompt
+            frames = min(N_FRAMES, content_frames - seek)
+            window_len = sample_len_for(frames * HOP_LENGTH / SAMPLE_RATE, self.dims["n_text_ctx"])
+            tokens = self.decode_window(
+                _fit_window(mel[:, seek:seek + N_FRAMES]), language, task, context,
+                min(sample_len or window_len, window_len), max_repeats
+            )
+            language = self.language
+            text = self.decode_text(tokens)
+            segments.append({
+                "id": len(segments),
+                "seek": seek,
+                "start": seek * HOP_LENGTH / SAMPLE_RATE,
+                "end": (seek + frames) * HOP_LENGTH / SAMPLE_RATE,
+                "text": text,
+                "tokens": tokens,
+                "avg_logprob": self.avg_logprob,
+                "compression_ratio": compression_ratio(text),
+                "no_speech_prob": self.no_speech_prob,
+            })
+            all_tokens += tokens
+
+        return {"text": self.decode_text(all_tokens), "segments": segments, "language": language}
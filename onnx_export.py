@@ -0,0 +1,278 @@
+"""
+Export Whisper checkpoints to ONNX graphs for onnx_backend
+
+Two graphs are written per model: the encoder, which also projects the
+audio features to every decoder layer's cross-attention keys/values, and
+a decoder that takes and returns the self-attention keys/values of the
+tokens decoded so far. Optionally both are quantized to int8 weights.
+
+Usage:
+    python onnx_export.py small --int8
+    python onnx_export.py path/to/checkpoint.pt --verify clip.wav
+"""
+import argparse
+import inspect
+import json
+import os
+import shutil
+import sys
+import time
+import warnings
+
+import numpy as np
+import torch
+import whisper
+from whisper.decoding import DecodingOptions, DecodingTask
+from whisper.tokenizer import get_tokenizer
+
+from onnx_backend import EXPORT_VERSION, OnnxWhisper, export_dir, is_current
+
+
+OPSET = 17
+
+
+def _attention(attn, q, k, v, mask=None):
+    """whisper's non-SDPA attention, which exports to plain ONNX ops"""
+    n_batch, n_ctx, n_state = q.shape
+    scale = (n_state // attn.n_head) ** -0.25
+    q = q.view(n_batch, n_ctx, attn.n_head, -1).permute(0, 2, 1, 3)
+    k = k.view(*k.shape[:2], attn.n_head, -1).permute(0, 2, 3, 1)
+    v = v.view(*v.shape[:2], attn.n_head, -1).permute(0, 2, 1, 3)
+    qk = (q * scale) @ (k * scale)
+    if mask is not None:
+        qk = qk + mask
+    w = torch.softmax(qk.float(), dim=-1).to(q.dtype)
+    return attn.out((w @ v).permute(0, 2, 1, 3).flatten(start_dim=2))
+
+
+class EncoderWithCrossKV(torch.nn.Module):
+    """mel -> cross-attention keys/values, each (n_layer, batch, n_audio_ctx, n_state)"""
+
+    def __init__(self, model):
+        super().__init__()
+        self.encoder = model.encoder
+        self.blocks = model.decoder.blocks
+
+    def forward(self, mel):
+        xa = self.encoder(mel)
+        keys = torch.stack([block.cross_attn.key(xa) for block in self.blocks])
+        values = torch.stack([block.cross_attn.value(xa) for block in self.blocks])
+        return keys, values
+
+
+class DecoderWithPast(torch.nn.Module):
+    """
+    (tokens, past keys/values, cross keys/values) -> (logits, present
+    keys/values). Past/present are (n_layer, batch, n_past, n_state);
+    the position of the first token is n_past.
+    """
+
+    def __init__(self, model):
+        super().__init__()
+        self.decoder = model.decoder
+
+    def forward(self, tokens, past_keys, past_values, cross_keys, cross_values):
+        decoder = self.decoder
+        offset = past_keys.shape[2]
+        end = offset + tokens.shape[1]
+        x = decoder.token_embedding(tokens) + decoder.positional_embedding[offset:end]
+        mask = decoder.mask[offset:end, :end]
+
+        keys, values = [], []
+        for i, block in enumerate(decoder.blocks):
+            h = block.attn_ln(x)
+            k = torch.cat([past_keys[i], block.attn.key(h)], dim=1)
+            v = torch.cat([past_values[i], block.attn.value(h)], dim=1)
+            keys.append(k)
+            values.append(v)
+            x = x + _attention(block.attn, block.attn.query(h), k, v, mask)
+
+            h = block.cross_attn_ln(x)
+            x = x + _attention(block.cross_attn, block.cross_attn.query(h), cross_keys[i], cross_values[i])
+
+            x = x + block.mlp(block.mlp_ln(x))
+
+        x = decoder.ln(x)
+        logits = x @ torch.transpose(decoder.token_embedding.weight, 0, 1)
+        return logits, torch.stack(keys), torch.stack(values)
+
+
+def _onnx_export(module, args, path, input_names, output_names, dynamic_axes):
+    kwargs = {}
+    if "dynamo" in inspect.signature(torch.onnx.export).parameters:
+        # The TorchScript exporter handles the data-dependent slicing by n_past
+        kwargs["dynamo"] = False
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        torch.onnx.export(
+            module, args, str(path),
+            input_names=input_names, output_names=output_names,
+            dynamic_axes=dynamic_axes, opset_version=OPSET, do_constant_folding=True,
+            **kwargs
+        )
+
+
+def _tokenizer_meta(model):
+    """Everything onnx_backend needs from whisper's tokenizer, without whisper"""
+    tokenizer = get_tokenizer(model.is_multilingual, num_languages=model.num_languages)
+    encoding = tokenizer.encoding
+    task = DecodingTask(model, DecodingOptions(language="en" if model.is_multilingual else None))
+    languages = {}
+    if model.is_multilingual:
+        languages = dict(zip(tokenizer.all_language_codes, tokenizer.all_language_tokens))
+
+    return {
+        "vocab": os.path.basename(encoding.name),
+        "pat_str": encoding._pat_str,
+        "special_tokens": encoding._special_tokens,
+        "n_vocab": encoding.n_vocab,
+        "eot": tokenizer.eot,
+        "sot": tokenizer.sot,
+        "sot_prev": tokenizer.sot_prev,
+        "transcribe": tokenizer.transcribe,
+        "translate": tokenizer.translate,
+        "no_timestamps": tokenizer.no_timestamps,
+        "no_speech": tokenizer.no_speech,
+        "languages": languages,
+        "suppress_tokens": list(task._get_suppress_tokens()),
+        "suppress_blank": tokenizer.encode(" ") + [tokenizer.eot],
+    }
+
+
+def export(checkpoint, int8=False):
+    """
+    Write the ONNX graphs and runtime metadata for checkpoint (a file
+    path) into export_dir(checkpoint) and return that directory.
+    """
+    directory = export_dir(checkpoint)
+    temp = directory.with_name(directory.name + ".tmp")
+    shutil.rmtree(temp, ignore_errors=True)
+    temp.mkdir(parents=True)
+
+    model = whisper.load_model(checkpoint, device="cpu").float().eval()
+    dims = model.dims
+    n_layer, n_state = dims.n_text_layer, dims.n_text_state
+
+    mel = torch.zeros(1, dims.n_mels, dims.n_audio_ctx * 2)
+    with torch.no_grad():
+        cross_keys, cross_values = EncoderWithCrossKV(model)(mel)
+    past = torch.zeros(n_layer, 1, 2, n_state)
+    tokens = torch.zeros(1, 3, dtype=torch.long)
+
+    cross_axes = {1: "batch"}
+    _onnx_export(
+        EncoderWithCrossKV(model), (mel,), temp / "encoder.onnx",
+        ["mel"], ["cross_keys", "cross_values"],
+        {"mel": {0: "batch"}, "cross_keys": cross_axes, "cross_values": cross_axes}
+    )
+    past_axes = {1: "batch", 2: "n_past"}
+    present_axes = {1: "batch", 2: "n_present"}
+    _onnx_export(
+        DecoderWithPast(model), (tokens, past, past, cross_keys, cross_values), temp / "decoder.onnx",
+        ["tokens", "past_keys", "past_values", "cross_keys", "cross_values"],
+        ["logits", "present_keys", "present_values"],
+        {
+            "tokens": {0: "batch", 1: "n_tokens"},
+            "past_keys": past_axes, "past_values": past_axes,
+            "cross_keys": cross_axes, "cross_values": cross_axes,
+            "logits": {0: "batch", 1: "n_tokens"},
+            "present_keys": present_axes, "present_values": present_axes,
+        }
+    )
+
+    if int8:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        for name in ("encoder", "decoder"):
+            quantize_dynamic(
+                str(temp / f"{name}.onnx"), str(temp / f"{name}.int8.onnx"), weight_type=QuantType.QInt8
+            )
+
+    tokenizer = _tokenizer_meta(model)
+    shutil.copyfile(
+        os.path.join(os.path.dirname(whisper.__file__), "assets", tokenizer["vocab"]),
+        temp / tokenizer["vocab"]
+    )
+    np.save(temp / "mel_filters.npy", whisper.audio.mel_filters("cpu", dims.n_mels).numpy())
+
+    meta = {
+        "version": EXPORT_VERSION,
+        "dims": dims.__dict__,
+        "multilingual": model.is_multilingual,
+        "int8": int8,
+        "tokenizer": tokenizer,
+    }
+    with open(temp / "meta.json", "w") as f:
+        json.dump(meta, f, indent=2)
+
+    shutil.rmtree(directory, ignore_errors=True)
+    os.replace(temp, directory)
+    return directory
+
+
+def verify(checkpoint, audio, int8=False, sample_len=96):
+    """
+    Compare greedy tokens from ONNX Runtime with whisper's decoder on the
+    first 30 s of audio. Returns True if they match.
+    """
+    from engine.core import load_audio
+
+    if isinstance(audio, str):
+        audio = load_audio(audio)
+    model = whisper.load_model(checkpoint, device="cpu")
+    language = "en" if model.is_multilingual else None
+
+    start = time.perf_counter()
+    mel = whisper.log_mel_spectrogram(whisper.pad_or_trim(audio), model.dims.n_mels)
+    expected = whisper.decode(model, mel, DecodingOptions(
+        language=language, without_timestamps=True, fp16=False, sample_len=sample_len
+    ))
+    torch_seconds = time.perf_counter() - start
+
+    onnx_model = OnnxWhisper(export_dir(checkpoint), int8=int8)
+    start = time.perf_counter()
+    tokens = onnx_model.decode_window(
+        onnx_model.mel_window(audio), language=language, sample_len=sample_len, max_repeats=0
+    )
+    onnx_seconds = time.perf_counter() - start
+
+    print(f"torch: {len(expected.tokens)} tokens in {torch_seconds:.2f}s")
+    print(f"onnx{' int8' if int8 else ''}: {len(tokens)} tokens in {onnx_seconds:.2f}s")
+    matched = next((i for i, (a, b) in enumerate(zip(tokens, expected.tokens)) if a != b), None)
+    if matched is None and len(tokens) == len(expected.tokens):
+        print("Tokens match")
+        return True
+    print(f"Tokens differ from position {matched if matched is not None else min(len(tokens), len(expected.tokens))}")
+    return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("model", help="Model name (downloaded if needed) or checkpoint path")
+    parser.add_argument("--int8", action="store_true", help="Also write int8 weight-quantized graphs")
+    parser.add_argument("--force", action="store_true", help="Export even if up to date")
+    parser.add_argument("--verify", metavar="AUDIO", help="Compare ONNX and torch output on an audio file")
+    args = parser.parse_args()
+
+    checkpoint = args.model
+    if not os.path.isfile(checkpoint):
+        from model_manager import ModelManager
+        checkpoint = str(ModelManager().download(args.model))
+
+    if args.force or not is_current(checkpoint, int8=args.int8):
+        start = time.perf_counter()
+        print(f"Exporting {checkpoint}...")
+        directory = export(checkpoint, int8=args.int8)
+        print(f"Exported to {directory} in {time.perf_counter() - start:.1f}s")
+    else:
+        print(f"Up to date: {export_dir(checkpoint)}")
+
+    if args.verify:
+        ok = verify(checkpoint, args.verify)
+        if args.int8:
+            # Quantized weights change the logits; report how far it drifts
+            verify(checkpoint, args.verify, int8=True)
+        sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+The last few utterances, kept in memory with their log-mel features
+"""
+import threading
+from collections import deque
+
+
+class RecentUtterances:
+    """
+    Holds the last max_items utterances (audio included) so one can be
+    transcribed again without re-recording or reading a file.
+
+    It also caches each utterance's log-mel features: the mel functions of
+    both backends look features up by the audio buffer they are given, so
+    a second pass over the same buffer skips the spectrogram. Buffers that
+    are not held here are never cached.
+    """
+
+    def __init__(self, max_items=3):
+        self.entries = deque(maxlen=max(1, max_items))
+        self.lock = threading.Lock()
+
+    def add(self, utterance):
+        with self.lock:
+            self.entries.append((utterance, {}))
+
+    def last(self, predicate=None):
+        """Most recent utterance (matching predicate, if given)"""
+        with self.lock:
+            for utterance, _ in reversed(self.entries):
+                if predicate is None or predicate(utterance):
+                    return utterance
+        return None
+
+    def _features_for(self, audio):
+        for utterance, features in self.entries:
+            if utterance.audio is audio:
+                return features
+        return None
+
+    def get_features(self, audio, key):
+        """Cached features of audio for key (backend and mel settings), or None"""
+        with self.lock:
+            features = self._features_for(audio)
+            return features.get(key) if features is not None else None
+
+    def put_features(self, audio, key, value):
+        with self.lock:
+            features = self._features_for(audio)
+            if features is not None:
+                features[key] = value
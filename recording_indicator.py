@@ -15,12 +15,27 @@ class RecordingIndicator:
     Similar to VoiceInk's recording indicator on macOS.
     """
     
-    def __init__(self):
+    # Pulse frame intervals (ms): normal, and while inference is running
+    FRAME_MS = 33
+    BUSY_FRAME_MS = 100
+    IDLE_FRAME_MS = 66
+    
+    def __init__(self, level_source=None, busy_source=None):
+        """
+        Args:
+            level_source: Returns the current input RMS level (0..1)
+            busy_source: Returns True while transcription is running, to
+                render at a lower frame rate
+        """
         self.window = None
         self.canvas = None
         self.is_visible = False
         self.animation_running = False
-        self.pulse_angle = 0
+        self.level_source = level_source
+        self.busy_source = busy_source
+        self.display_level = 0.0
+        self.pulse_job = None
+        self.blink_job = None
         
     def play_start_tone(self):
         """Play ascending tone to indicate recording started"""
@@ -49,7 +64,7 @@ class RecordingIndicator:
         threading.Thread(target=play, daemon=True).start()
     
     def create_window(self):
-        """Create the always-on-top indicator window"""
+        """Create the always-on-top indicator window (once, hidden)"""
         self.window = tk.Toplevel()
         self.window.title("")
         
@@ -121,22 +136,31 @@ class RecordingIndicator:
             fill='white', outline=''
         )
         
-        self.is_visible = True
-        
-        # Start animations
-        self.animation_running = True
-        self.animate_pulse()
-        self.animate_blink()
+        # Kept around and shown/hidden with deiconify/withdraw
+        self.window.withdraw()
+    
+    def _read_level(self):
+        """Current input level mapped from -60..0 dBFS to 0..1"""
+        try:
+            level = self.level_source() if self.level_source else 0.0
+        except Exception:
+            level = 0.0
+        db = 20 * math.log10(max(level, 1e-6))
+        return min(1.0, max(0.0, (db + 60) / 60))
     
     def animate_pulse(self):
-        """Animate the pulsing circle effect"""
+        """Scale the pulsing circle with the live input level"""
+        self.pulse_job = None
         if not self.animation_running or not self.window:
             return
         
         try:
-            # Calculate pulse size
-            self.pulse_angle = (self.pulse_angle + 10) % 360
-            scale = 1 + 0.3 * math.sin(math.radians(self.pulse_angle))
+            # Fast attack, slower release, like a level meter
+            target = self._read_level()
+            previous = self.display_level
+            rate = 0.6 if target > previous else 0.2
+            self.display_level = previous + rate * (target - previous)
+            scale = 0.7 + 0.6 * self.display_level
             
             # Update pulse circle
             center_x = 40
@@ -150,17 +174,24 @@ class RecordingIndicator:
             )
             
             # Adjust opacity based on scale
-            alpha = int(255 * (1.3 - scale))
+            alpha = min(255, max(0, int(255 * (1.3 - scale))))
             color = f'#{alpha:02x}{alpha:02x}{alpha:02x}'
             self.canvas.itemconfig(self.pulse_circle, fill=color)
             
-            # Schedule next frame
-            self.window.after(50, self.animate_pulse)
+            # Adaptive frame rate: back off while inference runs or the level is steady
+            if self.busy_source and self.busy_source():
+                delay = self.BUSY_FRAME_MS
+            elif abs(self.display_level - previous) < 0.01:
+                delay = self.IDLE_FRAME_MS
+            else:
+                delay = self.FRAME_MS
+            self.pulse_job = self.window.after(delay, self.animate_pulse)
         except:
             pass
     
     def animate_blink(self):
         """Animate the blinking dot"""
+        self.blink_job = None
         if not self.animation_running or not self.window:
             return
         
@@ -171,16 +202,37 @@ class RecordingIndicator:
             self.canvas.itemconfig(self.blink_dot, fill=new_color)
             
             # Schedule next blink
-            self.window.after(500, self.animate_blink)
+            self.blink_job = self.window.after(500, self.animate_blink)
         except:
             pass
     
+    def _cancel_animations(self):
+        for job in (self.pulse_job, self.blink_job):
+            if job:
+                try:
+                    self.window.after_cancel(job)
+                except:
+                    pass
+        self.pulse_job = None
+        self.blink_job = None
+    
     def show(self):
         """Show the recording indicator"""
         if not self.is_visible:
             try:
-                self.create_window()
+                if not self.window:
+                    self.create_window()
+                self.window.deiconify()
+                self.window.lift()
+                self.is_visible = True
                 self.play_start_tone()
+                
+                # Start animations
+                self.display_level = 0.0
+                self.animation_running = True
+                self._cancel_animations()
+                self.animate_pulse()
+                self.animate_blink()
             except Exception as e:
                 print(f"Error showing recording indicator: {e}")
     
@@ -189,21 +241,10 @@ class RecordingIndicator:
         if self.is_visible and self.window:
             try:
                 self.animation_running = False
+                self._cancel_animations()
                 self.play_stop_tone()
-                
-                # Delay destruction slightly to allow tone to play
-                def destroy():
-                    time.sleep(0.2)
-                    if self.window:
-                        try:
-                            self.window.destroy()
-                        except:
-                            pass
-                    self.window = None
-                    self.canvas = None
-                    self.is_visible = False
-                
-                threading.Thread(target=destroy, daemon=True).start()
+                self.window.withdraw()
+                self.is_visible = False
             except Exception as e:
                 print(f"Error hiding recording indicator: {e}")
     
@@ -224,42 +265,50 @@ class ProcessingIndicator:
     
     def __init__(self):
         self.window = None
+        self.label = None
         self.is_visible = False
     
+    def create_window(self):
+        """Create the indicator window (once, hidden)"""
+        self.window = tk.Toplevel()
+        self.window.title("")
+        self.window.overrideredirect(True)
+        
+        width = 200
+        height = 50
+        
+        screen_width = self.window.winfo_screenwidth()
+        x = (screen_width - width) // 2
+        y = 20
+        
+        self.window.geometry(f"{width}x{height}+{x}+{y}")
+        self.window.attributes('-topmost', True)
+        self.window.attributes('-alpha', 0.95)
+        
+        frame = tk.Frame(self.window, bg='#2196F3', padx=15, pady=10)
+        frame.pack(fill=tk.BOTH, expand=True)
+        
+        self.label = tk.Label(
+            frame,
+            text="Processing...",
+            bg='#2196F3',
+            fg='white',
+            font=('Segoe UI', 11)
+        )
+        self.label.pack()
+        
+        self.window.withdraw()
+    
     def show(self, message="Processing..."):
         """Show processing indicator"""
-        if self.is_visible:
-            return
-        
         try:
-            self.window = tk.Toplevel()
-            self.window.title("")
-            self.window.overrideredirect(True)
-            
-            width = 200
-            height = 50
-            
-            screen_width = self.window.winfo_screenwidth()
-            x = (screen_width - width) // 2
-            y = 20
-            
-            self.window.geometry(f"{width}x{height}+{x}+{y}")
-            self.window.attributes('-topmost', True)
-            self.window.attributes('-alpha', 0.95)
-            
-            frame = tk.Frame(self.window, bg='#2196F3', padx=15, pady=10)
-            frame.pack(fill=tk.BOTH, expand=True)
-            
-            label = tk.Label(
-                frame,
-                text=message,
-                bg='#2196F3',
-                fg='white',
-                font=('Segoe UI', 11)
-            )
-            label.pack()
-            
-            self.is_visible = True
+            if not self.window:
+                self.create_window()
+            self.label.config(text=message)
+            if not self.is_visible:
+                self.window.deiconify()
+                self.window.lift()
+                self.is_visible = True
         except Exception as e:
             print(f"Error showing processing indicator: {e}")
     
@@ -267,8 +316,7 @@ class ProcessingIndicator:
         """Hide processing indicator"""
         if self.is_visible and self.window:
             try:
-                self.window.destroy()
-                self.window = None
+                self.window.withdraw()
                 self.is_visible = False
             except:
                 pass
@@ -0,0 +1,198 @@
+"""
+Background persistence of recordings with compression and retention
+"""
+import os
+import queue
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+from scipy.io.wavfile import write as write_wav
+
+try:
+    import soundfile as sf
+except ImportError:  # FLAC/Opus need libsndfile via soundfile
+    sf = None
+
+
+# Format name -> (file extension, soundfile format, soundfile subtype)
+RECORDING_FORMATS = {
+    "wav": (".wav", "WAV", "PCM_16"),
+    "flac": (".flac", "FLAC", "PCM_16"),
+    "opus": (".ogg", "OGG", "OPUS"),
+}
+
+# Queued instead of a clip to apply changed retention limits on the worker
+_RETENTION = "retention"
+
+
+class RecordingStore:
+    """
+    Writes recordings to disk on a background thread.
+
+    Clips are handed over as float32 arrays, so saving never delays
+    transcription. Retention limits are enforced after every write, and
+    when they change, by dropping the oldest files first.
+    """
+
+    # Config keys apply_config handles
+    CONFIG_KEYS = ("recording_format", "recordings_max_total_mb", "recordings_max_age_days")
+
+    def __init__(self, directory, fmt="flac", max_total_mb=0, max_age_days=0):
+        self.directory = Path(directory)
+        self.format = fmt if fmt in RECORDING_FORMATS else "wav"
+        self.max_total_bytes = int(max_total_mb * 1024 * 1024)
+        self.max_age_seconds = max_age_days * 24 * 3600
+
+        self.queue = queue.Queue()
+        self.worker = None
+        self.lock = threading.Lock()
+
+        # Optional on_written(seconds) hook, called after each write
+        self.on_written = None
+
+        # Oldest-first list of (mtime, path, size), built lazily on the worker
+        self.files = None
+        self.total_bytes = 0
+
+    def configure(self, fmt=None, max_total_mb=None, max_age_days=None):
+        """Update format and retention limits; changed limits apply to existing recordings right away"""
+        if fmt is not None:
+            self.format = fmt if fmt in RECORDING_FORMATS else "wav"
+        if max_total_mb is not None:
+            self.max_total_bytes = int(max_total_mb * 1024 * 1024)
+        if max_age_days is not None:
+            self.max_age_seconds = max_age_days * 24 * 3600
+        if max_total_mb is not None or max_age_days is not None:
+            self._ensure_worker()
+            self.queue.put(_RETENTION)
+
+    def apply_config(self, changes):
+        """Apply changed settings (config key -> value)"""
+        self.configure(
+            fmt=changes.get("recording_format"),
+            max_total_mb=changes.get("recordings_max_total_mb"),
+            max_age_days=changes.get("recordings_max_age_days")
+        )
+
+    def submit(self, audio, sample_rate):
+        """
+        Queue a recording for writing and return the path it will be saved to
+
+        Args:
+            audio: float32 numpy array in the range [-1, 1]
+            sample_rate: Sample rate of the audio
+        """
+        fmt = self.format
+        if fmt != "wav" and sf is None:
+            print(f"soundfile not installed, saving as WAV instead of {fmt}")
+            fmt = "wav"
+
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        extension = RECORDING_FORMATS[fmt][0]
+        output_file = self.directory / f"recording_{timestamp}{extension}"
+
+        self._ensure_worker()
+        self.queue.put((output_file, audio, sample_rate, fmt))
+        return str(output_file)
+
+    def _ensure_worker(self):
+        with self.lock:
+            if self.worker is None or not self.worker.is_alive():
+                self.worker = threading.Thread(target=self._run, daemon=True)
+                self.worker.start()
+
+    def _run(self):
+        """Worker loop: write queued clips and apply retention"""
+        while True:
+            item = self.queue.get()
+            try:
+                if item is None:
+                    return
+                if item is _RETENTION:
+                    if self.files is None:
+                        self._scan()
+                    self._enforce_retention()
+                else:
+                    self._write(*item)
+            finally:
+                self.queue.task_done()
+
+    def _write(self, output_file, audio, sample_rate, fmt):
+        start = time.perf_counter()
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            audio = np.clip(np.asarray(audio, dtype=np.float32).reshape(-1), -1.0, 1.0)
+
+            if fmt == "wav" and sf is None:
+                write_wav(str(output_file), sample_rate, (audio * 32767).astype(np.int16))
+            else:
+                _, sf_format, sf_subtype = RECORDING_FORMATS[fmt]
+                sf.write(str(output_file), audio, sample_rate, format=sf_format, subtype=sf_subtype)
+
+            print(f"Recording saved to: {output_file}")
+        except Exception as e:
+            print(f"Error saving recording: {e}")
+            return
+
+        if self.on_written:
+            self.on_written(time.perf_counter() - start)
+
+        self._track(output_file)
+        self._enforce_retention()
+
+    def _scan(self):
+        """Index existing recordings once so retention covers older files"""
+        entries = []
+        if self.directory.exists():
+            for path in self.directory.glob("recording_*"):
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, path, stat.st_size))
+        entries.sort()
+        self.files = deque(entries)
+        self.total_bytes = sum(size for _, _, size in entries)
+
+    def _track(self, path):
+        if self.files is None:
+            # The scan already picks up the file just written
+            self._scan()
+            return
+        try:
+            stat = path.stat()
+        except OSError:
+            return
+        self.files.append((stat.st_mtime, path, stat.st_size))
+        self.total_bytes += stat.st_size
+
+    def _enforce_retention(self):
+        """Delete the oldest recordings until the limits are met"""
+        now = time.time()
+        # Always keep the newest clip, even if it alone exceeds the size cap
+        while len(self.files) > 1:
+            mtime, path, size = self.files[0]
+            too_big = self.max_total_bytes and self.total_bytes > self.max_total_bytes
+            too_old = self.max_age_seconds and now - mtime > self.max_age_seconds
+            if not (too_big or too_old):
+                break
+            self.files.popleft()
+            self.total_bytes -= size
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def flush(self):
+        """Block until all queued recordings have been written"""
+        self.queue.join()
+
+    def close(self):
+        """Write pending recordings and stop the worker"""
+        if self.worker and self.worker.is_alive():
+            self.queue.put(None)
+            self.worker.join()
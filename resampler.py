@@ -0,0 +1,96 @@
+"""
+Streaming polyphase resampling for capturing at the device's native rate
+"""
+from math import gcd
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+def downmix(block):
+    """Average all channels of a (frames, channels) block into mono float32"""
+    block = np.asarray(block, dtype=np.float32)
+    if block.ndim == 1:
+        return block
+    if block.shape[1] == 1:
+        return block[:, 0]
+    return block.mean(axis=1, dtype=np.float32)
+
+
+class StreamingResampler:
+    """
+    Rational-ratio polyphase resampler that processes audio block by block.
+
+    The filter history and output phase are carried between calls, so
+    feeding a stream in arbitrary block sizes gives the same result as
+    resampling it in one go.
+    """
+
+    def __init__(self, input_rate, output_rate=16000, taps_per_phase=32, beta=8.0):
+        self.input_rate = int(input_rate)
+        self.output_rate = int(output_rate)
+
+        g = gcd(self.input_rate, self.output_rate)
+        self.up = self.output_rate // g
+        self.down = self.input_rate // g
+        self.taps = taps_per_phase
+
+        # Windowed-sinc prototype at the upsampled rate, cut off at the lower
+        # Nyquist. Odd length (zero-padded to fill the bank) keeps the group
+        # delay on an integer sample of the upsampled grid.
+        n = self.taps * self.up - 1
+        cutoff = 0.95 / max(self.up, self.down)
+        t = np.arange(n) - (n - 1) / 2.0
+        prototype = cutoff * np.sinc(cutoff * t) * np.kaiser(n, beta) * self.up
+        prototype = np.append(prototype, 0.0)
+
+        # Polyphase bank: row p holds prototype[p::up], reversed so each row can
+        # be dotted with an ascending window of input samples
+        self.bank = prototype.reshape(self.taps, self.up).T[:, ::-1].astype(np.float32)
+
+        # Group delay compensation: start the output grid at the filter centre
+        center = (n - 1) // 2
+        self.start_position = center % self.down
+        self.delay = center // self.down
+        self.reset()
+
+    def reset(self):
+        """Clear filter history before a new stream"""
+        self.history = np.zeros(self.taps - 1, dtype=np.float32)
+        self.position = self.start_position  # Next output on the upsampled grid, relative to the block
+        self.to_skip = self.delay
+
+    def process(self, block):
+        """Resample a mono block and return the output samples available so far"""
+        block = np.asarray(block, dtype=np.float32).reshape(-1)
+        if self.up == self.down:
+            return block
+
+        buffer = np.concatenate((self.history, block))
+        length = len(block)
+
+        end = length * self.up
+        count = max(0, -(-(end - self.position) // self.down))
+        if count:
+            positions = self.position + self.down * np.arange(count)
+            windows = sliding_window_view(buffer, self.taps)[positions // self.up]
+            output = np.einsum("ij,ij->i", windows, self.bank[positions % self.up])
+            self.position += self.down * count
+        else:
+            output = np.zeros(0, dtype=np.float32)
+
+        self.position -= end
+        self.history = buffer[len(buffer) - (self.taps - 1):]
+
+        if self.to_skip:
+            dropped = min(self.to_skip, len(output))
+            output = output[dropped:]
+            self.to_skip -= dropped
+
+        return output.astype(np.float32, copy=False)
+
+    def flush(self):
+        """Push the samples still held in the filter out of the resampler"""
+        if self.up == self.down:
+            return np.zeros(0, dtype=np.float32)
+        return self.process(np.zeros(self.taps, dtype=np.float32))
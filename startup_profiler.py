@@ -0,0 +1,208 @@
+"""
+Startup profiling: phase timeline and per-module import cost
+
+Enabled with `--profile-startup` (or WINWISP_PROFILE_STARTUP=1). Works the
+same from a source checkout and from the PyInstaller executable, where
+`python -X importtime` is not available, because it hooks __import__.
+"""
+import builtins
+import importlib.util
+import json
+import os
+import platform
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from pathlib import Path
+
+
+class NullProfiler:
+    """Stand-in used when profiling is off; every hook is a no-op"""
+
+    enabled = False
+
+    def phase(self, name):
+        return nullcontext()
+
+    def mark(self, name):
+        pass
+
+    def finish(self, log_dir):
+        return None
+
+
+class StartupProfiler:
+    """Records startup phases and the time spent importing each module"""
+
+    enabled = True
+
+    def __init__(self):
+        self.t0 = time.perf_counter()
+        self.lock = threading.Lock()
+        self.phases = []    # (name, start, duration, thread, depth)
+        self.marks = []     # (name, time)
+        self.imports = []   # (module, start, cumulative, self_time, thread, depth)
+        self.local = threading.local()
+        self.original_import = None
+
+    # -- import hook -----------------------------------------------------
+
+    def install(self):
+        if self.original_import is None:
+            self.original_import = builtins.__import__
+            builtins.__import__ = self._timed_import
+
+    def uninstall(self):
+        if self.original_import is not None:
+            builtins.__import__ = self.original_import
+            self.original_import = None
+
+    def _stack(self):
+        stack = getattr(self.local, "stack", None)
+        if stack is None:
+            stack = self.local.stack = []
+        return stack
+
+    def _timed_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        stack = self._stack()
+        before = len(sys.modules)
+        start = time.perf_counter()
+        stack.append(0.0)
+        try:
+            return self.original_import(name, globals, locals, fromlist, level)
+        finally:
+            elapsed = time.perf_counter() - start
+            children = stack.pop()
+            if stack:
+                stack[-1] += elapsed
+            # Only imports that actually loaded something are worth reporting
+            if len(sys.modules) > before:
+                # Labelled by the module the statement names (relative names resolved),
+                # not by what a from-import pulls out of it
+                module = name
+                if level:
+                    try:
+                        package = (globals or {}).get("__package__")
+                        module = importlib.util.resolve_name("." * level + name, package)
+                    except Exception:
+                        pass
+                with self.lock:
+                    self.imports.append((
+                        module, start - self.t0, elapsed, elapsed - children,
+                        threading.current_thread().name, len(stack)
+                    ))
+
+    # -- phases ----------------------------------------------------------
+
+    @contextmanager
+    def phase(self, name):
+        depth = getattr(self.local, "phase_depth", 0)
+        self.local.phase_depth = depth + 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - start
+            self.local.phase_depth = depth
+            with self.lock:
+                self.phases.append((
+                    name, start - self.t0, duration, threading.current_thread().name, depth
+                ))
+
+    def mark(self, name):
+        with self.lock:
+            self.marks.append((name, time.perf_counter() - self.t0))
+
+    # -- report ----------------------------------------------------------
+
+    def report(self):
+        """Build the report as a dict"""
+        with self.lock:
+            phases = sorted(self.phases, key=lambda p: p[1])
+            imports = list(self.imports)
+            marks = list(self.marks)
+
+        return {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "frozen": bool(getattr(sys, "frozen", False)),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "total_s": time.perf_counter() - self.t0,
+            "phases": [
+                {"name": n, "start_s": s, "duration_s": d, "thread": t, "depth": depth}
+                for n, s, d, t, depth in phases
+            ],
+            "marks": [{"name": n, "time_s": t} for n, t in marks],
+            "imports": [
+                {"module": m, "start_s": s, "cumulative_s": c, "self_s": own, "thread": t, "depth": depth}
+                for m, s, c, own, t, depth in imports
+            ],
+        }
+
+    def format_report(self, data, top=25):
+        """Human-readable version of report()"""
+        lines = [
+            "WinWisp startup profile",
+            f"  created: {data['created']}",
+            f"  build:   {'PyInstaller executable' if data['frozen'] else 'source checkout'}"
+            f" (Python {data['python']}, {data['platform']})",
+            f"  total:   {data['total_s'] * 1000:.0f} ms",
+            "",
+            "Timeline (ms since profiling started)",
+        ]
+        for phase in data["phases"]:
+            indent = "  " * phase["depth"]
+            thread = "" if phase["thread"] == "MainThread" else f"  [{phase['thread']}]"
+            lines.append(
+                f"  {phase['start_s'] * 1000:8.0f} +{phase['duration_s'] * 1000:8.1f}  {indent}{phase['name']}{thread}"
+            )
+        for mark in data["marks"]:
+            lines.append(f"  {mark['time_s'] * 1000:8.0f}            * {mark['name']}")
+
+        top_level = [i for i in data["imports"] if i["depth"] == 0]
+        lines += ["", f"Top-level imports by cumulative time (top {top})"]
+        for item in sorted(top_level, key=lambda i: -i["cumulative_s"])[:top]:
+            lines.append(f"  {item['cumulative_s'] * 1000:9.1f} ms  {item['module']}")
+
+        lines += ["", f"Modules by self time (top {top})"]
+        for item in sorted(data["imports"], key=lambda i: -i["self_s"])[:top]:
+            lines.append(
+                f"  {item['self_s'] * 1000:9.1f} ms  {item['module']}"
+                f"  (cumulative {item['cumulative_s'] * 1000:.1f} ms)"
+            )
+        return "\n".join(lines) + "\n"
+
+    def finish(self, log_dir):
+        """Stop hooking imports and write the text and JSON reports"""
+        self.uninstall()
+        data = self.report()
+
+        log_dir = Path(log_dir)
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        text_path = log_dir / f"startup_profile_{stamp}.txt"
+        try:
+            log_dir.mkdir(parents=True, exist_ok=True)
+            text_path.write_text(self.format_report(data), encoding="utf-8")
+            (log_dir / f"startup_profile_{stamp}.json").write_text(json.dumps(data, indent=2), encoding="utf-8")
+        except Exception as e:
+            print(f"Error writing startup profile: {e}")
+            return None
+        return text_path
+
+
+def from_argv(argv):
+    """
+    Return an installed StartupProfiler if profiling was requested,
+    otherwise a NullProfiler. Removes the flag from argv.
+    """
+    requested = "--profile-startup" in argv or os.environ.get("WINWISP_PROFILE_STARTUP") == "1"
+    while "--profile-startup" in argv:
+        argv.remove("--profile-startup")
+    if not requested:
+        return NullProfiler()
+
+    profiler = StartupProfiler()
+    profiler.install()
+    return profiler
@@ -0,0 +1,209 @@
+"""
+Per-utterance latency telemetry with rolling percentiles
+"""
+import json
+import queue
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+
+# Dictation stages, in pipeline order
+STAGES = (
+    "hotkey",             # Key event -> handler running
+    "stream_open",        # Opening the input stream
+    "first_block",        # Stream open -> first audio block
+    "stop",               # Stopping the stream
+    "finalize",           # Assembling the recorded buffer
+    "file_write",         # Background save of the recording
+    "model_wait",         # Waiting for the model to load
+    "mel",                # Log-mel spectrogram
+    "encode",             # Audio encoder
+    "decode",             # Text decoder (all steps)
+    "transcribe",         # Whole transcription call
+    "paste",              # Inserting the text
+    "clipboard_restore",  # Background clipboard restore
+)
+
+_local = threading.local()
+
+
+def activate(metrics):
+    """Make metrics the target of record_current() on this thread (None to clear)"""
+    _local.metrics = metrics
+
+
+def record_current(stage, seconds):
+    """Add time to the metrics active on this thread, if any"""
+    metrics = getattr(_local, "metrics", None)
+    if metrics is not None:
+        metrics.add(stage, seconds)
+
+
+class UtteranceMetrics:
+    """Stage timings for a single utterance"""
+
+    def __init__(self, utterance_id=None):
+        self.utterance_id = utterance_id
+        self.started_at = time.time()
+        self.stages = {}
+        self.audio_seconds = 0.0
+        self.info = {}
+
+    def add(self, stage, seconds):
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    @contextmanager
+    def measure(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - start)
+
+    @property
+    def real_time_factor(self):
+        """Transcription time (excluding model load) per second of audio"""
+        if not self.audio_seconds or "transcribe" not in self.stages:
+            return None
+        compute = self.stages["transcribe"] - self.stages.get("model_wait", 0.0)
+        return max(0.0, compute) / self.audio_seconds
+
+    def to_record(self):
+        record = {
+            "time": datetime.fromtimestamp(self.started_at).isoformat(timespec="milliseconds"),
+            "utterance": self.utterance_id,
+            "audio_s": round(self.audio_seconds, 3),
+            "stages_ms": {stage: round(seconds * 1000, 2) for stage, seconds in self.stages.items()},
+        }
+        if self.real_time_factor is not None:
+            record["rtf"] = round(self.real_time_factor, 4)
+        record.update(self.info)
+        return record
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a non-empty sequence"""
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(fraction * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+class Telemetry:
+    """
+    Collects utterance metrics, keeps rolling windows per stage and appends
+    JSONL records to logs/metrics_<date>.jsonl from a background thread.
+    """
+
+    def __init__(self, log_dir, window=200, enabled=True):
+        self.log_dir = Path(log_dir)
+        self.enabled = enabled
+        self.window = window
+
+        self.lock = threading.Lock()
+        self.samples = {}
+        self.rtf = deque(maxlen=window)
+
+        self.queue = queue.Queue()
+        self.writer = None
+
+    def record(self, metrics):
+        """Add a finished utterance to the rolling stats and the metrics log"""
+        if not self.enabled:
+            return
+        with self.lock:
+            for stage, seconds in metrics.stages.items():
+                self._sample(stage, seconds)
+            if metrics.real_time_factor is not None:
+                self.rtf.append(metrics.real_time_factor)
+        self._write(metrics.to_record())
+
+    def observe(self, stage, seconds, utterance_id=None):
+        """Record a stage that completes after its utterance, e.g. background writes"""
+        if not self.enabled:
+            return
+        with self.lock:
+            self._sample(stage, seconds)
+        self._write({
+            "time": datetime.now().isoformat(timespec="milliseconds"),
+            "utterance": utterance_id,
+            "stages_ms": {stage: round(seconds * 1000, 2)},
+        })
+
+    def _sample(self, stage, seconds):
+        if stage not in self.samples:
+            self.samples[stage] = deque(maxlen=self.window)
+        self.samples[stage].append(seconds)
+
+    def summary(self):
+        """Return {stage: (p50_s, p95_s, count)} plus 'rtf' for the rolling window"""
+        with self.lock:
+            samples = {stage: list(values) for stage, values in self.samples.items()}
+            rtf = list(self.rtf)
+
+        result = {}
+        for stage in STAGES + tuple(sorted(set(samples) - set(STAGES))):
+            values = samples.get(stage)
+            if values:
+                result[stage] = (percentile(values, 0.5), percentile(values, 0.95), len(values))
+        if rtf:
+            result["rtf"] = (percentile(rtf, 0.5), percentile(rtf, 0.95), len(rtf))
+        return result
+
+    def format_summary(self):
+        """Human-readable p50/p95 table for the GUI"""
+        summary = self.summary()
+        if not summary:
+            return "No dictations measured yet"
+
+        lines = []
+        for stage, (p50, p95, count) in summary.items():
+            if stage == "rtf":
+                continue
+            lines.append(f"{stage:<18} p50 {p50 * 1000:7.1f} ms   p95 {p95 * 1000:7.1f} ms")
+        if "rtf" in summary:
+            p50, p95, count = summary["rtf"]
+            lines.append(f"{'real-time factor':<18} p50 {p50:7.3f}      p95 {p95:7.3f}   (n={count})")
+        return "\n".join(lines)
+
+    def _write(self, record):
+        if self.writer is None or not self.writer.is_alive():
+            self.writer = threading.Thread(target=self._run, daemon=True)
+            self.writer.start()
+        self.queue.put(record)
+
+    def _run(self):
+        while True:
+            record = self.queue.get()
+            if record is None:
+                return
+            records = [record]
+            # Batch whatever else is already queued into the same write
+            while True:
+                try:
+                    record = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if record is None:
+                    self._append(records)
+                    return
+                records.append(record)
+            self._append(records)
+
+    def _append(self, records):
+        try:
+            self.log_dir.mkdir(parents=True, exist_ok=True)
+            path = self.log_dir / f"metrics_{datetime.now().strftime('%Y%m%d')}.jsonl"
+            with open(path, "a", encoding="utf-8") as f:
+                for record in records:
+                    f.write(json.dumps(record) + "\n")
+        except Exception as e:
+            print(f"Error writing metrics: {e}")
+
+    def close(self):
+        if self.writer and self.writer.is_alive():
+            self.queue.put(None)
+            self.writer.join(timeout=2)
@@ -1,17 +1,173 @@
 """
 Text pasting functionality for Windows
 """
-import pyperclip
+import sys
+import threading
 import time
-import win32clipboard
-import win32con
-from pynput.keyboard import Key, Controller
 
 
-class TextPaster:
+class PynputKeystrokes:
+    """Keystroke half of a backend, sharing one pynput Controller"""
+
     def __init__(self):
+        from pynput.keyboard import Key, Controller
+
+        self.Key = Key
         self.keyboard = Controller()
-    
+
+    def send_paste(self):
+        with self.keyboard.pressed(self.Key.ctrl):
+            self.keyboard.press('v')
+            self.keyboard.release('v')
+
+    def type_text(self, text):
+        self.keyboard.type(text)
+
+    def backspace(self, count):
+        for _ in range(count):
+            self.keyboard.press(self.Key.backspace)
+            self.keyboard.release(self.Key.backspace)
+
+
+class Win32Backend(PynputKeystrokes):
+    """Clipboard through the Win32 API, keystrokes through pynput"""
+
+    def __init__(self):
+        import win32clipboard
+        import win32con
+
+        super().__init__()
+        self.clipboard = win32clipboard
+        self.text_format = win32con.CF_UNICODETEXT
+
+    def _open(self, timeout=0.5):
+        # Another process may briefly hold the clipboard open
+        deadline = time.perf_counter() + timeout
+        while True:
+            try:
+                self.clipboard.OpenClipboard()
+                return
+            except Exception:
+                if time.perf_counter() > deadline:
+                    raise
+                time.sleep(0.002)
+
+    def sequence_number(self):
+        return self.clipboard.GetClipboardSequenceNumber()
+
+    def get_text(self):
+        self._open()
+        try:
+            if self.clipboard.IsClipboardFormatAvailable(self.text_format):
+                return self.clipboard.GetClipboardData(self.text_format)
+            return None
+        finally:
+            self.clipboard.CloseClipboard()
+
+    def set_text(self, text):
+        self._open()
+        try:
+            self.clipboard.EmptyClipboard()
+            self.clipboard.SetClipboardText(text, self.text_format)
+        finally:
+            self.clipboard.CloseClipboard()
+
+
+class PyperclipBackend(PynputKeystrokes):
+    """Portable clipboard through pyperclip; updates are confirmed by read-back"""
+
+    def __init__(self):
+        import pyperclip
+
+        super().__init__()
+        self.pyperclip = pyperclip
+
+    def sequence_number(self):
+        return None
+
+    def get_text(self):
+        return self.pyperclip.paste()
+
+    def set_text(self, text):
+        self.pyperclip.copy(text)
+
+
+class FakeBackend:
+    """
+    In-memory clipboard and keyboard for tests and benchmarks.
+
+    Clipboard writes become visible after `clipboard_latency` seconds, like
+    a slow clipboard owner, and every keystroke is recorded in `events`.
+    """
+
+    def __init__(self, clipboard_latency=0.0, text=None):
+        self.clipboard_latency = clipboard_latency
+        self.text = text
+        self.sequence = 0
+        self.pending = None
+        self.events = []
+        self.lock = threading.Lock()
+
+    def _settle(self):
+        if self.pending and time.perf_counter() >= self.pending[0]:
+            self.text = self.pending[1]
+            self.sequence += 1
+            self.pending = None
+
+    def sequence_number(self):
+        with self.lock:
+            self._settle()
+            return self.sequence
+
+    def get_text(self):
+        with self.lock:
+            self._settle()
+            return self.text
+
+    def set_text(self, text):
+        with self.lock:
+            self.pending = (time.perf_counter() + self.clipboard_latency, text)
+            self._settle()
+
+    def send_paste(self):
+        self.events.append(('paste', self.get_text()))
+
+    def type_text(self, text):
+        self.events.append(('type', text))
+
+    def backspace(self, count):
+        self.events.append(('backspace', count))
+
+
+def default_backend():
+    """Pick the clipboard/keystroke backend for this platform"""
+    if sys.platform == 'win32':
+        return Win32Backend()
+    return PyperclipBackend()
+
+
+class TextPaster:
+    """
+    Pastes text through the clipboard with a long-lived backend.
+
+    Instead of fixed sleeps, the clipboard update is confirmed by watching
+    the clipboard sequence number (or reading the text back), and the
+    user's previous clipboard is restored on a timer after the paste.
+    """
+
+    def __init__(self, backend=None, confirm_timeout=0.5, restore_delay=0.15):
+        self.backend = backend or default_backend()
+        self.confirm_timeout = confirm_timeout
+        self.restore_delay = restore_delay
+
+        self.lock = threading.Lock()
+        self.restore_timer = None
+        self.saved_clipboard = None
+        self.pasted_sequence = None
+
+        # Optional on_restore(seconds) hook, called after the clipboard is restored
+        self.on_restore = None
+
     def paste_text(self, text):
         """
         Paste text at the current cursor location
@@ -19,59 +175,158 @@ class TextPaster:
         """
         if not text:
             return False
-        
+
         try:
-            # Save current clipboard content
-            old_clipboard = self.get_clipboard()
-            
-            # Copy new text to clipboard
-            pyperclip.copy(text)
-            
-            # Small delay to ensure clipboard is updated
-            time.sleep(0.1)
-            
-            # Simulate Ctrl+V to paste
-            self.keyboard.press(Key.ctrl)
-            self.keyboard.press('v')
-            self.keyboard.release('v')
-            self.keyboard.release(Key.ctrl)
-            
-            # Wait a bit before restoring clipboard
-            time.sleep(0.2)
-            
-            # Restore old clipboard content
-            if old_clipboard is not None:
-                pyperclip.copy(old_clipboard)
-            
+            with self.lock:
+                # Save the user's clipboard, unless an earlier paste's restore
+                # is still pending (then the clipboard holds our own text)
+                if not self._cancel_restore():
+                    self.saved_clipboard = self.get_clipboard()
+
+                # Copy new text to clipboard and wait until it is visible
+                before = self.backend.sequence_number()
+                self.backend.set_text(text)
+                if not self._wait_for_clipboard(text, before):
+                    print("Clipboard update not confirmed, pasting anyway")
+                self.pasted_sequence = self.backend.sequence_number()
+
+                # Simulate Ctrl+V to paste
+                self.backend.send_paste()
+
+                # Restore old clipboard content off the calling thread
+                self._schedule_restore()
+
             return True
         except Exception as e:
             print(f"Error pasting text: {e}")
             return False
-    
+
+    def _wait_for_clipboard(self, text, before):
+        """Poll until the clipboard shows our update"""
+        deadline = time.perf_counter() + self.confirm_timeout
+        while True:
+            sequence = self.backend.sequence_number()
+            if sequence is not None and before is not None:
+                if sequence != before:
+                    return True
+            elif self.get_clipboard() == text:
+                return True
+            if time.perf_counter() > deadline:
+                return False
+            time.sleep(0.001)
+
+    def _schedule_restore(self):
+        if self.saved_clipboard is None:
+            return
+        self.restore_timer = threading.Timer(self.restore_delay, self._restore)
+        self.restore_timer.daemon = True
+        self.restore_timer.start()
+
+    def _cancel_restore(self):
+        """Cancel a pending restore; returns True if one was pending"""
+        timer, self.restore_timer = self.restore_timer, None
+        if timer is None:
+            return False
+        timer.cancel()
+        return True
+
+    def _restore(self):
+        with self.lock:
+            if self.restore_timer is None:
+                return
+            self.restore_timer = None
+
+            # Leave the clipboard alone if something else was copied meanwhile
+            sequence = self.backend.sequence_number()
+            if sequence is not None and sequence != self.pasted_sequence:
+                return
+
+            start = time.perf_counter()
+            try:
+                self.backend.set_text(self.saved_clipboard)
+            except Exception as e:
+                print(f"Error restoring clipboard: {e}")
+            self.saved_clipboard = None
+
+        if self.on_restore:
+            self.on_restore(time.perf_counter() - start)
+
+    def flush(self):
+        """Restore the clipboard now if a restore is pending"""
+        timer = self.restore_timer
+        if timer is not None:
+            timer.cancel()
+            self._restore()
+
     def get_clipboard(self):
         """Get current clipboard content"""
         try:
-            return pyperclip.paste()
+            return self.backend.get_text()
         except:
             return None
-    
+
     def set_clipboard(self, text):
         """Set clipboard content"""
         try:
-            pyperclip.copy(text)
+            with self.lock:
+                # An explicit copy must not be undone by a pending restore
+                self._cancel_restore()
+                self.saved_clipboard = None
+                self.backend.set_text(text)
             return True
         except Exception as e:
             print(f"Error setting clipboard: {e}")
             return False
 
 
+class IncrementalTyper:
+    """
+    Keeps the text typed into the focused window in sync with a growing
+    transcription, sending only the minimal backspace/insert difference.
+
+    Args:
+        backend: Backend used for backspaces (and typing, by default)
+        insert: Optional function used to insert new text instead of typing
+            it, e.g. TextPaster.paste_text for long segments
+    """
+
+    def __init__(self, backend, insert=None):
+        self.backend = backend
+        self.insert = insert or backend.type_text
+        self.typed = ""
+
+    def update(self, text):
+        """Make the typed text equal to text"""
+        common = 0
+        limit = min(len(self.typed), len(text))
+        while common < limit and self.typed[common] == text[common]:
+            common += 1
+
+        if len(self.typed) > common:
+            self.backend.backspace(len(self.typed) - common)
+        if len(text) > common:
+            self.insert(text[common:])
+        self.typed = text
+
+
+_paster = None
+_paster_lock = threading.Lock()
+
+
+def get_paster():
+    """Return the shared TextPaster, creating it on first use"""
+    global _paster
+    with _paster_lock:
+        if _paster is None:
+            _paster = TextPaster()
+        return _paster
+
+
 def paste_text_at_cursor(text):
     """Helper function to paste text"""
-    paster = TextPaster()
-    return paster.paste_text(text)
+    return get_paster().paste_text(text)
 
 
 def copy_to_clipboard(text):
     """Helper function to copy text to clipboard"""
-    paster = TextPaster()
-    return paster.set_clipboard(text)
+    return get_paster().set_clipboard(text)
@@ -0,0 +1,163 @@
+"""
+Content-addressed, size-capped disk cache of transcriptions
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+
+
+logger = logging.getLogger(__name__)
+
+# Bump when the key or entry format changes so old entries are ignored
+CACHE_VERSION = 1
+
+# The index is rewritten in the background at most this often after a
+# change; flush() writes it at shutdown
+INDEX_SAVE_INTERVAL = 5.0
+
+
+def audio_digest(audio):
+    """sha256 of the samples of a float32 array, or of an audio file's bytes"""
+    digest = hashlib.sha256()
+    if isinstance(audio, (str, os.PathLike)):
+        with open(audio, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+    else:
+        digest.update(memoryview(np.ascontiguousarray(audio, dtype=np.float32)).cast("B"))
+    return digest.hexdigest()
+
+
+def cache_key(audio, options):
+    """Key for transcribing audio with options (model, backend, language, decode options...)"""
+    digest = hashlib.sha256(f"v{CACHE_VERSION}:{audio_digest(audio)}:".encode())
+    digest.update(json.dumps(options, sort_keys=True, default=str).encode())
+    return digest.hexdigest()
+
+
+class TranscriptionCache:
+    """
+    Least-recently-used transcriptions on disk, up to max_mb.
+
+    Each entry is a small JSON file named by its key. index.json keeps the
+    keys in LRU order with their sizes, so lookups and eviction never scan
+    the directory. Entries written after the last index save (a crash) are
+    simply not found again.
+    """
+
+    def __init__(self, directory, max_mb=10):
+        self.directory = Path(directory)
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.lock = threading.Lock()
+        # Orders index writes, so an older snapshot never replaces a newer one
+        self.save_lock = threading.Lock()
+
+        # key -> entry size, oldest use first; loaded on first access
+        self.index = None
+        self.total_bytes = 0
+        self.dirty = False
+        self.save_timer = None
+
+    def _load_index(self):
+        if self.index is not None:
+            return
+        self.index = OrderedDict()
+        try:
+            with open(self.directory / "index.json", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == CACHE_VERSION:
+                self.index = OrderedDict((key, int(size)) for key, size in data["entries"])
+        except (OSError, ValueError, KeyError, TypeError):
+            pass  # Missing or unreadable: start empty
+        self.total_bytes = sum(self.index.values())
+
+    def _entry_path(self, key):
+        return self.directory / key[:2] / f"{key}.json"
+
+    def get(self, key):
+        """Cached text for key, or None"""
+        with self.lock:
+            self._load_index()
+            if key not in self.index:
+                return None
+            try:
+                with open(self._entry_path(key), encoding="utf-8") as f:
+                    text = json.load(f)["text"]
+            except (OSError, ValueError, KeyError):
+                self.total_bytes -= self.index.pop(key)
+                self._mark_dirty()
+                return None
+            self.index.move_to_end(key)
+            self._mark_dirty()
+            return text
+
+    def put(self, key, text, **info):
+        """Store text under key (info is kept in the entry for inspection)"""
+        payload = json.dumps({"text": text, **info}, ensure_ascii=False).encode("utf-8")
+        with self.lock:
+            self._load_index()
+            path = self._entry_path(key)
+            try:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                temp = path.with_name(path.name + ".tmp")
+                temp.write_bytes(payload)
+                os.replace(temp, path)
+            except OSError as e:
+                logger.error(f"Error writing transcription cache entry: {e}")
+                return
+
+            self.total_bytes += len(payload) - self.index.pop(key, 0)
+            self.index[key] = len(payload)
+            self._evict()
+            self._mark_dirty()
+
+    def _evict(self):
+        """Drop least recently used entries until under the size cap"""
+        while self.total_bytes > self.max_bytes and self.index:
+            key, size = self.index.popitem(last=False)
+            self.total_bytes -= size
+            try:
+                os.remove(self._entry_path(key))
+            except OSError:
+                pass
+
+    def _mark_dirty(self):
+        """Schedule a background index save unless one is pending (call with the lock held)"""
+        self.dirty = True
+        if self.save_timer is None:
+            self.save_timer = threading.Timer(INDEX_SAVE_INTERVAL, self._save_index)
+            self.save_timer.daemon = True
+            self.save_timer.start()
+
+    def _save_index(self):
+        """Write the index if it changed, snapshotting it under the lock and writing outside it"""
+        with self.save_lock:
+            with self.lock:
+                self.save_timer = None
+                if not self.dirty:
+                    return
+                data = {"version": CACHE_VERSION, "entries": list(self.index.items())}
+                self.dirty = False
+            try:
+                self.directory.mkdir(parents=True, exist_ok=True)
+                temp = self.directory / "index.json.tmp"
+                with open(temp, "w", encoding="utf-8") as f:
+                    json.dump(data, f, separators=(",", ":"))
+                os.replace(temp, self.directory / "index.json")
+            except OSError as e:
+                logger.error(f"Error saving transcription cache index: {e}")
+                with self.lock:
+                    self.dirty = True  # Retried by the next save
+
+    def flush(self):
+        """Write the index now if it changed since the last save"""
+        with self.lock:
+            if self.save_timer:
+                self.save_timer.cancel()
+        self._save_index()
@@ -39,6 +39,9 @@ class TrayIcon:
         self.menu = pystray.Menu(
             pystray.MenuItem("Show Window", self.show_window, default=True),
             pystray.MenuItem("Copy Last Transcription", self.copy_transcription),
+            pystray.MenuItem("Re-transcribe Last", self.retranscribe_last),
+            pystray.MenuItem("Latency Stats", self.show_latency_stats),
+            pystray.MenuItem("History", self.show_history),
             pystray.Menu.SEPARATOR,
             pystray.MenuItem("Settings", self.show_settings),
             pystray.Menu.SEPARATOR,
@@ -48,7 +51,8 @@ class TrayIcon:
     def show_window(self, icon=None, item=None):
         """Show the main window"""
         if self.app.gui:
-            self.app.gui.show_window()
+            # Menu callbacks run on the tray thread; Tk must be driven from its own
+            self.app.post_ui(self.app.gui.show_window)
     
     def copy_transcription(self, icon=None, item=None):
         """Copy last transcription to clipboard"""
@@ -59,11 +63,25 @@ class TrayIcon:
         else:
             self.icon.notify("No transcription available", "WinWisp")
     
+    def retranscribe_last(self, icon=None, item=None):
+        """Re-transcribe the last utterance more accurately"""
+        self.app.retranscribe_last()
+    
+    def show_latency_stats(self, icon=None, item=None):
+        """Show rolling latency percentiles"""
+        if self.app.gui:
+            self.app.post_ui(self.app.gui.show_latency_stats)
+    
+    def show_history(self, icon=None, item=None):
+        """Show the searchable transcription history"""
+        if self.app.gui:
+            self.app.post_ui(self.app.gui.show_history)
+    
     def show_settings(self, icon=None, item=None):
         """Show settings dialog"""
         self.show_window()
         if self.app.gui:
-            self.app.gui.show_settings()
+            self.app.post_ui(self.app.gui.show_settings)
     
     def exit_app(self, icon=None, item=None):
         """Exit the application"""
@@ -94,6 +112,11 @@ class TrayIcon:
             image = self.create_icon_image(recording=recording)
             self.icon.icon = image
     
+    def set_status(self, status):
+        """Show a status line in the icon tooltip, or restore the default with None"""
+        if self.icon:
+            self.icon.title = f"WinWisp - {status}" if status else "WinWisp - Speech to Text"
+    
     def notify(self, message, title="WinWisp"):
         """Show a notification"""
         if self.icon:
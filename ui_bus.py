@@ -0,0 +1,77 @@
+"""
+Thread-safe queue of UI updates, drained on the Tk thread
+"""
+import threading
+import time
+from collections import deque
+
+
+class UIBus:
+    """
+    Funnels UI mutations from worker threads onto the Tk main loop.
+
+    Any thread may post a call; the Tk thread runs them in order from a
+    window.after() loop. Calls posted with a key are coalesced: if a newer
+    call with the same key is queued before an older one runs, only the
+    newest runs. Each frame stops after a small time budget so a burst of
+    updates never stalls the event loop.
+    """
+
+    def __init__(self, root, interval_ms=16, budget_ms=8):
+        self.root = root
+        self.interval_ms = interval_ms
+        self.budget = budget_ms / 1000.0
+
+        self.lock = threading.Lock()
+        self.calls = deque()
+        self.latest = {}
+        self.sequence = 0
+        self.running = False
+
+    def post(self, func, *args, key=None):
+        """Queue func(*args) to run on the Tk thread"""
+        with self.lock:
+            self.sequence += 1
+            if key is not None:
+                self.latest[key] = self.sequence
+            self.calls.append((self.sequence, key, func, args))
+
+    def start(self):
+        """Start draining; must be called on the Tk thread"""
+        if not self.running:
+            self.running = True
+            self.root.after(self.interval_ms, self._drain)
+
+    def stop(self):
+        self.running = False
+
+    def _next(self):
+        with self.lock:
+            while self.calls:
+                sequence, key, func, args = self.calls.popleft()
+                if key is not None:
+                    if self.latest.get(key) != sequence:
+                        continue  # Superseded by a newer update
+                    del self.latest[key]
+                return func, args
+            return None
+
+    def _drain(self):
+        if not self.running:
+            return
+
+        deadline = time.perf_counter() + self.budget
+        while time.perf_counter() < deadline:
+            item = self._next()
+            if item is None:
+                break
+            func, args = item
+            try:
+                func(*args)
+            except Exception as e:
+                print(f"Error in UI update: {e}")
+
+        try:
+            self.root.after(self.interval_ms, self._drain)
+        except Exception:
+            self.running = False  # Window destroyed
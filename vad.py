@@ -0,0 +1,94 @@
+"""
+Streaming voice activity detection and end-of-speech endpointing
+"""
+import numpy as np
+
+
+def block_level(block):
+    """Return the RMS level of an audio block"""
+    if len(block) == 0:
+        return 0.0
+    return float(np.sqrt(np.mean(np.square(block, dtype=np.float32))))
+
+
+class Endpointer:
+    """
+    Energy-based VAD that decides when the speaker has finished.
+
+    The noise floor is tracked continuously; a block counts as speech when
+    it is clearly above the floor. Once enough speech has been heard, a
+    run of trailing silence ends the utterance. A hard cap ends it anyway.
+    """
+
+    def __init__(self, sample_rate=16000, silence_ms=800, min_speech_ms=300,
+                 max_seconds=60, speech_ratio=3.0, min_level=0.005):
+        self.sample_rate = sample_rate
+        self.silence_samples = int(sample_rate * silence_ms / 1000)
+        self.min_speech_samples = int(sample_rate * min_speech_ms / 1000)
+        self.max_samples = int(sample_rate * max_seconds) if max_seconds else 0
+        self.speech_ratio = speech_ratio
+        self.min_level = min_level
+        self.reset()
+
+    def reset(self):
+        """Start a new utterance"""
+        self.noise_level = self.min_level
+        self.total_samples = 0
+        self.speech_samples = 0
+        self.silence_run = 0
+        self.triggered = False
+
+    def is_speech(self, level, n):
+        """Classify one block level and update the noise floor"""
+        speech = level > max(self.noise_level * self.speech_ratio, self.min_level)
+
+        # Running-minimum noise floor: falls within ~50 ms, rises over ~5 s
+        tau = 0.05 if level < self.noise_level else 5.0
+        alpha = 1.0 - np.exp(-n / (self.sample_rate * tau))
+        self.noise_level += alpha * (level - self.noise_level)
+        return speech
+
+    def process(self, block):
+        """
+        Feed one mono block; returns True once when the utterance has ended
+        """
+        if self.triggered:
+            return False
+
+        n = len(block)
+        self.total_samples += n
+        if self.is_speech(block_level(block), n):
+            self.speech_samples += n
+            self.silence_run = 0
+        else:
+            self.silence_run += n
+
+        heard_enough = self.speech_samples >= self.min_speech_samples
+        if heard_enough and self.silence_run >= self.silence_samples:
+            self.triggered = True
+        elif self.max_samples and self.total_samples >= self.max_samples:
+            self.triggered = True
+        return self.triggered
+
+
+def split_at_pauses(audio, sample_rate=16000, min_seconds=4, max_seconds=12, frame_ms=50):
+    """
+    Split a clip into chunks of at most max_seconds, cutting at the quietest
+    frame after min_seconds so that words are not cut in half
+    """
+    frame = int(sample_rate * frame_ms / 1000)
+    max_len = int(sample_rate * max_seconds)
+    min_len = int(sample_rate * min_seconds)
+
+    chunks = []
+    start = 0
+    while len(audio) - start > max_len:
+        window = audio[start + min_len:start + max_len]
+        n_frames = len(window) // frame
+        energy = np.square(window[:n_frames * frame], dtype=np.float32).reshape(n_frames, frame).mean(axis=1)
+        # Cut in the middle of the quietest frame
+        cut = start + min_len + int(np.argmin(energy)) * frame + frame // 2
+        chunks.append(audio[start:cut])
+        start = cut
+    chunks.append(audio[start:])
+    return chunks
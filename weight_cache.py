@@ -0,0 +1,126 @@
+"""
+Converted Whisper checkpoints that load by memory-mapping
+"""
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+import torch
+
+
+logger = logging.getLogger(__name__)
+
+# Bump when the converted layout changes so stale caches are rebuilt
+CACHE_VERSION = 1
+
+_converting = set()
+_converting_lock = threading.Lock()
+# Held while torch.nn.init is patched, so concurrent loads can't restore each other's no-ops
+_init_lock = threading.Lock()
+
+
+def cache_path(checkpoint):
+    """Where the converted copy of a checkpoint lives"""
+    checkpoint = Path(checkpoint)
+    return checkpoint.parent / "winwisp" / f"{checkpoint.stem}.fp32.v{CACHE_VERSION}.pt"
+
+
+def is_current(checkpoint):
+    """True if a converted copy exists and is newer than the checkpoint"""
+    path = cache_path(checkpoint)
+    try:
+        return path.stat().st_mtime >= Path(checkpoint).stat().st_mtime
+    except OSError:
+        return False
+
+
+def convert(checkpoint):
+    """
+    Write an fp32 copy of a checkpoint for load().
+
+    whisper.load_model builds an fp32 model and copies the fp16 weights into
+    it on every start. Storing the weights already in fp32 lets load() map
+    them straight from the file, so there is no read-and-convert pass and
+    the pages are shared with any other process using the same model.
+    """
+    target = cache_path(checkpoint)
+    target.parent.mkdir(parents=True, exist_ok=True)
+
+    data = torch.load(checkpoint, map_location="cpu", weights_only=True)
+    state = {name: tensor.float().contiguous() for name, tensor in data["model_state_dict"].items()}
+    del data["model_state_dict"]
+
+    temp = target.with_name(target.name + ".tmp")
+    torch.save({"dims": data["dims"], "model_state_dict": state}, temp)
+    os.replace(temp, target)
+    return target
+
+
+def convert_async(checkpoint):
+    """Convert in a background thread unless a conversion is already running"""
+    key = str(checkpoint)
+    with _converting_lock:
+        if key in _converting:
+            return None
+        _converting.add(key)
+
+    def run():
+        try:
+            path = convert(checkpoint)
+            logger.info(f"Converted weights cached at {path}")
+        except Exception as e:
+            logger.error(f"Error converting weights for {checkpoint}: {e}")
+        finally:
+            with _converting_lock:
+                _converting.discard(key)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
+
+
+def load(checkpoint, device):
+    """
+    Build a Whisper model whose weights are memory-mapped from the converted
+    copy of checkpoint. Returns None if there is no up-to-date copy; raises
+    if the copy can't be used.
+    """
+    from whisper.model import ModelDimensions, Whisper
+
+    if not is_current(checkpoint):
+        return None
+
+    data = torch.load(cache_path(checkpoint), map_location="cpu", mmap=True, weights_only=True)
+    dims = ModelDimensions(**data["dims"])
+
+    # The skeleton's parameters are never touched, so they cost no RAM; the
+    # strict load then swaps in the mapped tensors without copying them
+    with _skip_init():
+        model = Whisper(dims)
+    model.load_state_dict(data["model_state_dict"], strict=True, assign=True)
+    return model.to(device)
+
+
+@contextmanager
+def _skip_init():
+    """
+    Turn the nn.init functions used by Whisper's layers into no-ops.
+
+    The patch is process-wide: a model built on another thread meanwhile
+    (whisper.load_model) skips init too, which is harmless since its
+    checkpoint then overwrites every parameter. Whisper can't be built on
+    the meta device instead, as its alignment_heads buffer uses to_sparse,
+    which has no meta kernel.
+    """
+    names = ("uniform_", "normal_", "kaiming_uniform_", "ones_", "zeros_")
+    with _init_lock:
+        saved = {name: getattr(torch.nn.init, name) for name in names}
+        try:
+            for name in names:
+                setattr(torch.nn.init, name, lambda tensor, *args, **kwargs: tensor)
+            yield
+        finally:
+            for name, func in saved.items():
+                setattr(torch.nn.init, name, func)
@@ -1,19 +1,130 @@
 """
 Whisper model handling for speech-to-text conversion
 """
-import whisper
-import torch
+import gc
+import logging
+import os
+import sys
 import threading
+import time
+from contextlib import contextmanager
 from pathlib import Path
 
+try:
+    import psutil
+except ImportError:  # Memory-pressure unloading is skipped without psutil
+    psutil = None
+
+import telemetry
+import transcription_cache
+from decode_guards import MAX_REPEATS, fallback_temperatures, gate_segments
+from vad import split_at_pauses
+
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 16000
+
+# Optional RecentUtterances whose log-mel features are reused across passes
+_feature_cache = None
+
+
+def set_feature_cache(cache):
+    """Reuse log-mel features of audio buffers held by cache (a RecentUtterances)"""
+    global _feature_cache
+    _feature_cache = cache
+
+
+def _install_mel_timer():
+    """Time (and cache) log-mel computation inside whisper.transcribe (once per process)"""
+    # The package attribute whisper.transcribe is the function, not the module
+    module = sys.modules.get("whisper.transcribe")
+    original = getattr(module, "log_mel_spectrogram", None)
+    if original is None or getattr(original, "winwisp_timed", False):
+        return
+    
+    def timed_log_mel_spectrogram(audio, *args, **kwargs):
+        cache = _feature_cache
+        key = ("torch", args, tuple(sorted(kwargs.items())))
+        mel = cache.get_features(audio, key) if cache else None
+        if mel is not None:
+            return mel
+        
+        start = time.perf_counter()
+        try:
+            mel = original(audio, *args, **kwargs)
+        finally:
+            telemetry.record_current("mel", time.perf_counter() - start)
+        if cache:
+            cache.put_features(audio, key, mel)
+        return mel
+    
+    timed_log_mel_spectrogram.winwisp_timed = True
+    module.log_mel_spectrogram = timed_log_mel_spectrogram
+
+
+def _install_timing_hooks(model):
+    """Accumulate encoder/decoder forward time into the active utterance metrics"""
+    for stage, module in (("encode", model.encoder), ("decode", model.decoder)):
+        started = []
+        
+        def pre_hook(module, args, started=started):
+            started.append(time.perf_counter())
+        
+        def post_hook(module, args, output, started=started, stage=stage):
+            if started:
+                telemetry.record_current(stage, time.perf_counter() - started.pop())
+        
+        module.register_forward_pre_hook(pre_hook)
+        module.register_forward_hook(post_hook)
+
 
 class WhisperHandler:
-    def __init__(self, model_name="small", language="en"):
+    """
+    Loads and runs the Whisper model. torch and whisper are imported when
+    the torch backend loads; the onnx backend (onnx_backend.py) runs
+    without them once its graphs have been exported.
+    """
+    
+    # Config keys apply_config handles
+    CONFIG_KEYS = (
+        "language", "temperature_fallbacks", "hallucination_filter",
+        "model_idle_unload_minutes", "model_unload_memory_percent"
+    )
+    
+    def __init__(self, model_name="small", language="en", model_manager=None, mmap_weights=True,
+                 compile_mode="off", static_kv_cache=True, backend="torch", onnx_int8=False, cache=None,
+                 max_repeats=MAX_REPEATS, temperature_fallbacks=2, hallucination_filter=True):
         self.model_name = model_name
         self.language = language if language else None
+        self.model_manager = model_manager
+        self.mmap_weights = mmap_weights
+        self.compile_mode = compile_mode or "off"
+        self.static_kv_cache = static_kv_cache
+        self.backend = backend if backend in ("torch", "onnx") else "torch"
+        self.onnx_int8 = onnx_int8
+        # Optional TranscriptionCache shared by handlers
+        self.cache = cache
+        # Decode guards: loop cut-off (0 = off), sampled retries, dropping hallucinated segments
+        self.max_repeats = max_repeats
+        self.temperature_fallbacks = temperature_fallbacks
+        self.hallucination_filter = hallucination_filter
+        self.on_torch = False
         self.model = None
         self.is_loaded = False
         self.loading_lock = threading.Lock()
+        # One inference at a time: whisper's kv-cache hooks live on the shared model
+        self.inference_lock = threading.Lock()
+        
+        # Idle unloading: transcriptions in flight and when the model was last wanted
+        self.use_lock = threading.Lock()
+        # Notified (with use_lock) when the last user is done
+        self.use_idle = threading.Condition(self.use_lock)
+        self.users = 0
+        self.last_used = time.monotonic()
+        self.idle_unload_seconds = 0
+        self.memory_percent_limit = 0
+        self.monitor = None
     
     def load_model(self):
         """Load the Whisper model (can be slow on first run)"""
@@ -22,79 +133,393 @@ class WhisperHandler:
                 return True
             
             try:
-                print(f"Loading Whisper model: {self.model_name}")
+                logger.info(f"Loading Whisper model: {self.model_name}")
                 
-                # Use GPU if available
-                device = "cuda" if torch.cuda.is_available() else "cpu"
-                print(f"Using device: {device}")
+                # Resolve the checkpoint ourselves so downloads are resumable and
+                # verified once, instead of re-hashed by whisper on every load
+                checkpoint = self.model_name
+                if self.model_manager and self.model_manager.is_known(self.model_name):
+                    checkpoint = str(self.model_manager.download(self.model_name))
                 
-                self.model = whisper.load_model(self.model_name, device=device)
+                self.model = None
+                if self.backend == "onnx":
+                    self.model = self._load_onnx(checkpoint)
+                if self.model is None:
+                    self._load_torch(checkpoint)
                 self.is_loaded = True
-                print("Model loaded successfully")
+                logger.info("Model loaded successfully")
                 return True
             except Exception as e:
-                print(f"Error loading model: {e}")
+                logger.error(f"Error loading model: {e}")
+                return False
+    
+    def _load_onnx(self, checkpoint):
+        """The ONNX Runtime model, or None to fall back to torch"""
+        try:
+            import onnx_backend
+            if not os.path.isfile(checkpoint):
+                raise ValueError(f"no checkpoint file for {checkpoint}")
+            model = onnx_backend.load(checkpoint, int8=self.onnx_int8)
+            model.feature_cache = _feature_cache
+            self.on_torch = False
+            logger.info(f"Using ONNX Runtime{' (int8)' if self.onnx_int8 else ''}")
+            return model
+        except Exception as e:
+            logger.warning(f"ONNX backend unavailable, using torch: {e}")
+            return None
+    
+    def _load_torch(self, checkpoint):
+        import torch
+        import whisper
+        import compiled_model
+        import fast_decoding
+        
+        # Use GPU if available
+        device = "cuda" if torch.cuda.is_available() else "cpu"
+        logger.info(f"Using device: {device}")
+        
+        self.model = self._load_checkpoint(checkpoint, device)
+        self.on_torch = True
+        # Loading by path skips whisper's per-name alignment heads
+        alignment_heads = getattr(whisper, "_ALIGNMENT_HEADS", {}).get(self.model_name)
+        if alignment_heads is not None and checkpoint != self.model_name:
+            self.model.set_alignment_heads(alignment_heads)
+        _install_timing_hooks(self.model)
+        # Always installed: it also bounds each window's decode by its audio
+        fast_decoding.install(self.model, static_kv=self.static_kv_cache, max_repeats=self.max_repeats)
+        _install_mel_timer()
+        
+        if self.compile_mode in compiled_model.COMPILE_MODES[1:]:
+            threading.Thread(
+                target=self._compile_model, args=(self.model, checkpoint), daemon=True
+            ).start()
+    
+    def _compile_model(self, model, checkpoint):
+        """Switch a freshly loaded model to the compiled path (background thread)"""
+        import compiled_model
+        
+        cache_root = self.model_manager.cache_dir if self.model_manager else Path(checkpoint).parent
+        key = Path(checkpoint).stem if os.path.isfile(checkpoint) else self.model_name
+        with self.use_lock:
+            self.users += 1
+        try:
+            # Warm-up runs the model, so hold off transcriptions until it's done
+            with self.inference_lock:
+                if model is self.model:
+                    compiled_model.apply(
+                        model, self.compile_mode, cache_root / "winwisp" / "compiled", key,
+                        source=checkpoint if os.path.isfile(checkpoint) else None
+                    )
+        finally:
+            with self.use_lock:
+                self.users -= 1
+                self.use_idle.notify_all()
+    
+    def preload(self):
+        """Start loading the model in the background unless it is loaded or loading"""
+        self.last_used = time.monotonic()
+        if self.is_loaded or self.loading_lock.locked():
+            return
+        threading.Thread(target=self.load_model, daemon=True).start()
+    
+    def unload(self, reason=""):
+        """Free the model unless a transcription is using it"""
+        with self.use_lock:
+            if self.users or not self.is_loaded:
+                return False
+            # Never wait behind a load that is in progress
+            if not self.loading_lock.acquire(blocking=False):
                 return False
+            try:
+                self.model = None
+                self.is_loaded = False
+            finally:
+                self.loading_lock.release()
+        
+        gc.collect()
+        torch = sys.modules.get("torch")
+        if torch is not None and torch.cuda.is_available():
+            torch.cuda.empty_cache()
+        logger.info(f"Model unloaded{f' ({reason})' if reason else ''}")
+        return True
+    
+    def configure_idle_unload(self, idle_minutes=0, memory_percent=0):
+        """
+        Unload the model when it has been idle for idle_minutes, or sooner
+        when system memory use reaches memory_percent (needs psutil).
+        0 disables either rule.
+        """
+        self.idle_unload_seconds = idle_minutes * 60
+        self.memory_percent_limit = memory_percent
+        if (self.idle_unload_seconds or self.memory_percent_limit) and self.monitor is None:
+            self.monitor = threading.Thread(target=self._monitor_idle, daemon=True)
+            self.monitor.start()
     
-    def transcribe(self, audio_file, callback=None):
+    def _monitor_idle(self):
+        """Background loop applying the idle and memory-pressure rules"""
+        while True:
+            time.sleep(30)
+            if not self.is_loaded or self.users:
+                continue
+            
+            idle = time.monotonic() - self.last_used
+            if self.idle_unload_seconds and idle >= self.idle_unload_seconds:
+                self.unload(f"idle for {idle / 60:.0f} min")
+            elif self.memory_percent_limit and psutil and idle >= 60:
+                used = psutil.virtual_memory().percent
+                if used >= self.memory_percent_limit:
+                    self.unload(f"system memory {used:.0f}% used")
+    
+    @contextmanager
+    def _using_model(self):
+        """
+        Keep the model loaded for the duration of a transcription, loading it
+        first if needed. Yields False if it could not be loaded.
+        """
+        with self.use_lock:
+            self.users += 1
+        try:
+            if not self.is_loaded:
+                wait_start = time.perf_counter()
+                self.load_model()
+                telemetry.record_current("model_wait", time.perf_counter() - wait_start)
+            yield self.is_loaded
+        finally:
+            with self.use_lock:
+                self.users -= 1
+                self.last_used = time.monotonic()
+                self.use_idle.notify_all()
+    
+    def _load_checkpoint(self, checkpoint, device):
+        """Map the converted weight cache if there is one, else load normally"""
+        import whisper
+        import weight_cache
+        
+        use_cache = self.mmap_weights and os.path.isfile(checkpoint)
+        if use_cache:
+            try:
+                model = weight_cache.load(checkpoint, device)
+                if model is not None:
+                    logger.info("Loaded memory-mapped weights")
+                    return model
+            except Exception as e:
+                logger.warning(f"Mapped weights unavailable, loading checkpoint: {e}")
+        
+        model = whisper.load_model(checkpoint, device=device)
+        if use_cache:
+            # Next start maps the converted copy instead
+            weight_cache.convert_async(checkpoint)
+        return model
+    
+    def _decode_options(self, audio, extra_options):
+        """Transcribe options that decide the output (everything but precision)"""
+        # Both backends cap each 30 s window's decode (and kv-cache) by the
+        # audio in that window, so looping or hallucinating can't run for long
+        options = {
+            "language": self.language,
+            "task": "transcribe",
+            "temperature": fallback_temperatures(self.temperature_fallbacks)
+        }
+        options.update(extra_options)
+        return options
+    
+    def _cached(self, audio, options):
+        """(cache key, cached text or None); (None, None) without a cache"""
+        if not self.cache:
+            return None, None
+        backend = "onnx-int8" if self.backend == "onnx" and self.onnx_int8 else self.backend
+        key = transcription_cache.cache_key(audio, {
+            "model": self.model_name,
+            "backend": backend,
+            "max_repeats": self.max_repeats,
+            "hallucination_filter": self.hallucination_filter,
+            **options
+        })
+        return key, self.cache.get(key)
+    
+    def _transcribe(self, audio, cache_key=None, **extra_options):
         """
-        Transcribe audio file to text
+        Run the model on audio and return the stripped text (raises on error)
+        
+        cache_key is audio's cache key when the caller has already looked
+        it up and missed, which saves hashing the audio again.
+        """
+        options = self._decode_options(audio, extra_options)
+        if cache_key is None:
+            cache_key, text = self._cached(audio, options)
+            if text is not None:
+                return text
+        
+        if self.on_torch:
+            options["fp16"] = sys.modules["torch"].cuda.is_available()  # Use FP16 on GPU
+        else:
+            options["max_repeats"] = self.max_repeats
+        with self.inference_lock:
+            result = self.model.transcribe(audio, **options)
+        text = self._filtered_text(result)
+        if cache_key:
+            self.cache.put(cache_key, text, model=self.model_name)
+        return text
+    
+    def _filtered_text(self, result):
+        """The result's text without segments that look hallucinated (if filtering)"""
+        segments = result.get("segments")
+        if not self.hallucination_filter or not segments:
+            return result["text"].strip()
+        
+        kept, dropped = gate_segments(segments)
+        if not dropped:
+            return result["text"].strip()
+        for segment in dropped:
+            logger.info(
+                f"Dropped likely hallucination (no speech {segment['no_speech_prob']:.2f}, "
+                f"logprob {segment['avg_logprob']:.2f}, compression {segment['compression_ratio']:.2f})"
+            )
+            logger.debug(f"Dropped text: {segment['text'].strip()}")
+        return "".join(segment["text"] for segment in kept).strip()
+    
+    def transcribe(self, audio, callback=None, **decode_options):
+        """
+        Transcribe audio to text
         
         Args:
-            audio_file: Path to audio file
+            audio: Path to audio file, or 16 kHz mono float32 numpy array
             callback: Optional callback function to call with result
+            decode_options: Extra whisper transcribe options (e.g. beam_size)
         """
-        if not self.is_loaded:
-            if not self.load_model():
+        # A repeat of an earlier transcription needs no model at all
+        try:
+            key, text = self._cached(audio, self._decode_options(audio, decode_options))
+        except OSError:
+            key, text = None, None
+        if text is not None:
+            logger.debug(f"Transcription (cached): {text}")
+            if callback:
+                callback(text, None)
+            return text
+        
+        with self._using_model() as loaded:
+            if not loaded:
                 if callback:
                     callback(None, "Model not loaded")
                 return None
-        
-        try:
-            print(f"Transcribing: {audio_file}")
-            
-            # Transcribe options
-            options = {
-                "fp16": torch.cuda.is_available(),  # Use FP16 on GPU
-                "language": self.language,
-                "task": "transcribe"
-            }
             
-            result = self.model.transcribe(audio_file, **options)
-            text = result["text"].strip()
-            
-            print(f"Transcription: {text}")
-            
-            if callback:
-                callback(text, None)
+            try:
+                if isinstance(audio, str):
+                    logger.info(f"Transcribing: {audio}")
+                else:
+                    logger.info(f"Transcribing {len(audio) / SAMPLE_RATE:.1f}s of audio")
+                
+                text = self._transcribe(audio, cache_key=key, **decode_options)
+                
+                logger.debug(f"Transcription: {text}")
+                
+                if callback:
+                    callback(text, None)
+                
+                return text
+            except Exception as e:
+                error_msg = f"Error during transcription: {e}"
+                logger.error(error_msg)
+                if callback:
+                    callback(None, error_msg)
+                return None
+    
+    def transcribe_incremental(self, audio, on_text, callback=None, final_pass=False):
+        """
+        Transcribe audio in pause-delimited chunks, reporting text as it firms up
+        
+        Args:
+            audio: 16 kHz mono float32 numpy array
+            on_text: Called with the full text so far after each chunk is
+                decoded (and again if the final pass revises it)
+            callback: Optional callback function to call with result
+            final_pass: Re-transcribe the whole clip at the end for best
+                accuracy; on_text then receives the revised text
+        """
+        with self._using_model() as loaded:
+            if not loaded:
+                if callback:
+                    callback(None, "Model not loaded")
+                return None
             
-            return text
-        except Exception as e:
-            error_msg = f"Error during transcription: {e}"
-            print(error_msg)
-            if callback:
-                callback(None, error_msg)
-            return None
+            try:
+                chunks = split_at_pauses(audio, SAMPLE_RATE)
+                logger.info(f"Transcribing {len(audio) / SAMPLE_RATE:.1f}s of audio in {len(chunks)} chunk(s)")
+                
+                text = ""
+                for chunk in chunks:
+                    # Condition each chunk on what came before to keep context
+                    part = self._transcribe(chunk, initial_prompt=text[-200:] or None)
+                    if part:
+                        text = f"{text} {part}".strip()
+                        on_text(text)
+                
+                if final_pass and len(chunks) > 1:
+                    revised = self._transcribe(audio)
+                    if revised and revised != text:
+                        text = revised
+                        on_text(text)
+                
+                logger.debug(f"Transcription: {text}")
+                
+                if callback:
+                    callback(text, None)
+                
+                return text
+            except Exception as e:
+                error_msg = f"Error during transcription: {e}"
+                logger.error(error_msg)
+                if callback:
+                    callback(None, error_msg)
+                return None
     
-    def transcribe_async(self, audio_file, callback):
+    def transcribe_async(self, audio, callback):
         """Transcribe in a separate thread"""
         thread = threading.Thread(
             target=self.transcribe,
-            args=(audio_file, callback)
+            args=(audio, callback)
         )
         thread.start()
     
     def change_model(self, model_name):
-        """Change the Whisper model"""
-        if model_name == self.model_name and self.is_loaded:
-            return True
-        
-        self.model_name = model_name
-        self.model = None
-        self.is_loaded = False
+        """Change the Whisper model once no transcription is using the current one"""
+        while True:
+            # Under use_lock with no users, so none can start on the old
+            # model; under the loading lock so a load already in progress
+            # can't finish after the reset and leave the old model in place
+            with self.use_idle:
+                self.use_idle.wait_for(lambda: self.users == 0)
+                if self.loading_lock.acquire(blocking=False):
+                    try:
+                        if model_name == self.model_name and self.is_loaded:
+                            return True
+                        self.model_name = model_name
+                        self.model = None
+                        self.is_loaded = False
+                        break
+                    finally:
+                        self.loading_lock.release()
+            # A load is in progress, maybe for a waiting transcription: let it finish
+            with self.loading_lock:
+                pass
         
         return self.load_model()
     
     def change_language(self, language):
         """Change the target language"""
         self.language = language if language else None
+    
+    def apply_config(self, changes):
+        """Apply changed settings (config key -> value) that need no reload"""
+        if "language" in changes:
+            self.change_language(changes["language"])
+        if "temperature_fallbacks" in changes:
+            self.temperature_fallbacks = changes["temperature_fallbacks"]
+        if "hallucination_filter" in changes:
+            self.hallucination_filter = changes["hallucination_filter"]
+        if "model_idle_unload_minutes" in changes or "model_unload_memory_percent" in changes:
+            self.configure_idle_unload(
+                idle_minutes=changes.get("model_idle_unload_minutes", self.idle_unload_seconds / 60),
+                memory_percent=changes.get("model_unload_memory_percent", self.memory_percent_limit)
+            )